@@ -0,0 +1,72 @@
+# scripts/bench_embedder.py
+"""
+Embedding backend benchmark: query latency (p50/p95, memoization bypassed) and document
+throughput, for the configured backend or a local model given on the command line.
+
+Offline (no download, random weights, same architecture as BGE):
+  python scripts/bench_embedder.py --local tiny-random-bge [--runtime onnx] [--quantize int8] [--threads 4]
+Configured backend (config.yaml embedding_backend):
+  python scripts/bench_embedder.py
+"""
+from __future__ import annotations
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+
+from indexing.embedders import LocalBgeEmbedder, make_embedder
+
+WORDS = ("population savings capital labor growth aging policy rate inflation economy demographic "
+         "interest pension fertility productivity wages investment").split()
+
+
+def sample_texts(n: int, lo: int, hi: int, seed: int):
+    rnd = random.Random(seed)
+    return [" ".join(rnd.choice(WORDS) for _ in range(rnd.randint(lo, hi))) for _ in range(n)]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--local", default=None, help="local model name/path (e.g. tiny-random-bge, BAAI/bge-small-en-v1.5)")
+    ap.add_argument("--runtime", default="torch", choices=["torch", "onnx"])
+    ap.add_argument("--quantize", default="none", choices=["none", "int8"])
+    ap.add_argument("--threads", type=int, default=0)
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--docs", type=int, default=256)
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    if args.local:
+        emb = LocalBgeEmbedder(args.local, runtime=args.runtime, quantize=args.quantize, threads=args.threads)
+    else:
+        emb = make_embedder()
+    print(f"embedder: {emb.name}  (load {time.perf_counter() - t0:.2f}s)")
+
+    queries = sample_texts(args.queries, 3, 12, seed=1)
+    for q in queries[:5]:
+        emb._embed_query(q)                        # warm-up
+    lat = []
+    for q in queries:
+        t = time.perf_counter()
+        emb._embed_query(q)                        # bypasses the query memo on purpose
+        lat.append((time.perf_counter() - t) * 1000)
+    lat = np.array(lat)
+    print(f"query latency: p50 {np.percentile(lat, 50):.2f} ms  p95 {np.percentile(lat, 95):.2f} ms  "
+          f"(n={len(lat)})")
+
+    docs = sample_texts(args.docs, 20, 380, seed=2)
+    t = time.perf_counter()
+    vecs = emb.embed_documents(docs)
+    dt = time.perf_counter() - t
+    norms = np.linalg.norm(np.asarray(vecs, dtype=np.float32), axis=1)
+    print(f"documents: {len(docs)} in {dt:.2f}s ({len(docs) / dt:.0f} docs/s), dims={len(vecs[0])}, "
+          f"norm range [{norms.min():.3f}, {norms.max():.3f}]")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+# scripts/bench_parser_fidelity.py
+"""
+Pages/sec per extraction fidelity level (text, blocks, spans).
+
+Usage:
+  python scripts/bench_parser_fidelity.py                 # all PDFs in data/pdfs
+  python scripts/bench_parser_fidelity.py a.pdf b.pdf     # explicit files
+"""
+from __future__ import annotations
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+
+from ingestion.pdf_parser import FIDELITY_LEVELS, iter_pages
+from utils.paths import pdfs_dir
+
+
+def bench(pdf: Path, fidelity: str, repeats: int = 3) -> tuple[int, float, int]:
+    best = float("inf")
+    pages = chars = 0
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        pages = chars = 0
+        for p in iter_pages(pdf, fidelity=fidelity):
+            pages += 1
+            chars += len(p.text)
+        best = min(best, time.perf_counter() - t0)
+    return pages, best, chars
+
+
+def main():
+    pdfs = [Path(a) for a in sys.argv[1:]] or sorted(pdfs_dir().glob("*.pdf"))
+    if not pdfs:
+        print("No PDFs found (pass paths or put files in data/pdfs)")
+        sys.exit(1)
+
+    totals = {f: [0, 0.0] for f in FIDELITY_LEVELS}
+    print(f"{'file':40s} {'level':7s} {'pages':>6s} {'sec':>8s} {'pages/s':>9s} {'chars':>10s}")
+    for pdf in pdfs:
+        for fidelity in FIDELITY_LEVELS:
+            pages, secs, chars = bench(pdf, fidelity)
+            totals[fidelity][0] += pages
+            totals[fidelity][1] += secs
+            print(f"{pdf.name[:40]:40s} {fidelity:7s} {pages:6d} {secs:8.3f} {pages / max(secs, 1e-9):9.1f} {chars:10d}")
+
+    print("-" * 86)
+    for fidelity, (pages, secs) in totals.items():
+        print(f"{'TOTAL':40s} {fidelity:7s} {pages:6d} {secs:8.3f} {pages / max(secs, 1e-9):9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# scripts/bench_span_memory.py
+"""
+Memory benchmark: per-span dataclass lists (old PageParse.spans) vs columnar SpanTable.
+
+Usage:
+  python scripts/bench_span_memory.py                 # synthetic: 500 pages x 600 spans
+  python scripts/bench_span_memory.py <pdf_path>      # spans extracted from a real PDF
+"""
+from __future__ import annotations
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Tuple
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+
+from ingestion.spans import SpanTableBuilder, save_spans, load_spans
+
+
+@dataclass
+class LegacySpan:
+    text: str
+    bbox: List[float]
+    start: int
+    end: int
+
+
+@dataclass
+class _Page:
+    page_number: int
+    spans: object
+
+
+RawSpan = Tuple[str, Tuple[float, float, float, float], int, int]
+
+
+def synthetic_pages(n_pages: int = 500, spans_per_page: int = 600) -> List[List[RawSpan]]:
+    rnd = random.Random(7)
+    words = "economy demographic growth savings capital labor inflation policy aging population".split()
+    pages = []
+    for _ in range(n_pages):
+        cursor, spans = 0, []
+        for _ in range(spans_per_page):
+            text = " ".join(rnd.choice(words) for _ in range(rnd.randint(1, 6)))
+            x0, y0 = rnd.uniform(50, 400), rnd.uniform(50, 750)
+            spans.append((text, (x0, y0, x0 + 7.1 * len(text), y0 + 11.3), cursor, cursor + len(text)))
+            cursor += len(text) + 1
+        pages.append(spans)
+    return pages
+
+
+def pdf_pages(pdf_path: str) -> List[List[RawSpan]]:
+    from ingestion.pdf_parser import iter_pages
+    return [
+        [(s.text, tuple(s.bbox), s.start, s.end) for s in p.spans]
+        for p in iter_pages(pdf_path)
+    ]
+
+
+def measure(build):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    obj = build()
+    dt = time.perf_counter() - t0
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return obj, current, dt
+
+
+def main():
+    raw = pdf_pages(sys.argv[1]) if len(sys.argv) > 1 else synthetic_pages()
+    n_spans = sum(len(p) for p in raw)
+
+    def build_legacy():
+        return [[LegacySpan(t, [float(x) for x in b], s, e) for (t, b, s, e) in page] for page in raw]
+
+    def build_columnar():
+        tables = []
+        for page in raw:
+            b = SpanTableBuilder()
+            for (t, bb, s, e) in page:
+                b.append(t, bb, s, e)
+            tables.append(b.build())
+        return tables
+
+    legacy, legacy_bytes, legacy_t = measure(build_legacy)
+    columnar, col_bytes, col_t = measure(build_columnar)
+
+    print(f"pages={len(raw)} spans={n_spans}")
+    print(f"dataclass lists : {legacy_bytes / 1e6:8.2f} MB  ({legacy_bytes / n_spans:6.1f} B/span)  build {legacy_t:.2f}s")
+    print(f"SpanTable       : {col_bytes / 1e6:8.2f} MB  ({col_bytes / n_spans:6.1f} B/span)  build {col_t:.2f}s")
+    print(f"reduction       : {legacy_bytes / max(1, col_bytes):.1f}x")
+
+    with tempfile.TemporaryDirectory() as d:
+        save_spans((_Page(i + 1, t) for i, t in enumerate(columnar)), d)
+        on_disk = sum(f.stat().st_size for f in Path(d).glob("*.npy"))
+        mapped, mapped_bytes, _ = measure(lambda: load_spans(d, mmap=True))
+        assert [s.text for s in mapped[-1]] == [s.text for s in legacy[-1]]
+        print(f"np.save on disk : {on_disk / 1e6:8.2f} MB; mmap load heap {mapped_bytes / 1e6:.2f} MB")
+        del mapped
+
+
+if __name__ == "__main__":
+    main()
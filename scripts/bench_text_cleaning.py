@@ -0,0 +1,115 @@
+# scripts/bench_text_cleaning.py
+"""
+Text cleaner benchmark + golden check: the original multi-pass cleaner (kept here as the
+reference) vs the fused ingestion.text_cleaning._clean_page_text.
+
+Golden corpus = pages of the given PDFs (default: data/pdfs/*.pdf) + hand-written edge cases
++ seeded random strings over the characters every cleaning step reacts to. Any output
+difference is printed and the script exits with status 1.
+
+Usage:
+  python scripts/bench_text_cleaning.py [pdf_path ...] [--repeat N]
+"""
+from __future__ import annotations
+import argparse
+import random
+import re
+import sys
+import time
+import unicodedata
+from pathlib import Path
+from typing import Callable, List
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+
+from ingestion.text_cleaning import _clean_page_text
+from utils.paths import pdfs_dir
+
+
+# ---------- reference: cleaner as of CLEANER_VERSION "1", before fusing ----------
+_L_DEHYPHENATE_RE   = re.compile(r"(\w+)-\n(\w+)")
+_L_SINGLE_NL_RE     = re.compile(r"(?<!\n)\n(?!\n)")
+_L_MULTI_BLANKS_RE  = re.compile(r"\n{3,}")
+_L_MULTI_SPACES_RE  = re.compile(r"[ \t]{2,}")
+_L_CONTROL_CHARS_RE = re.compile(r"[\u0000-\u0008\u000B\u000C\u000E-\u001F\u007F]")
+
+
+def legacy_clean(raw: str) -> str:
+    txt = unicodedata.normalize("NFKC", raw or "")
+    txt = _L_CONTROL_CHARS_RE.sub("", txt)
+    txt = txt.replace("\r\n", "\n").replace("\r", "\n")
+    prev = None
+    while prev != txt:
+        prev = txt
+        txt = _L_DEHYPHENATE_RE.sub(r"\1\2", txt)
+    txt = _L_SINGLE_NL_RE.sub(" ", txt)
+    txt = _L_MULTI_BLANKS_RE.sub("\n\n", txt)
+    txt = _L_MULTI_SPACES_RE.sub(" ", txt)
+    return txt.strip()
+
+
+# ---------- golden corpus ----------
+EDGE_CASES = [
+    "", " ", "\n", "\n\n\n", "a-\nb", "a-\nb-\nc-\nd", "co-\n-\nop", "-\nx", "x-\n", "x-\n\ny",
+    "x -\ny", "é-\nà", "ﬁnance-\nﬂow", "Ｆｕｌｌ　ｗｉｄｔｈ", "a\r\nb\rc\r\n\r\nd", "a\x0cb\x00c\x7fd",
+    "a\x0b-\nb", "a-\x00\nb", "tab\t\tsep", "a \n b", "a\n \nb", "para1\n\n\n\npara2\nline",
+    "1-\n2", "_-\n_", "word­\nnext", "x y", "  lead and trail  \n",
+]
+_ALPHABET = ["a", "b", "é", "1", "_", "-", "-", "\n", "\n", "\r", " ", " ", "\t", "\x0c", "\x00", "ﬁ", "²", "　"]
+
+
+def random_cases(n: int = 3000, seed: int = 13) -> List[str]:
+    rnd = random.Random(seed)
+    return ["".join(rnd.choice(_ALPHABET) for _ in range(rnd.randint(0, 60))) for _ in range(n)]
+
+
+def pdf_page_texts(paths: List[Path]) -> List[str]:
+    from ingestion.pdf_parser import iter_pages
+    out: List[str] = []
+    for p in paths:
+        try:
+            out.extend(page.text for page in iter_pages(p, fidelity="text"))
+        except Exception as e:
+            print(f"skip {p.name}: {e}")
+    return out
+
+
+def throughput(fn: Callable[[str], str], texts: List[str], repeat: int) -> float:
+    mb = sum(len(t.encode("utf-8")) for t in texts) / 1e6
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for t in texts:
+            fn(t)
+        best = min(best, time.perf_counter() - t0)
+    return mb / best if best > 0 else float("inf")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("pdfs", nargs="*", help="PDFs to use as corpus (default: data/pdfs/*.pdf)")
+    ap.add_argument("--repeat", type=int, default=5, help="timing repeats (best of N)")
+    args = ap.parse_args()
+
+    paths = [Path(p) for p in args.pdfs] or sorted(pdfs_dir().glob("*.pdf"))
+    pages = pdf_page_texts(paths)
+    golden = pages + EDGE_CASES + random_cases()
+
+    mismatches = [t for t in golden if legacy_clean(t) != _clean_page_text(t)]
+    print(f"golden corpus: {len(golden)} texts ({len(pages)} PDF pages) -> mismatches: {len(mismatches)}")
+    for t in mismatches[:5]:
+        print(f"  input {t!r}\n    legacy {legacy_clean(t)!r}\n    fused  {_clean_page_text(t)!r}")
+
+    bench = pages or random_cases(20000, seed=1)
+    label = "PDF pages" if pages else "random strings (no PDFs found)"
+    legacy_mbs = throughput(legacy_clean, bench, args.repeat)
+    fused_mbs = throughput(_clean_page_text, bench, args.repeat)
+    print(f"throughput on {label}:")
+    print(f"  legacy : {legacy_mbs:8.1f} MB/s")
+    print(f"  fused  : {fused_mbs:8.1f} MB/s  ({fused_mbs / legacy_mbs:.1f}x)")
+
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
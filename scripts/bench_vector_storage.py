@@ -0,0 +1,94 @@
+# scripts/bench_vector_storage.py
+"""
+Truncated / reduced-precision vector storage benchmark: index size, query latency and
+recall@k against exact search over the full float32 vectors, with and without rescoring the
+top k x N candidates with full vectors.
+
+Vectors: the embedding cache of the configured embedder (--from-cache; real text-embedding-3
+vectors show the Matryoshka effect), or synthetic clustered vectors whose variance decays
+along the dimensions (default, runs offline). Queries are perturbed corpus vectors.
+
+Usage:
+  python scripts/bench_vector_storage.py [--from-cache] [--n 20000] [--dims 1536] [--k 10] [--rescore 4]
+"""
+from __future__ import annotations
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+
+from indexing.vector_codec import bytes_per_vector, decode, encode, truncate_normalize
+
+
+def synthetic(n: int, d: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    scale = 1.0 / np.sqrt(np.arange(1, d + 1))          # leading dims carry most variance
+    centers = rng.standard_normal((max(8, n // 100), d)) * scale
+    x = centers[rng.integers(0, len(centers), n)] + 0.6 * rng.standard_normal((n, d)) * scale
+    return truncate_normalize(x, 0)
+
+
+def from_cache() -> np.ndarray:
+    from indexing.chroma_db import embedding_dims, embedding_model
+    from indexing.embedding_cache import EmbeddingCache
+    x = EmbeddingCache().load_vectors(embedding_model(), embedding_dims())
+    if not len(x):
+        sys.exit(f"no cached vectors for {embedding_model()}; index some documents first")
+    return truncate_normalize(x, 0)
+
+
+def exact_topk(x: np.ndarray, q: np.ndarray, k: int) -> np.ndarray:
+    s = q @ x.T
+    idx = np.argpartition(-s, k - 1, axis=1)[:, :k]
+    return np.take_along_axis(idx, np.argsort(-np.take_along_axis(s, idx, axis=1), axis=1), axis=1)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--from-cache", action="store_true", help="use vectors from the embedding cache")
+    ap.add_argument("--n", type=int, default=20000)
+    ap.add_argument("--dims", type=int, default=1536)
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--k", type=int, default=10)
+    ap.add_argument("--rescore", type=int, default=4, help="candidates = k x N for the rescoring pass")
+    args = ap.parse_args()
+
+    x = from_cache() if args.from_cache else synthetic(args.n, args.dims)
+    n, d = x.shape
+    rng = np.random.default_rng(1)
+    q = truncate_normalize(x[rng.integers(0, n, args.queries)] + 0.05 * rng.standard_normal((args.queries, d)), 0)
+    k = min(args.k, n)
+    truth = exact_topk(x, q, k)
+    print(f"{n} vectors x {d} dims, {len(q)} queries, recall@{k} vs exact float32 search")
+    print(f"{'dims':>6} {'dtype':>8} {'size MB':>9} {'ms/query':>9} {'recall':>7} {'+rescore':>9} {'ms/query':>9}")
+
+    for dims in sorted({d, d // 2, d // 4, d // 8} - {0}, reverse=True):
+        xt = truncate_normalize(x, dims)
+        qt = truncate_normalize(q, dims)
+        for dtype in ("float32", "float16", "int8"):
+            codes, scales = encode(xt, dtype)
+            t0 = time.perf_counter()
+            approx = decode(codes, scales)        # per-query search cost includes decoding the index
+            s = qt @ approx.T
+            kk = min(n, k * args.rescore)
+            cand = np.argpartition(-s, kk - 1, axis=1)[:, :kk]
+            dt = (time.perf_counter() - t0) / len(q) * 1000
+            top = np.take_along_axis(cand, np.argsort(-np.take_along_axis(s, cand, axis=1), axis=1), axis=1)[:, :k]
+            recall = np.mean([len(set(a) & set(b)) / k for a, b in zip(top, truth)])
+
+            t1 = time.perf_counter()
+            full = np.einsum("qd,qcd->qc", q, x[cand])   # rescoring with the full vectors
+            re_top = np.take_along_axis(cand, np.argsort(-full, axis=1)[:, :k], axis=1)
+            dt_re = dt + (time.perf_counter() - t1) / len(q) * 1000
+            re_recall = np.mean([len(set(a) & set(b)) / k for a, b in zip(re_top, truth)])
+
+            size = n * bytes_per_vector(dims, dtype) / 1e6
+            print(f"{dims:>6} {dtype:>8} {size:>9.1f} {dt:>9.3f} {recall:>7.3f} {re_recall:>9.3f} {dt_re:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
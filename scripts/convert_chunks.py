@@ -0,0 +1,48 @@
+# scripts/convert_chunks.py
+"""
+Convert legacy per-document chunk JSONL files (data/indexes/chunks/*.jsonl) into chunk stores
+({doc_id}.chunks), verify them record by record, and optionally delete the JSONL originals.
+
+Usage:
+  python scripts/convert_chunks.py [--delete] [--no-compress] [files ...]
+"""
+from __future__ import annotations
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+
+from ingestion.chunk_store import ChunkStoreReader, chunks_dir, iter_chunk_records, jsonl_to_store
+
+
+def main():
+    ap = argparse.ArgumentParser(description="JSONL -> chunk store converter")
+    ap.add_argument("files", nargs="*", help="JSONL files (default: data/indexes/chunks/*.jsonl)")
+    ap.add_argument("--delete", action="store_true", help="remove each JSONL after a verified conversion")
+    ap.add_argument("--no-compress", action="store_true", help="write uncompressed records")
+    args = ap.parse_args()
+
+    files = [Path(f) for f in args.files] or sorted(chunks_dir().glob("*.jsonl"))
+    if not files:
+        print("No JSONL chunk files found.")
+        return
+
+    in_bytes = out_bytes = 0
+    for src in files:
+        out = jsonl_to_store(src, compress=False if args.no_compress else None)
+        with ChunkStoreReader(out) as r:
+            ok = all(a == b for a, b in zip(iter_chunk_records(src), r)) and len(r) == sum(1 for _ in iter_chunk_records(src))
+            n = len(r)
+        in_bytes += src.stat().st_size
+        out_bytes += out.stat().st_size
+        status = "ok" if ok else "MISMATCH"
+        print(f"{src.name} -> {out.name}: {n} chunks, {src.stat().st_size / 1e3:.1f} kB -> {out.stat().st_size / 1e3:.1f} kB [{status}]")
+        if ok and args.delete:
+            src.unlink()
+
+    print(f"total: {in_bytes / 1e6:.2f} MB -> {out_bytes / 1e6:.2f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+# scripts/embedding_cache.py
+"""
+Inspect and purge the persistent embedding cache (data/indexes/embedding_cache).
+
+Usage:
+  python scripts/embedding_cache.py stats
+  python scripts/embedding_cache.py purge [--model <name>]
+  python scripts/embedding_cache.py evict [--max-mb N]      # apply LRU cap now (default: config)
+"""
+from __future__ import annotations
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+
+from indexing.embedding_cache import EmbeddingCache
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Embedding cache maintenance")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("stats")
+    p_purge = sub.add_parser("purge")
+    p_purge.add_argument("--model", default=None, help="only purge vectors of this embedding model")
+    p_evict = sub.add_parser("evict")
+    p_evict.add_argument("--max-mb", type=int, default=None)
+    args = ap.parse_args()
+
+    cache = EmbeddingCache()
+
+    if args.cmd == "stats":
+        st = cache.stats()
+        print(f"file:      {cache.path}")
+        print(f"entries:   {st['entries']}  (stored as {cache.dtype} for new entries)")
+        print(f"size:      {st['bytes'] / 1e6:.1f} MB / cap {st['max_bytes'] / 1e6:.0f} MB")
+        print(f"hit rate:  {st['hit_rate']:.1%}  ({st['hits']} hits, {st['misses']} misses)")
+        print(f"evictions: {st['evictions']}")
+        for m in st["models"]:
+            dims = m["dims"] or "default"
+            print(f"  {m['model']} (dims={dims}): {m['entries']} vectors, {m['bytes'] / 1e6:.1f} MB")
+
+    elif args.cmd == "purge":
+        n = cache.purge(args.model)
+        print(f"Removed {n} vector{'' if n == 1 else 's'}")
+
+    elif args.cmd == "evict":
+        cap = args.max_mb * 1024 * 1024 if args.max_mb is not None else None
+        n = cache.enforce_cap(cap)
+        print(f"Evicted {n} vector{'' if n == 1 else 's'}; size now {cache.total_bytes() / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+# scripts/hnsw_sweep.py
+"""
+HNSW parameter sweep: for every (M, construction_ef, search_ef) combination, build a scratch
+Chroma collection from cached embeddings and report build time, index size on disk, p50/p95
+single-query latency and recall@k against exact search. Use the result to pick hnsw_m,
+hnsw_construction_ef and hnsw_search_ef in config.yaml.
+
+Vectors: the embedding cache of the configured embedder (truncated to embedding_store_dims, as
+the collection stores them), or --synthetic N clustered vectors. Queries are perturbed
+corpus vectors, so no embedding API calls are made. Scratch collections live in a temporary
+directory, never in data/indexes/chroma.
+
+Usage:
+  python scripts/hnsw_sweep.py [--M 8,16,32] [--construction-ef 100,200] [--search-ef 10,50,100]
+  python scripts/hnsw_sweep.py --synthetic 50000 --dims 1536 --space cosine --k 10
+"""
+from __future__ import annotations
+import argparse
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import chromadb
+import numpy as np
+from chromadb.config import Settings
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+
+from indexing.vector_codec import truncate_normalize
+
+
+def ints(s: str):
+    return [int(x) for x in s.split(",") if x.strip()]
+
+
+def synthetic(n: int, d: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(8, n // 100), d))
+    return truncate_normalize(centers[rng.integers(0, len(centers), n)] + 0.8 * rng.standard_normal((n, d)), 0)
+
+
+def cached_vectors(limit: int) -> np.ndarray:
+    from indexing.chroma_db import embedding_dims, embedding_model, embedding_store_dims
+    from indexing.embedding_cache import EmbeddingCache
+    x = EmbeddingCache().load_vectors(embedding_model(), embedding_dims(), limit=limit or None)
+    if not len(x):
+        sys.exit(f"no cached vectors for {embedding_model()}; index some documents or use --synthetic N")
+    return truncate_normalize(x, embedding_store_dims())
+
+
+def dir_size(path: Path) -> int:
+    return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+
+
+def build(path: Path, x: np.ndarray, meta: dict, batch: int = 5000):
+    client = chromadb.PersistentClient(path=str(path), settings=Settings(anonymized_telemetry=False))
+    coll = client.create_collection("sweep", metadata=meta)
+    for s in range(0, len(x), batch):
+        coll.add(ids=[str(i) for i in range(s, min(len(x), s + batch))], embeddings=x[s:s + batch].tolist())
+    return client, coll
+
+
+def main():
+    ap = argparse.ArgumentParser(description="HNSW recall/latency sweep on scratch collections")
+    ap.add_argument("--synthetic", type=int, default=0, help="N synthetic vectors instead of the embedding cache")
+    ap.add_argument("--dims", type=int, default=1536)
+    ap.add_argument("--limit", type=int, default=0, help="max cached vectors to use (0 = all)")
+    ap.add_argument("--space", default="l2", choices=["l2", "cosine", "ip"])
+    ap.add_argument("--M", default="8,16,32")
+    ap.add_argument("--construction-ef", default="100,200")
+    ap.add_argument("--search-ef", default="10,50,100")
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--k", type=int, default=10)
+    args = ap.parse_args()
+
+    x = synthetic(args.synthetic, args.dims) if args.synthetic else cached_vectors(args.limit)
+    n, d = x.shape
+    rng = np.random.default_rng(1)
+    q = truncate_normalize(x[rng.integers(0, n, args.queries)] + 0.05 * rng.standard_normal((args.queries, d)), 0)
+    k = min(args.k, n)
+    truth = [set(np.argpartition(-(x @ v), k - 1)[:k].tolist()) for v in q]   # unit vectors: same order in every space
+    print(f"{n} vectors x {d} dims, space={args.space}, {len(q)} queries, recall@{k} vs exact search")
+    print(f"{'M':>4} {'c_ef':>5} {'s_ef':>5} {'build s':>8} {'disk MB':>8} {'p50 ms':>7} {'p95 ms':>7} {'recall':>7}")
+
+    root = Path(tempfile.mkdtemp(prefix="hnsw_sweep_"))
+    try:
+        for m in ints(args.M):
+            for c_ef in ints(args.construction_ef):
+                for s_ef in ints(args.search_ef):
+                    path = root / f"m{m}_c{c_ef}_s{s_ef}"
+                    meta = {"hnsw:space": args.space, "hnsw:M": m,
+                            "hnsw:construction_ef": c_ef, "hnsw:search_ef": s_ef}
+                    t0 = time.perf_counter()
+                    client, coll = build(path, x, meta)
+                    t_build = time.perf_counter() - t0
+                    coll.query(query_embeddings=[q[0].tolist()], n_results=k, include=[])   # load the index
+                    lat, hits = [], 0
+                    for v, want in zip(q, truth):
+                        t = time.perf_counter()
+                        got = coll.query(query_embeddings=[v.tolist()], n_results=k, include=[])["ids"][0]
+                        lat.append((time.perf_counter() - t) * 1000)
+                        hits += len(want & {int(i) for i in got})
+                    size = dir_size(path) / 1e6
+                    print(f"{m:>4} {c_ef:>5} {s_ef:>5} {t_build:>8.1f} {size:>8.1f} "
+                          f"{np.percentile(lat, 50):>7.2f} {np.percentile(lat, 95):>7.2f} {hits / (k * len(q)):>7.3f}")
+                    del coll, client
+                    try:
+                        chromadb.api.client.SharedSystemClient.clear_system_cache()
+                    except AttributeError:
+                        pass
+                    shutil.rmtree(path, ignore_errors=True)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
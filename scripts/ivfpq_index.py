@@ -0,0 +1,124 @@
+# scripts/ivfpq_index.py
+"""
+IVF-PQ compressed ANN index (src/indexing/ivfpq.py), used for retrieval when config.yaml has
+vector_backend: ivfpq. Once built it grows with every ingested document; rebuild to retrain
+the quantizers or to compact rows of deleted / re-indexed chunks.
+
+Usage:
+  python scripts/ivfpq_index.py build                   # train on the collection + add every vector
+  python scripts/ivfpq_index.py stats
+  python scripts/ivfpq_index.py bench [--n 200000] [--dims 1536] [--m 64] [--nlist 0]
+  python scripts/ivfpq_index.py bench --from-collection
+
+bench trains an index in a temporary directory (synthetic clustered vectors by default) and
+reports build time, resident memory per million vectors, and QPS / recall@10 against exact
+search for a sweep of nprobe, with and without exact rescoring of the shortlist.
+"""
+from __future__ import annotations
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+
+from indexing.ivfpq import IVFPQIndex, auto_nlist, ivfpq_dir
+from indexing.vector_codec import truncate_normalize
+
+
+def synthetic(n: int, d: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(8, n // 100), d))
+    return truncate_normalize(centers[rng.integers(0, len(centers), n)] + 0.8 * rng.standard_normal((n, d)), 0)
+
+
+def collection_vectors() -> np.ndarray:
+    from indexing.chroma_db import init_chroma
+    _, coll = init_chroma()
+    pages = []
+    for offset in range(0, coll.count(), 5000):
+        emb = coll.get(include=["embeddings"], limit=5000, offset=offset).get("embeddings")
+        if emb is not None and len(emb):
+            pages.append(np.asarray(emb, dtype=np.float32))
+    if not pages:
+        sys.exit("empty collection; ingest some documents or run without --from-collection")
+    return truncate_normalize(np.concatenate(pages), 0)
+
+
+def bench(args) -> None:
+    x = collection_vectors() if args.from_collection else synthetic(args.n, args.dims)
+    n, d = x.shape
+    nlist = args.nlist or auto_nlist(n)
+    rng = np.random.default_rng(1)
+    q = truncate_normalize(x[rng.integers(0, n, args.queries)] + 0.05 * rng.standard_normal((args.queries, d)), 0)
+    k = min(10, n)
+    truth = []
+    for s in range(0, len(q), 64):
+        sc = q[s:s + 64] @ x.T
+        truth.extend(np.argpartition(-sc, k - 1, axis=1)[:, :k])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        t0 = time.perf_counter()
+        index = IVFPQIndex.train(x[:min(n, max(nlist, 256) * 39)], nlist, args.m, "bench", Path(tmp))
+        t_train = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        for s in range(0, n, 20000):
+            index.add([str(i) for i in range(s, min(n, s + 20000))], x[s:s + 20000])
+        t_add = time.perf_counter() - t0
+        mem = index.memory_bytes()
+        print(f"{n} vectors x {d} dims, nlist={index.nlist}, m={index.m} bytes/code, {len(q)} queries")
+        print(f"train {t_train:.1f}s, add {t_add:.1f}s ({n / t_add:.0f} vectors/s)")
+        print(f"resident: {mem['resident_per_vector']:.0f} B/vector = {mem['resident_per_vector']:.0f} MB per million "
+              f"(float32 matrix: {4 * d} MB per million); on disk incl. rescoring vectors: {mem['disk'] / 1e6:.1f} MB")
+        print(f"{'nprobe':>7} {'rescore':>8} {'QPS':>8} {'ms/query':>9} {'recall@10':>10}")
+        for nprobe in (1, 4, 16, 64):
+            if nprobe > index.nlist:
+                break
+            for rescore in (0, args.rescore):
+                t0 = time.perf_counter()
+                ids, _ = index.search(q, k, nprobe=nprobe, rescore=rescore)
+                dt = time.perf_counter() - t0
+                recall = np.mean([len({int(i) for i in a} & set(b.tolist())) / k for a, b in zip(ids, truth)])
+                print(f"{nprobe:>7} {rescore:>8} {len(q) / dt:>8.0f} {dt / len(q) * 1000:>9.2f} {recall:>10.3f}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="IVF-PQ index maintenance and benchmark")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("build")
+    sub.add_parser("stats")
+    p_bench = sub.add_parser("bench")
+    p_bench.add_argument("--from-collection", action="store_true", help="use the collection's vectors")
+    p_bench.add_argument("--n", type=int, default=200_000)
+    p_bench.add_argument("--dims", type=int, default=1536)
+    p_bench.add_argument("--m", type=int, default=64, help="PQ sub-quantizers (bytes per vector)")
+    p_bench.add_argument("--nlist", type=int, default=0, help="0 = ~4*sqrt(n)")
+    p_bench.add_argument("--queries", type=int, default=200)
+    p_bench.add_argument("--rescore", type=int, default=10)
+    args = ap.parse_args()
+
+    if args.cmd == "build":
+        from indexing.chroma_db import build_ivfpq_index
+        t0 = time.perf_counter()
+        n = build_ivfpq_index()
+        print(f"built IVF-PQ index with {n} vectors in {ivfpq_dir()} ({time.perf_counter() - t0:.1f}s)")
+    elif args.cmd == "stats":
+        if not (ivfpq_dir() / "meta.json").exists():
+            print("No IVF-PQ index yet; run: python scripts/ivfpq_index.py build")
+            return
+        index = IVFPQIndex()
+        info = dict(index.meta, **{k: round(v, 1) for k, v in index.memory_bytes().items()})
+        sizes = np.diff(index.inverted_lists()[1])
+        info.update(list_size_min=int(sizes.min()), list_size_max=int(sizes.max()),
+                    unique_ids=len(set(index.ids.tolist())))
+        print(json.dumps(info, indent=2))
+    else:
+        bench(args)
+
+
+if __name__ == "__main__":
+    main()
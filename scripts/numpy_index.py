@@ -0,0 +1,128 @@
+# scripts/numpy_index.py
+"""
+Exact-search snapshot of the Chroma collection (src/indexing/numpy_index.py), used for
+retrieval when config.yaml has vector_backend: numpy.
+
+Usage:
+  python scripts/numpy_index.py export                  # (re)write data/indexes/numpy_index
+  python scripts/numpy_index.py stats
+  python scripts/numpy_index.py bench [--queries 200] [--k 10] [--batch 32]
+  python scripts/numpy_index.py bench --synthetic 100000 [--dims 1536]   # no corpus needed
+
+bench compares Chroma's HNSW query path with the NumPy matmul on the same vectors: latency per
+query (one at a time and batched) and HNSW recall@k against the exact result. Queries are
+stored vectors plus noise, so no embedding API calls are made.
+"""
+from __future__ import annotations
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+
+from indexing.numpy_index import NumpyIndex, NumpyIndexWriter, numpy_index_dir
+from indexing.vector_codec import truncate_normalize
+
+
+def synthetic_collection(n: int, d: int):
+    """In-memory Chroma collection with n clustered unit vectors (returned with the vectors)."""
+    import chromadb
+    rng = np.random.default_rng(0)
+    centers = rng.standard_normal((max(8, n // 100), d))
+    x = truncate_normalize(centers[rng.integers(0, len(centers), n)] + 0.8 * rng.standard_normal((n, d)), 0)
+    coll = chromadb.EphemeralClient().create_collection("bench_numpy_index")
+    for s in range(0, n, 5000):
+        ids = [f"c{i}" for i in range(s, min(n, s + 5000))]
+        coll.add(ids=ids, embeddings=x[s:s + len(ids)].tolist())
+    return coll, x
+
+
+def timed(fn, n_queries: int) -> float:
+    t0 = time.perf_counter()
+    fn()
+    return (time.perf_counter() - t0) / n_queries * 1000
+
+
+def bench(args) -> None:
+    if args.synthetic:
+        t0 = time.perf_counter()
+        coll, x = synthetic_collection(args.synthetic, args.dims)
+        print(f"synthetic collection: {len(x)} x {x.shape[1]} built in {time.perf_counter() - t0:.1f}s")
+        tmp = tempfile.TemporaryDirectory()
+        writer = NumpyIndexWriter(len(x), x.shape[1], Path(tmp.name))
+        writer.add([f"c{i}" for i in range(len(x))], x)
+        writer.commit("synthetic")
+        index = NumpyIndex(Path(tmp.name))
+    else:
+        from indexing.chroma_db import export_numpy_index, init_chroma
+        _, coll = init_chroma()
+        export_numpy_index(coll)
+        index = NumpyIndex()
+        x = np.asarray(index.vectors)
+    n = index.count
+    if n == 0:
+        sys.exit("empty index; ingest some documents or use --synthetic N")
+
+    rng = np.random.default_rng(1)
+    q = truncate_normalize(x[rng.integers(0, n, args.queries)] + 0.05 * rng.standard_normal((args.queries, index.dims)), 0)
+    k = min(args.k, n)
+    ql = q.tolist()
+    print(f"{n} vectors x {index.dims} dims, {len(q)} queries, k={k}")
+
+    hnsw = []
+    t_chroma = timed(lambda: hnsw.extend(coll.query(query_embeddings=[v], n_results=k, include=[])["ids"][0]
+                                         for v in ql), len(q))
+    t_chroma_b = timed(lambda: [coll.query(query_embeddings=ql[s:s + args.batch], n_results=k, include=[])
+                                for s in range(0, len(ql), args.batch)], len(q))
+    index.search(q[:1], k)                                   # touch the mapping once
+    t_np = timed(lambda: [index.search(v, k) for v in q], len(q))
+    exact = []
+    t_np_b = timed(lambda: exact.extend(index.search(q[s:s + args.batch], k)[0]
+                                        for s in range(0, len(q), args.batch)), len(q))
+    exact = np.concatenate(exact)
+    recall = np.mean([len(set(h) & set(index.chunk_ids(e))) / k for h, e in zip(hnsw, exact)])
+
+    print(f"{'backend':<10} {'ms/query':>9} {'batched ms/query':>17} {'recall@k':>9}")
+    print(f"{'chroma':<10} {t_chroma:>9.3f} {t_chroma_b:>17.3f} {recall:>9.3f}")
+    print(f"{'numpy':<10} {t_np:>9.3f} {t_np_b:>17.3f} {1.0:>9.3f}")
+    print(f"snapshot size: {index.vectors.nbytes / 1e6:.1f} MB (mmapped, shared across processes)")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="NumPy exact-search snapshot")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("export")
+    sub.add_parser("stats")
+    p_bench = sub.add_parser("bench")
+    p_bench.add_argument("--synthetic", type=int, default=0, help="benchmark N random vectors instead of the corpus")
+    p_bench.add_argument("--dims", type=int, default=1536)
+    p_bench.add_argument("--queries", type=int, default=200)
+    p_bench.add_argument("--k", type=int, default=10)
+    p_bench.add_argument("--batch", type=int, default=32)
+    args = ap.parse_args()
+
+    if args.cmd == "export":
+        from indexing.chroma_db import export_numpy_index
+        t0 = time.perf_counter()
+        n = export_numpy_index()
+        print(f"exported {n} vectors to {numpy_index_dir()} in {time.perf_counter() - t0:.1f}s")
+    elif args.cmd == "stats":
+        meta = numpy_index_dir() / "meta.json"
+        if not meta.exists():
+            print("No NumPy index yet; run: python scripts/numpy_index.py export")
+            return
+        index = NumpyIndex()
+        info = json.loads(meta.read_text(encoding="utf-8"))
+        info.update(stale=index.is_stale(), size_mb=round(index.vectors.nbytes / 1e6, 1))
+        print(json.dumps(info, indent=2))
+    else:
+        bench(args)
+
+
+if __name__ == "__main__":
+    main()
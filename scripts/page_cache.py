@@ -0,0 +1,59 @@
+# scripts/page_cache.py
+"""
+Inspect and purge the parsed-page cache (data/indexes/page_cache).
+
+Usage:
+  python scripts/page_cache.py stats
+  python scripts/page_cache.py list
+  python scripts/page_cache.py purge [--md5 <doc_id>]
+  python scripts/page_cache.py evict [--max-mb N]      # apply LRU cap now (default: config)
+"""
+from __future__ import annotations
+import argparse
+import sys
+from datetime import datetime
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+
+from ingestion.page_cache import PageCache
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Parsed-page cache maintenance")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("stats")
+    sub.add_parser("list")
+    p_purge = sub.add_parser("purge")
+    p_purge.add_argument("--md5", default=None, help="only purge entries for this doc_id")
+    p_evict = sub.add_parser("evict")
+    p_evict.add_argument("--max-mb", type=int, default=None)
+    args = ap.parse_args()
+
+    cache = PageCache()
+
+    if args.cmd == "stats":
+        entries = cache.entries()
+        total = sum(e.size for e in entries)
+        print(f"dir:     {cache.root}")
+        print(f"entries: {len(entries)}")
+        print(f"size:    {total / 1e6:.1f} MB / cap {cache.max_bytes / 1e6:.0f} MB")
+
+    elif args.cmd == "list":
+        for e in sorted(cache.entries(), key=lambda e: e.last_used, reverse=True):
+            used = datetime.fromtimestamp(e.last_used).strftime("%Y-%m-%d %H:%M")
+            print(f"{used}  {e.size / 1e3:10.1f} KB  {e.key}")
+
+    elif args.cmd == "purge":
+        n = cache.purge(args.md5)
+        print(f"Removed {n} cache entr{'y' if n == 1 else 'ies'}")
+
+    elif args.cmd == "evict":
+        cap = args.max_mb * 1024 * 1024 if args.max_mb is not None else None
+        evicted = cache.enforce_cap(cap)
+        print(f"Evicted {len(evicted)} entr{'y' if len(evicted) == 1 else 'ies'}; "
+              f"size now {cache.total_bytes() / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+# scripts/serve.py
+"""
+Run the long-lived retrieval service (src/service/server.py): warms up the Chroma index, the
+embedder and the OpenAI client once, then serves /retrieve, /answer, /stats and /reload.
+Point the Streamlit app at it with service_url in config.yaml (or RAG_SERVICE_URL).
+
+Usage:
+  python scripts/serve.py [--host 127.0.0.1] [--port 8765] [--model gpt-4.1]
+"""
+from __future__ import annotations
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+
+from service.server import RetrievalService, make_server
+from utils.config import get_settings
+
+
+def main():
+    cfg = get_settings()
+    ap = argparse.ArgumentParser(description="Retrieval / answering HTTP service")
+    ap.add_argument("--host", default=cfg.get("service_host", "127.0.0.1"))
+    ap.add_argument("--port", type=int, default=int(cfg.get("service_port", 8765)))
+    ap.add_argument("--model", default="gpt-4.1", help="default chat model for /answer")
+    args = ap.parse_args()
+
+    service = RetrievalService(default_model=args.model)
+    print("warming up ...")
+    print(f"warm in {service.warm_up():.2f}s")
+    server = make_server(args.host, args.port, service)
+    print(f"serving on http://{args.host}:{server.server_address[1]}  (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
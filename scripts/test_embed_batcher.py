@@ -0,0 +1,144 @@
+# scripts/test_embed_batcher.py
+"""
+Smoke test for indexing.embed_batcher against a local fake OpenAI-compatible embedding server
+(no API key, no network). The server adds latency proportional to the batch size and injects
+429 (with Retry-After) and 500 responses at random.
+
+Checks: vectors come back complete and in input order despite failures, concurrency beats a
+single connection, non-retryable errors surface immediately, the token bucket enforces its rate.
+
+Usage:
+  python scripts/test_embed_batcher.py [--texts 1500] [--p429 0.1] [--p500 0.05]
+"""
+from __future__ import annotations
+import argparse
+import hashlib
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+
+from indexing.embed_batcher import EmbeddingAPIError, EmbeddingBatcher, OpenAIEmbeddingsHTTP, TokenBucket
+
+DIM = 8
+
+
+def fake_vector(text: str):
+    h = hashlib.sha256(text.encode("utf-8")).digest()
+    return [b / 255.0 for b in h[:DIM]]
+
+
+class FakeEmbeddingHandler(BaseHTTPRequestHandler):
+    p429 = 0.0
+    p500 = 0.0
+    base_latency = 0.02
+    per_token_latency = 2e-6
+    served = 0
+
+    def log_message(self, *args):   # keep the output readable
+        pass
+
+    def _reply(self, code: int, payload: dict, headers: dict = None) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        req = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        texts = req["input"]
+        if req.get("model") == "bad-model":
+            return self._reply(400, {"error": {"message": "unknown model"}})
+        r = random.random()
+        if r < self.p429:
+            return self._reply(429, {"error": {"message": "rate limited"}}, {"Retry-After": "0.05"})
+        if r < self.p429 + self.p500:
+            return self._reply(500, {"error": {"message": "internal error"}})
+        tokens = sum(max(1, len(t) // 4) for t in texts)
+        time.sleep(self.base_latency + self.per_token_latency * tokens)
+        FakeEmbeddingHandler.served += len(texts)
+        data = [{"object": "embedding", "index": i, "embedding": fake_vector(t)} for i, t in enumerate(texts)]
+        data.reverse()   # clients must order by "index", not by position
+        self._reply(200, {"object": "list", "data": data, "usage": {"prompt_tokens": tokens, "total_tokens": tokens}})
+
+
+def start_server():
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), FakeEmbeddingHandler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv, f"http://127.0.0.1:{srv.server_address[1]}/v1"
+
+
+def make_texts(n: int, seed: int = 7):
+    rnd = random.Random(seed)
+    words = "population savings capital labor growth aging policy rate inflation economy".split()
+    return [f"{i} " + " ".join(rnd.choice(words) for _ in range(rnd.randint(5, 400))) for i in range(n)]
+
+
+def run(base_url: str, texts, concurrency: int):
+    client = OpenAIEmbeddingsHTTP("fake-embed", api_key="test", base_url=base_url)
+    b = EmbeddingBatcher(client, concurrency=concurrency, tpm=0, rpm=0, batch_tokens=4096, target_latency=0.5)
+    t0 = time.perf_counter()
+    vecs = b.embed(texts)
+    return vecs, time.perf_counter() - t0, b
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--texts", type=int, default=1500)
+    ap.add_argument("--p429", type=float, default=0.1)
+    ap.add_argument("--p500", type=float, default=0.05)
+    args = ap.parse_args()
+
+    srv, base_url = start_server()
+    texts = make_texts(args.texts)
+    ok = True
+
+    # 1) correctness under injected failures
+    FakeEmbeddingHandler.p429, FakeEmbeddingHandler.p500 = args.p429, args.p500
+    vecs, dt, b = run(base_url, texts, concurrency=4)
+    bad = sum(v != fake_vector(t) for v, t in zip(vecs, texts))
+    print(f"[1] {len(texts)} texts in {dt:.2f}s, mismatches={bad}, stats={b.stats}, batch_tokens={b.batch_tokens:.0f}")
+    ok &= bad == 0 and len(vecs) == len(texts)
+
+    # 2) concurrency vs a single connection (no failures)
+    FakeEmbeddingHandler.p429 = FakeEmbeddingHandler.p500 = 0.0
+    _, t1, _ = run(base_url, texts, concurrency=1)
+    _, t8, _ = run(base_url, texts, concurrency=8)
+    print(f"[2] concurrency=1: {t1:.2f}s  concurrency=8: {t8:.2f}s  ({t1 / t8:.1f}x)")
+    ok &= t8 < t1
+
+    # 3) non-retryable errors are raised without retrying
+    client = OpenAIEmbeddingsHTTP("bad-model", api_key="test", base_url=base_url)
+    b = EmbeddingBatcher(client, concurrency=2, tpm=0, rpm=0)
+    try:
+        b.embed(["x"])
+        print("[3] expected HTTP 400 to be raised"); ok = False
+    except EmbeddingAPIError as e:
+        print(f"[3] raised {e.status}, retries={b.stats['retries']}")
+        ok &= e.status == 400 and b.stats["retries"] == 0
+
+    # 4) token bucket: drain one minute of budget, the next acquire waits for the refill
+    bucket = TokenBucket(per_minute=6000)   # 100 tokens/s
+    bucket.acquire(6000)
+    t0 = time.perf_counter()
+    bucket.acquire(50)
+    waited = time.perf_counter() - t0
+    print(f"[4] token bucket waited {waited:.2f}s for 50 tokens at 100/s")
+    ok &= 0.4 < waited < 1.0
+
+    srv.shutdown()
+    print("OK" if ok else "FAILED")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+# scripts/test_tag_filters.py
+# Removing a tag from a document must remove it from the document's indexed chunks:
+# Chroma merges metadata on upsert, so a stale tag__<slug> field would keep matching filters.
+# Usage: python scripts/test_tag_filters.py [doc_id]   (the doc's tags are restored at the end)
+from __future__ import annotations
+from pathlib import Path
+import sys
+
+
+def main():
+    from indexing.chroma_db import init_chroma
+    from indexing.indexer import upsert_document_chunks
+    from ingestion.chunk_store import chunk_store_path
+    from ingestion.pipeline import CHUNKER_PARAMS
+    from metadata.io import list_all_metadata, load_metadata, save_metadata
+    from retrieval.dense import retrieve
+    from retrieval.filters import SearchFilters, tag_key
+
+    _, coll = init_chroma()
+    if len(sys.argv) > 1:
+        meta = load_metadata(sys.argv[1])
+    else:
+        meta = next((m for m in list_all_metadata() if m.tags and chunk_store_path(m.doc_id).exists()), None)
+    if meta is None or not meta.tags:
+        print("No indexed document with tags. Tag one in the app and re-index first.")
+        return
+
+    tags = list(meta.tags)
+    removed = tags[0]
+    print(f"Doc {meta.doc_id}: tags={tags}, removing {removed!r}", flush=True)
+    try:
+        meta.tags = tags[1:]
+        save_metadata(meta)
+        upsert_document_chunks(meta.doc_id, chunk_store_path(meta.doc_id), CHUNKER_PARAMS)
+
+        where = {"$and": [{"doc_id": meta.doc_id}, {tag_key(removed): True}]}
+        left = coll.get(where=where, include=[])["ids"]
+        hits = [h for h in retrieve(removed, top_k=20, filters=SearchFilters(tags=[removed]))
+                if h.doc_id == meta.doc_id]
+        print(f"chunks still tagged: {len(left)}  filtered hits from the doc: {len(hits)}")
+        print("OK" if not left and not hits else "FAIL: removed tag still matches")
+    finally:
+        meta.tags = tags
+        save_metadata(meta)
+        upsert_document_chunks(meta.doc_id, chunk_store_path(meta.doc_id), CHUNKER_PARAMS)
+        print("Tags restored.")
+
+
+if __name__ == "__main__":
+    root = Path(__file__).resolve().parents[1]
+    for p in (root, root / "src"):
+        if str(p) not in sys.path:
+            sys.path.insert(0, str(p))
+    main()
@@ -0,0 +1,55 @@
+# scripts/watch_pdfs.py
+"""
+Run the ingestion watcher: new PDFs in data/pdfs get draft metadata, and documents are
+ingested automatically once their metadata is ready. Ctrl+C stops after in-flight work finishes;
+pending items are persisted and resumed on the next start.
+
+Usage:
+  python scripts/watch_pdfs.py [--interval S] [--debounce S] [--workers N]
+  python scripts/watch_pdfs.py --once          # single scan + drain the queue, then exit
+  python scripts/watch_pdfs.py --stats         # print counters of the running watcher
+"""
+from __future__ import annotations
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+
+from ingestion.watcher import PdfWatcher, _stats_path
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Directory-watching ingestion daemon")
+    ap.add_argument("--interval", type=float, default=None, help="poll interval, seconds (default: config)")
+    ap.add_argument("--debounce", type=float, default=None, help="stability window, seconds (default: config)")
+    ap.add_argument("--workers", type=int, default=None, help="concurrent ingestions (default: config)")
+    ap.add_argument("--once", action="store_true", help="scan once, process the queue, exit")
+    ap.add_argument("--stats", action="store_true", help="print the last written counters and exit")
+    args = ap.parse_args()
+
+    if args.stats:
+        path = _stats_path()
+        print(path.read_text(encoding="utf-8") if path.exists() else "No watcher stats yet.")
+        return
+
+    watcher = PdfWatcher(poll_interval=args.interval, debounce=args.debounce, workers=args.workers)
+    if not args.once:
+        watcher.run_forever()
+        return
+
+    watcher.debounce = 0
+    watcher.scan_once()
+    while True:
+        watcher.pump()
+        s = watcher.stats()
+        if not s["queue_depth"] and not s["in_flight"]:
+            break
+        time.sleep(0.5)
+    print(json.dumps(watcher.stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
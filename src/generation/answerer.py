@@ -1,13 +1,19 @@
 # src/generation/answerer.py
 from __future__ import annotations
 from dataclasses import dataclass
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import os
 import textwrap
+import threading
 from dotenv import load_dotenv
 from openai import OpenAI
 
-from retrieval.dense import retrieve
+from retrieval.dense import RetrievedChunk, retrieve
+from retrieval.expansion import expand_hits
+from retrieval.filters import SearchFilters
+
+_CLIENT: Optional[OpenAI] = None
+_CLIENT_LOCK = threading.Lock()
 
 @dataclass
 class Citation:
@@ -21,24 +27,45 @@ class Answer:
     answer: str
     citations: List[Citation]
 
-def _build_context(hits: List[Dict[str, Any]], max_chars: int = 9000) -> str:
+def _build_context(hits: List[Dict[str, Any]], max_chars: int = 9000, hit_chars: int = 1500) -> str:
     """
     Build a compact context block from top-K hits.
-    Each section carries title + pages header and a trimmed excerpt.
+    Each section carries title + pages header and a trimmed excerpt. The hits that fit are
+    chosen on their own excerpts first; neighbor text of expanded hits (retrieval.expansion)
+    only fills the space left after that, best-ranked hits first, so it never pushes a hit out.
     """
-    parts: List[str] = []
+    sections = []     # (header, core, prefix, suffix)
     used = 0
     for h in hits:
         title = h.metadata.get("title", "") or h.metadata.get("doc_id", "")
         pages = h.metadata.get("pages_covered", "")
-        body = h.text.strip().replace("\r", " ").strip()
-        # Trim long bodies so full context stays within ~9k chars
-        body = (body[:1500] + "…") if len(body) > 1500 else body
-        section = f"### {title} — pages {pages}\n{body}\n"
-        if used + len(section) > max_chars and parts:
+        header = f"### {title} — pages {pages}\n"
+        core = h.text.strip().replace("\r", " ").strip()
+        prefix = suffix = ""
+        if len(core) > hit_chars:
+            core = core[:hit_chars] + "…"          # trimmed hits get no neighbor text
+        elif h.expanded_text:
+            expanded = h.expanded_text.replace("\r", " ").strip()
+            i = expanded.find(core)
+            if i != -1:
+                prefix, suffix = expanded[:i], expanded[i + len(core):]
+        size = len(header) + len(core) + 2        # section newline + "\n".join separator
+        if used + size > max_chars and sections:
             break
-        parts.append(section)
-        used += len(section)
+        sections.append((header, core, prefix, suffix))
+        used += size
+
+    spare = max(0, max_chars - used + 1)          # no separator after the last section
+    parts: List[str] = []
+    for header, core, prefix, suffix in sections:
+        take_pre = min(len(prefix), spare // 2)
+        take_suf = min(len(suffix), spare - take_pre)
+        take_pre = min(len(prefix), spare - take_suf)
+        spare -= take_pre + take_suf
+        # a cut side spends one of its chars on "…"
+        pre = ("…" + prefix[len(prefix) - take_pre + 1:]) if 0 < take_pre < len(prefix) else prefix[len(prefix) - take_pre:]
+        suf = (suffix[:take_suf - 1] + "…") if 0 < take_suf < len(suffix) else suffix[:take_suf]
+        parts.append(f"{header}{pre}{core}{suf}\n")
     return "\n".join(parts)
 
 _SYSTEM = """You are a domain-aware assistant answering questions about economics and finance using the provided EXCERPTS ONLY.
@@ -57,9 +84,21 @@ If you can answer, give a clear explanation first, then a compact bullet list of
 
 Answer in English."""
 
+def get_openai_client() -> OpenAI:
+    """
+    Process-wide OpenAI client: one connection pool reused by every answer (the client is
+    thread-safe), instead of a new client + TLS handshake per call.
+    """
+    global _CLIENT
+    if _CLIENT is None:
+        with _CLIENT_LOCK:
+            if _CLIENT is None:
+                load_dotenv()
+                _CLIENT = OpenAI()  # uses OPENAI_API_KEY from env
+    return _CLIENT
+
 def _call_openai(model: str, messages: List[Dict[str, str]], max_tokens: int = 600) -> str:
-    load_dotenv()
-    client = OpenAI()  # uses OPENAI_API_KEY from env
+    client = get_openai_client()
     resp = client.chat.completions.create(
         model=model,
         messages=messages,
@@ -72,14 +111,22 @@ def answer_with_citations(
     question: str,
     top_k: int = 5,
     model: str = "gpt-4.1",
+    hits: Optional[List[RetrievedChunk]] = None,
+    filters: Optional[SearchFilters] = None,
 ) -> Answer:
+    """
+    Pass `hits` when the caller already retrieved them (avoids a second search).
+    `filters` (year / doc type / tags / doc ids) restrict retrieval to matching chunks.
+    """
     # 1) Dense retrieval
-    hits = retrieve(question, top_k=top_k)
+    if hits is None:
+        hits = retrieve(question, top_k=top_k, filters=filters)
 
     if not hits:
         return Answer(answer="Not found in corpus.", citations=[])
 
-    # 2) Build grounded context
+    # 2) Build grounded context (with adjacent chunks from the local chunk store)
+    expand_hits(hits)
     context = _build_context(hits)
 
     messages = [
@@ -1,22 +1,48 @@
 from __future__ import annotations
 from pathlib import Path
-from typing import List, Dict, Any, Tuple, Optional
+from typing import Iterable, List, Dict, Any, Tuple, Optional
 import os
 import chromadb
 from chromadb.config import Settings
-from chromadb.utils.embedding_functions import OpenAIEmbeddingFunction
 from dotenv import load_dotenv
 import json
+import threading
+import time
+import numpy as np
 
 # Load env early
 load_dotenv()
 
+from utils.config import get_settings
+from utils.logging_utils import get_logger
 from utils.paths import indexes_dir
+from indexing.embedders import Embedder, make_embedder
+from indexing.embedding_cache import EmbeddingCache
+from indexing.manifest import clear_manifest, text_hash
+from indexing.ivfpq import IVFPQIndex, auto_nlist, clear_ivfpq_index, ivfpq_dir
+from indexing.minhash_lsh import clear_minhash_index
+from indexing.numpy_index import NumpyIndex, NumpyIndexWriter, mark_stale, numpy_index_dir
+from indexing.vector_codec import truncate_normalize
+
+log = get_logger("chroma_db")
 
 COLLECTION_NAME = "documents"
 
 # --- Singleton client instance ---
 _CLIENT: Optional[chromadb.api.client.Client] = None
+_COLLECTIONS: Dict[str, Any] = {}          # collection name -> handle (see init_chroma)
+_COLLECTIONS_LOCK = threading.Lock()
+_EMBEDDER: Optional[Embedder] = None
+_EMBEDDER_LOCK = threading.Lock()          # watcher workers ingest concurrently: build it once
+_EMBED_CACHE: Optional[EmbeddingCache] = None
+_NUMPY_INDEX: Optional[NumpyIndex] = None
+_NUMPY_WARNED = False
+_IVFPQ_INDEX: Optional[IVFPQIndex] = None
+_IVFPQ_WARNED = False
+_FILTER_MASKS: Dict[Tuple, Tuple[float, np.ndarray]] = {}    # see _filter_mask
+_FILTER_MASKS_LOCK = threading.Lock()
+FILTER_MASK_TTL = 60.0       # seconds; bounds staleness after writes by other processes
+FILTER_MASK_CACHE = 32
 
 
 # ----------------- Helpers -----------------
@@ -53,50 +79,532 @@ def _get_client() -> chromadb.api.client.Client:
     return _CLIENT
 
 
+def get_embedder() -> Embedder:
+    """Process-wide embedding backend (embedding_backend in config.yaml: openai | local)."""
+    global _EMBEDDER
+    if _EMBEDDER is None:
+        with _EMBEDDER_LOCK:
+            if _EMBEDDER is None:
+                _EMBEDDER = make_embedder()
+    return _EMBEDDER
+
+
+def embedding_model() -> str:
+    """Name of the active embedder (backend + model + quantization); keys the embedding cache."""
+    return get_embedder().name
+
+
+def embedding_dims() -> int:
+    """Output dimensions requested from the embedder (0 = model default)."""
+    return int(getattr(get_embedder(), "dimensions", 0) or 0)
+
+
+def embedding_store_dims(cfg: Optional[Dict[str, Any]] = None) -> int:
+    """Dimensions kept in the collection (0 = full vectors); see indexing.vector_codec.truncate_normalize."""
+    return int((cfg or get_settings()).get("embedding_store_dims") or 0)
+
+
+def index_signature(cfg: Optional[Dict[str, Any]] = None) -> str:
+    """
+    What the collection's vectors are comparable with: embedder name, its requested output
+    size if set (embedding_dimensions) and the stored dims if truncated: "name[:dims][@store_dims]".
+    """
+    out_dims, dims = embedding_dims(), embedding_store_dims(cfg)
+    return get_embedder().name + (f":{out_dims}" if out_dims else "") + (f"@{dims}" if dims else "")
+
+
+HNSW_SPACES = ("l2", "cosine", "ip")
+
+
+def hnsw_metadata() -> Dict[str, Any]:
+    """
+    Collection metadata for the HNSW index from config.yaml: hnsw_space, hnsw_m,
+    hnsw_construction_ef, hnsw_search_ef (0 = Chroma's default, key left out).
+    """
+    cfg = get_settings()
+    space = str(cfg.get("hnsw_space") or "l2")
+    if space not in HNSW_SPACES:
+        raise ValueError(f"hnsw_space must be one of {HNSW_SPACES}, got {space!r}")
+    meta: Dict[str, Any] = {"hnsw:space": space}
+    for key, name in (("hnsw:M", "hnsw_m"), ("hnsw:construction_ef", "hnsw_construction_ef"),
+                      ("hnsw:search_ef", "hnsw_search_ef")):
+        if int(cfg.get(name) or 0) > 0:
+            meta[key] = int(cfg[name])
+    return meta
+
+
+def collection_space(collection) -> str:
+    """Distance space the collection was built with (hnsw:space; Chroma's default is l2)."""
+    return str((getattr(collection, "metadata", None) or {}).get("hnsw:space") or "l2")
+
+
+def distance_from_similarity(sim: float, space: str) -> float:
+    """Cosine similarity of unit vectors -> distance in `space` (see collection_space)."""
+    if space in ("cosine", "ip"):
+        return float(1.0 - sim)
+    return float(2.0 - 2.0 * sim)          # l2: squared euclidean distance
+
+
+def _for_store(vectors: List[List[float]]) -> List[List[float]]:
+    dims = embedding_store_dims()
+    return truncate_normalize(vectors, dims).tolist() if dims and vectors else vectors
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """Process-wide embedding cache, or None when embedding_cache_enabled is off."""
+    global _EMBED_CACHE
+    if _EMBED_CACHE is None and get_settings().get("embedding_cache_enabled", True):
+        with _EMBEDDER_LOCK:
+            if _EMBED_CACHE is None:
+                _EMBED_CACHE = EmbeddingCache()
+    return _EMBED_CACHE
+
+
 # ----------------- Main API -----------------
 def init_chroma(collection_name: str = COLLECTION_NAME):
     """
-    Return (client, collection). If missing, create with embedding_function.
-    Avoids embedding conflicts by attaching the embedder only when creating.
+    Return (client, collection). If missing, create it with the configured embedder, whose name
+    is recorded in the collection metadata; an existing collection built with another embedder
+    is reported (its vectors are not comparable with the configured one's).
+    Handles are cached per process, so hot paths (retrieve, per-document upserts) don't list and
+    re-resolve collections on every call; clear_all() and reset_handles() drop the cache.
     """
-    client = _get_client()
+    coll = _COLLECTIONS.get(collection_name)
+    if coll is not None:
+        return _get_client(), coll
+
+    with _COLLECTIONS_LOCK:
+        coll = _COLLECTIONS.get(collection_name)
+        if coll is None:
+            coll = _open_collection(collection_name)
+            _COLLECTIONS[collection_name] = coll
+    return _get_client(), coll
 
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        raise RuntimeError("OPENAI_API_KEY not found in environment or .env")
 
-    embed_fn = OpenAIEmbeddingFunction(
-        api_key=api_key,
-        model_name=os.getenv("OPENAI_EMBED_MODEL", "text-embedding-3-small"),
-    )
+def _open_collection(collection_name: str):
+    client = _get_client()
+    embedder = get_embedder()
 
     existing = {c.name for c in client.list_collections()}
     if collection_name in existing:
+        # no embedding_function: Chroma's open-time check calls embedding_function.name(), while
+        # Embedder.name is a str; every write and query here passes explicit embeddings anyway
         collection = client.get_collection(name=collection_name)
+        built_with = (collection.metadata or {}).get("embedder")
+        if built_with and built_with != index_signature():
+            log.warning(
+                f"embedder_mismatch | collection={collection_name} built_with={built_with} "
+                f"configured={index_signature()}; run a full reindex (force) after switching "
+                f"backends, embedding_dimensions or embedding_store_dims"
+            )
+        _check_hnsw_params(collection)
     else:
         collection = client.create_collection(
             name=collection_name,
-            embedding_function=embed_fn
+            embedding_function=embedder,
+            metadata={"embedder": index_signature(), **hnsw_metadata()},
         )
+    return collection
 
-    return client, collection
+
+def _check_hnsw_params(collection) -> None:
+    """
+    HNSW space, M and construction_ef are fixed when the collection is created: report a
+    mismatch with config.yaml. search_ef is applied to the existing index where Chroma allows it.
+    """
+    built = collection.metadata or {}
+    wanted = hnsw_metadata()
+    stale = {k: (built.get(k), v) for k, v in wanted.items()
+             if k != "hnsw:search_ef" and built.get(k, "l2" if k == "hnsw:space" else None) != v}
+    if stale:
+        log.warning(
+            f"hnsw_params_mismatch | collection={collection.name} built/configured={stale}; "
+            f"run a full reindex (force) to rebuild the index with the configured parameters"
+        )
+    ef = wanted.get("hnsw:search_ef")
+    if ef and built.get("hnsw:search_ef") != ef:
+        try:
+            collection.modify(configuration={"hnsw": {"ef_search": ef}})
+        except Exception as e:
+            log.warning(f"hnsw_search_ef_not_applied | collection={collection.name} search_ef={ef} | {e}")
+
+
+def reset_handles() -> None:
+    """
+    Forget the cached client and collection handles, so the next init_chroma() re-opens the
+    persisted index (e.g. a long-lived reader after another process re-indexed).
+    """
+    global _CLIENT
+    with _COLLECTIONS_LOCK:
+        _COLLECTIONS.clear()
+        _FILTER_MASKS.clear()
+        _CLIENT = None
+        try:
+            chromadb.api.client.SharedSystemClient.clear_system_cache()
+        except AttributeError:
+            pass
 
 
 def clear_all() -> bool:
     """
-    Delete the Chroma collection if it exists.
+    Delete the Chroma collection if it exists (and the index manifest / near-dup index that describe it).
     Collection will be re-created on next init_chroma() call.
+    The embedding cache is kept on purpose: a rebuild re-reads vectors from it instead of the API.
     """
     client = _get_client()
     try:
         client.delete_collection(COLLECTION_NAME)
     except Exception:
         pass
+    _COLLECTIONS.pop(COLLECTION_NAME, None)
+    _collection_written()
+    _drop_ivfpq_index()
+    clear_manifest()
+    clear_minhash_index()
     return True
 
 
-def query(collection, query_text: str, top_k: int = 5) -> Dict[str, Any]:
-    return collection.query(query_texts=[query_text], n_results=top_k)
+def _collection_written() -> None:
+    """Invalidate what mirrors the collection's contents: the NumPy snapshot and filter masks."""
+    mark_stale()
+    _FILTER_MASKS.clear()
+
+
+def delete_doc(doc_id: str, collection=None) -> None:
+    """Remove every chunk of a document from the collection."""
+    if collection is None:
+        _, collection = init_chroma()
+    _ann_remove(collection, {"doc_id": doc_id})
+    collection.delete(where={"doc_id": doc_id})
+    _collection_written()
+
+
+def delete_stale_chunks(doc_id: str, keep_chunk_ids: List[str], collection=None) -> None:
+    """Remove chunks of doc_id whose chunk_id is not in keep_chunk_ids (e.g. after re-chunking)."""
+    if collection is None:
+        _, collection = init_chroma()
+    if not keep_chunk_ids:
+        where = {"doc_id": doc_id}
+    else:
+        where = {"$and": [{"doc_id": doc_id}, {"chunk_id": {"$nin": list(keep_chunk_ids)}}]}
+    _ann_remove(collection, where)
+    collection.delete(where=where)
+    _collection_written()
+
+
+_RESULT_KEYS = ("ids", "documents", "metadatas", "distances", "embeddings")
+
+
+def query(collection, query_text: str, top_k: int = 5, where: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Top-k chunks for query_text. Embedded here rather than by the collection: queries may need a
+    different prompt than documents (BGE instruction prefix), and the embedder memoizes them.
+    With truncated stored vectors (embedding_store_dims) and rescore_candidates = N > 1, the
+    top_k * N candidates are re-ranked with their full vectors from the embedding cache.
+    `where` (Chroma metadata filter, see retrieval.filters) restricts the search itself to the
+    matching chunks: the top k are the best matching chunks, not the matches among the top k.
+    """
+    return query_batch(collection, [query_text], top_k, where)
+
+
+def query_batch(
+    collection, query_texts: List[str], top_k: int = 5, where: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """query() for several texts at once: one search call, Chroma-style per-query result lists."""
+    cfg = get_settings()                     # once per call; passed down the search path
+    qs = [get_embedder().embed_query(t) for t in query_texts]
+    dims = embedding_store_dims(cfg)
+    factor = int(cfg.get("rescore_candidates") or 0)
+    rescore = bool(dims) and factor > 1 and get_embedding_cache() is not None
+    q_store = [truncate_normalize(q, dims).tolist() for q in qs] if dims else qs
+    space = collection_space(collection)
+    res = _search(collection, q_store, top_k * factor if rescore else top_k, where, cfg, space)
+    if not rescore:
+        return res
+    keys = [k for k in _RESULT_KEYS if res.get(k) is not None]
+    parts = [_rescore_full({k: [res[k][i]] for k in keys}, q, top_k, space) for i, q in enumerate(qs)]
+    return {k: [p[k][0] for p in parts] for k in keys}
+
+
+def _search(
+    collection,
+    q_vectors: List,
+    n_results: int,
+    where: Optional[Dict[str, Any]] = None,
+    cfg: Optional[Dict[str, Any]] = None,
+    space: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Nearest stored vectors (among chunks matching `where`, if given). vector_backend = numpy:
+    the exact NumPy snapshot, if current; ivfpq: the IVF-PQ index, if built; otherwise (or
+    chroma) Chroma's HNSW, which applies `where` before the vector search.
+    `cfg` / `space`: settings and collection_space() already read by the caller (read here otherwise).
+    """
+    cfg = cfg or get_settings()
+    backend = cfg.get("vector_backend")
+    q = np.asarray(q_vectors, dtype=np.float32)
+    signature = index_signature(cfg) if backend in ("numpy", "ivfpq") else ""
+    snapshot = get_numpy_index(signature) if backend == "numpy" else None
+    if snapshot is not None:
+        allowed = _filter_mask(collection, snapshot, where)
+        rows, sims = snapshot.search(q, n_results, allowed=allowed)
+        return _resolve_hits(collection, [snapshot.chunk_ids(r) for r in rows], sims, n_results, where, space)
+    ivf = get_ivfpq_index(signature) if backend == "ivfpq" else None
+    if ivf is not None:
+        # over-fetch: rows of chunks deleted since they were added are dropped when resolving
+        ids, sims = ivf.search(
+            q, 2 * n_results, nprobe=int(cfg.get("ivf_nprobe") or 16), rescore=int(cfg.get("ivf_rescore") or 0),
+            allowed=_filter_mask(collection, ivf, where),
+        )
+        return _resolve_hits(collection, ids, sims, n_results, where, space)
+    if where:
+        return collection.query(query_embeddings=q_vectors, n_results=n_results, where=where)
+    return collection.query(query_embeddings=q_vectors, n_results=n_results)
+
+
+def _filter_mask(collection, index, where: Optional[Dict[str, Any]]) -> Optional[np.ndarray]:
+    """
+    Boolean mask over a local index's rows whose chunks match `where` (None: no filter).
+    Matching ids come from one metadata-only Chroma lookup; masks are cached per filter and
+    index state, dropped on every write through this module and after FILTER_MASK_TTL.
+    """
+    if not where:
+        return None
+    key = (json.dumps(where, sort_keys=True), id(index), index.count)
+    hit = _FILTER_MASKS.get(key)
+    if hit is not None and time.time() - hit[0] < FILTER_MASK_TTL:
+        return hit[1]
+    ids = collection.get(where=where, include=[])["ids"]
+    if index.ids.dtype.kind == "S":                                 # IVF-PQ stores utf-8 bytes
+        wanted = np.array([i.encode("utf-8") for i in ids], dtype=index.ids.dtype)
+    else:
+        wanted = np.array(ids, dtype=str)
+    mask = np.isin(np.asarray(index.ids), wanted) if len(ids) else np.zeros(index.count, dtype=bool)
+    with _FILTER_MASKS_LOCK:
+        if len(_FILTER_MASKS) >= FILTER_MASK_CACHE:
+            _FILTER_MASKS.pop(next(iter(_FILTER_MASKS)))
+        _FILTER_MASKS[key] = (time.time(), mask)
+    return mask
+
+
+def _resolve_hits(
+    collection,
+    ids: List[List[str]],
+    sims,
+    n_results: int,
+    where: Optional[Dict[str, Any]] = None,
+    space: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Chroma-style query result for per-query (chunk ids, cosine similarities) from a local index.
+    With `where`, chunks no longer matching it (metadata changed since the mask was built) are dropped.
+    """
+    space = space or collection_space(collection)
+    wanted = list({i for per_q in ids for i in per_q})
+    # texts and metadata still come from Chroma: a point lookup by id, not an ANN query
+    if not wanted:
+        got = {"ids": []}
+    elif where:
+        got = collection.get(ids=wanted, where=where, include=["documents", "metadatas"])
+    else:
+        got = collection.get(ids=wanted, include=["documents", "metadatas"])
+    by_id = {i: (d, m) for i, d, m in zip(got["ids"], got.get("documents") or [], got.get("metadatas") or [])}
+    out: Dict[str, Any] = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+    for per_q, per_s in zip(ids, sims):
+        keep = [(i, s) for i, s in zip(per_q, per_s) if i in by_id][:n_results]   # deleted since indexed
+        out["ids"].append([i for i, _ in keep])
+        out["documents"].append([by_id[i][0] for i, _ in keep])
+        out["metadatas"].append([by_id[i][1] for i, _ in keep])
+        out["distances"].append([distance_from_similarity(s, space) for _, s in keep])
+    return out
+
+
+# ----------------- NumPy exact-search snapshot -----------------
+def get_numpy_index(signature: Optional[str] = None) -> Optional[NumpyIndex]:
+    """
+    The memory-mapped snapshot (reloaded when a re-export replaces it), or None when it is
+    missing, stale, or built from another embedder / stored dims; callers then use HNSW.
+    `signature`: the active index_signature(), if the caller already has it.
+    """
+    global _NUMPY_INDEX, _NUMPY_WARNED
+    meta = numpy_index_dir() / "meta.json"
+    signature = signature or index_signature()
+    try:
+        if _NUMPY_INDEX is None or meta.stat().st_mtime != _NUMPY_INDEX.meta_mtime:
+            _NUMPY_INDEX = NumpyIndex()
+        problem = None
+        if _NUMPY_INDEX.signature != signature:
+            problem = f"built for {_NUMPY_INDEX.signature}, active {signature}"
+        elif _NUMPY_INDEX.is_stale():
+            problem = "collection changed since the export"
+    except (OSError, ValueError) as e:
+        _NUMPY_INDEX, problem = None, str(e)
+    if problem is None:
+        _NUMPY_WARNED = False
+        return _NUMPY_INDEX
+    if not _NUMPY_WARNED:
+        log.warning(f"numpy_index_unavailable | {problem}; using HNSW until export_numpy_index()")
+        _NUMPY_WARNED = True
+    return None
+
+
+def refresh_vector_index(collection=None) -> Optional[int]:
+    """
+    Bring the configured local index up to date after indexing: re-export a missing or stale
+    NumPy snapshot (vector_backend = numpy), or build a missing IVF-PQ index (ivfpq; once built
+    it grows with every upsert). Returns rows written, None if nothing was needed.
+    """
+    backend = get_settings().get("vector_backend")
+    if backend == "numpy" and get_numpy_index() is None:
+        return export_numpy_index(collection)
+    if backend == "ivfpq" and get_ivfpq_index() is None:
+        return build_ivfpq_index(collection)
+    return None
+
+
+def export_numpy_index(collection=None, page_size: int = 5000) -> int:
+    """Snapshot every stored vector and chunk id of the collection for exact search. Returns rows."""
+    if collection is None:
+        _, collection = init_chroma()
+    total = collection.count()
+    writer = None
+    for offset in range(0, max(total, 1), page_size):
+        got = collection.get(include=["embeddings"], limit=page_size, offset=offset)
+        embs = got.get("embeddings")
+        if embs is None or not len(got["ids"]):
+            break
+        embs = np.asarray(embs, dtype=np.float32)
+        if writer is None:
+            writer = NumpyIndexWriter(total, embs.shape[1])
+        writer.add(got["ids"], embs)
+    if writer is None:
+        writer = NumpyIndexWriter(0, embedding_store_dims() or embedding_dims() or 1)
+    n = writer.commit(index_signature())
+    log.info(f"numpy_index_exported | rows={n} dims={writer.dims} dir={writer.dir}")
+    return n
+
+
+def _rescore_full(res: Dict[str, Any], q, top_k: int, space: str) -> Dict[str, Any]:
+    """
+    Re-rank one query's candidates by exact distance between the full query vector and the
+    full (cached) chunk vectors. Distances stay on the collection's scale (distance_from_similarity);
+    candidates whose full vector is not cached keep their truncated-vector distance.
+    """
+    docs = (res.get("documents") or [[]])[0]
+    if not docs:
+        return res
+    full = get_embedding_cache().get_many(embedding_model(), embedding_dims(), docs, record_stats=False)
+    qn = truncate_normalize(q, 0)
+    dists = list((res.get("distances") or [[]])[0])
+    for i, vec in enumerate(full):
+        if vec is not None:
+            dists[i] = distance_from_similarity(np.dot(qn, truncate_normalize(vec, 0)), space)
+    order = sorted(range(len(docs)), key=dists.__getitem__)[:top_k]
+    out = dict(res)
+    for key in ("ids", "documents", "metadatas", "embeddings"):
+        col = res.get(key)
+        if col is not None and len(col) and col[0] is not None:
+            out[key] = [[col[0][i] for i in order]]
+    out["distances"] = [[dists[i] for i in order]]
+    return out
+
+
+# ----------------- IVF-PQ index -----------------
+def get_ivfpq_index(signature: Optional[str] = None) -> Optional[IVFPQIndex]:
+    """The IVF-PQ index, or None when it is not built or was built for another embedder / stored dims."""
+    global _IVFPQ_INDEX, _IVFPQ_WARNED
+    problem = None
+    signature = signature or index_signature()
+    try:
+        if _IVFPQ_INDEX is None:
+            _IVFPQ_INDEX = IVFPQIndex()
+        if _IVFPQ_INDEX.signature != signature:
+            problem = f"built for {_IVFPQ_INDEX.signature}, active {signature}"
+    except (OSError, ValueError) as e:
+        _IVFPQ_INDEX, problem = None, str(e)
+    if problem is None:
+        _IVFPQ_WARNED = False
+        return _IVFPQ_INDEX
+    if not _IVFPQ_WARNED:
+        log.warning(f"ivfpq_index_unavailable | {problem}; using HNSW until build_ivfpq_index()")
+        _IVFPQ_WARNED = True
+    return None
+
+
+def _drop_ivfpq_index() -> None:
+    global _IVFPQ_INDEX
+    _IVFPQ_INDEX = None
+    clear_ivfpq_index()
+
+
+def build_ivfpq_index(collection=None, page_size: int = 5000) -> int:
+    """
+    Train the IVF-PQ index on a sample of the collection's vectors (whole pages spread across the
+    collection) and add every vector. Returns rows added.
+    """
+    global _IVFPQ_INDEX
+    if collection is None:
+        _, collection = init_chroma()
+    cfg = get_settings()
+    total = collection.count()
+    if total == 0:
+        return 0
+    nlist = int(cfg.get("ivf_nlist") or 0) or auto_nlist(total)
+    want = min(total, max(nlist, 256) * 39)                 # ~39 training points per centroid
+    starts = np.arange(0, total, page_size)
+    picked = np.sort(np.random.default_rng(0).choice(starts, min(len(starts), -(-want // page_size)), replace=False))
+    pages = [collection.get(include=["embeddings"], limit=page_size, offset=int(o))["embeddings"] for o in picked]
+    sample = np.concatenate([np.asarray(p, dtype=np.float32) for p in pages if p is not None and len(p)])[:want]
+
+    t0 = time.time()
+    _IVFPQ_INDEX = None
+    index = IVFPQIndex.train(sample, nlist, int(cfg.get("ivf_pq_m") or 64), index_signature())
+    log.info(f"ivfpq_trained | nlist={index.nlist} m={index.m} sample={len(sample)} seconds={time.time() - t0:.1f}")
+    for offset in range(0, total, page_size):
+        got = collection.get(include=["embeddings"], limit=page_size, offset=offset)
+        if got.get("embeddings") is None or not len(got["ids"]):
+            break
+        index.add(got["ids"], np.asarray(got["embeddings"], dtype=np.float32))
+    _IVFPQ_INDEX = index
+    log.info(f"ivfpq_built | rows={index.count} dir={ivfpq_dir()} seconds={time.time() - t0:.1f}")
+    return index.count
+
+
+def _active_ivfpq() -> Optional[IVFPQIndex]:
+    return get_ivfpq_index() if get_settings().get("vector_backend") == "ivfpq" else None
+
+
+def _ann_add(ids: List[str], vectors, replaced: Iterable[str] = ()) -> None:
+    """
+    Grow the IVF-PQ index with upserted rows (only when it is the configured, built backend).
+    `replaced`: ids of these rows that were already stored, so their old rows are hidden. Given
+    as a mapping id -> stored vector, rows whose vector did not change (metadata-only upserts)
+    keep their existing row instead of being tombstoned and appended again.
+    """
+    index = _active_ivfpq() if ids else None
+    if index is None:
+        return
+    old = replaced if isinstance(replaced, dict) else dict.fromkeys(replaced)
+    x = np.asarray(vectors, dtype=np.float32)
+    keep = [j for j, i in enumerate(ids)
+            if old.get(i) is None or not np.allclose(np.asarray(old[i], dtype=np.float32), x[j], atol=1e-5)]
+    if keep:
+        index.remove([ids[j] for j in keep if ids[j] in old])
+        index.add([ids[j] for j in keep], x[keep])
+
+
+def _stored_vectors(collection, ids: List[str]) -> Dict[str, Any]:
+    """chunk id -> stored embedding, for the ids already in the collection."""
+    res = collection.get(ids=ids, include=["embeddings"])
+    embs = res.get("embeddings")
+    return dict(zip(res.get("ids") or [], embs if embs is not None else [None] * len(res.get("ids") or [])))
+
+
+def _ann_remove(collection, where: Dict[str, Any]) -> None:
+    """Hide the IVF-PQ rows of the chunks matching `where` (call before deleting them)."""
+    index = _active_ivfpq()
+    if index is not None:
+        index.remove(collection.get(where=where, include=[])["ids"])
 
 
 # ----------------- Chunk helpers -----------------
@@ -129,31 +637,167 @@ def _approx_tokens(s: str) -> int:
 
 def add_chunks_batched(
     collection,
-    chunks: List[Dict[str, Any]],
+    chunks: Iterable[Dict[str, Any]],
     max_text_tokens_per_call: int = 280_000,
     max_items_per_call: int = 256,
+    reuse_embeddings: bool = True,
+) -> Dict[str, int]:
+    """
+    Upsert chunks in batches without exceeding token or count limits.
+    `chunks` may be any iterable (e.g. a generator over a chunk store): each batch is flushed as
+    soon as it is full, so memory is bounded by one batch, not by the document.
+    With reuse_embeddings, chunks whose normalized text is already in the collection (same chunk
+    after a metadata-only change, or an identical paragraph in another document) are upserted
+    with the existing vector. The remaining texts go through embed_texts (persistent embedding
+    cache first), so only text never embedded before reaches the embedding API.
+    Returns {chunks, embedded, reused, cache_hits, tokens_embedded, tokens_saved} (tokens ~ chars/4).
+    """
+    stats = {"chunks": 0, "embedded": 0, "reused": 0, "cache_hits": 0, "tokens_embedded": 0, "tokens_saved": 0}
+    batch_ids: List[str] = []
+    batch_docs: List[str] = []
+    batch_metas: List[dict] = []
+    token_sum = 0
+
+    def flush() -> None:
+        # upsert (not add): re-ingesting a document overwrites its chunk ids instead of failing
+        if reuse_embeddings:
+            _upsert_reusing_embeddings(collection, batch_ids, batch_docs, batch_metas, stats)
+        else:
+            vectors = _for_store(embed_texts(batch_docs, stats))
+            replaced = _stored_vectors(collection, batch_ids) if _active_ivfpq() else {}
+            collection.upsert(ids=batch_ids, documents=batch_docs, metadatas=batch_metas, embeddings=vectors)
+            _ann_add(batch_ids, vectors, replaced)
+        stats["chunks"] += len(batch_ids)
+
+    for ch in chunks:
+        doc = ch["text_clean"]
+        t = _approx_tokens(doc)
+        if batch_ids and (token_sum + t > max_text_tokens_per_call or len(batch_ids) >= max_items_per_call):
+            flush()
+            batch_ids, batch_docs, batch_metas = [], [], []
+            token_sum = 0
+        batch_ids.append(ch["chunk_id"])
+        batch_docs.append(doc)
+        batch_metas.append(_sanitize_meta(ch.get("metadata", {})))
+        token_sum += t
+
+    if batch_ids:
+        flush()
+    if stats["chunks"]:
+        _collection_written()
+    return stats
+
+
+def embed_texts(texts: List[str], stats: Optional[Dict[str, int]] = None) -> List[List[float]]:
+    """
+    Embed texts through the persistent embedding cache: cached vectors are returned as-is and
+    only the misses are sent to the embedder (for OpenAI: concurrent, rate-limited requests).
+    Updates stats["embedded" / "cache_hits" / "tokens_embedded" / "tokens_saved"] if given.
+    """
+    stats = stats if stats is not None else {}
+    cache = get_embedding_cache()
+    model, dims = embedding_model(), embedding_dims()
+    vectors: List[Optional[List[float]]] = [None] * len(texts)
+    if cache is not None:
+        for k, vec in enumerate(cache.get_many(model, dims, texts)):
+            if vec is not None:
+                vectors[k] = vec.tolist()
+    misses = [k for k, v in enumerate(vectors) if v is None]
+    hit_tokens = sum(_approx_tokens(t) for t, v in zip(texts, vectors) if v is not None)
+
+    if misses:
+        fresh = get_embedder().embed_documents([texts[k] for k in misses])
+        for k, vec in zip(misses, fresh):
+            vectors[k] = _as_list(vec)
+        if cache is not None:
+            cache.put_many(model, dims, [texts[k] for k in misses], [vectors[k] for k in misses])
+
+    stats["embedded"] = stats.get("embedded", 0) + len(misses)
+    stats["cache_hits"] = stats.get("cache_hits", 0) + len(texts) - len(misses)
+    stats["tokens_embedded"] = stats.get("tokens_embedded", 0) + sum(_approx_tokens(texts[k]) for k in misses)
+    stats["tokens_saved"] = stats.get("tokens_saved", 0) + hit_tokens
+    return vectors
+
+
+def _as_list(vec) -> List[float]:
+    return vec.tolist() if hasattr(vec, "tolist") else list(vec)
+
+
+def _known_vectors(collection, ids: List[str], metas: List[dict]) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    """
+    (text_hash -> stored embedding, for hashes of this batch already in the collection;
+     chunk id -> text_hash of the stored text, for ids of this batch already in the collection).
+    """
+    found: Dict[str, Any] = {}
+    stored: Dict[str, str] = {}
+    # 1) Same chunk ids: reusable when the stored text is unchanged (covers chunks indexed
+    #    before text_hash existed, and metadata-only updates such as a title edit)
+    res = collection.get(ids=ids, include=["documents", "embeddings"])
+    embs = res.get("embeddings")
+    if embs is not None:
+        for cid, doc, emb in zip(res.get("ids") or [], res.get("documents") or [], embs):
+            if doc is not None and emb is not None:
+                stored[cid] = text_hash(doc)
+                found.setdefault(stored[cid], emb)
+    # 2) Identical text anywhere else in the corpus
+    missing = list({m["text_hash"] for m in metas} - found.keys())
+    if missing:
+        res = collection.get(where={"text_hash": {"$in": missing}}, include=["metadatas", "embeddings"])
+        embs = res.get("embeddings")
+        if embs is not None:
+            for meta, emb in zip(res.get("metadatas") or [], embs):
+                if meta and emb is not None:
+                    found.setdefault(meta.get("text_hash"), emb)
+    return found, stored
+
+
+def _upsert_reusing_embeddings(
+    collection,
+    ids: List[str],
+    docs: List[str],
+    metas: List[dict],
+    stats: Dict[str, int],
 ) -> None:
-    """Upsert chunks in batches without exceeding token or count limits."""
-    i = 0
-    n = len(chunks)
-    while i < n:
-        batch_ids, batch_docs, batch_metas = [], [], []
-        token_sum = 0
-        count = 0
-        while i < n and count < max_items_per_call:
-            ch = chunks[i]
-            doc = ch["text_clean"]
-            t = _approx_tokens(doc)
-            if token_sum + t > max_text_tokens_per_call and count > 0:
-                break
-            batch_ids.append(ch["chunk_id"])
-            batch_docs.append(doc)
-            batch_metas.append(_sanitize_meta(ch.get("metadata", {})))
-            token_sum += t
-            count += 1
-            i += 1
-
-        collection.add(ids=batch_ids, documents=batch_docs, metadatas=batch_metas)
+    for m, d in zip(metas, docs):
+        m.setdefault("text_hash", text_hash(d))
+    found, stored = _known_vectors(collection, ids, metas)
+
+    # Misses: embed each distinct text once; in-batch copies reuse the fresh vector afterwards
+    first: Dict[str, int] = {}
+    hits: List[int] = []
+    for k, m in enumerate(metas):
+        h = m["text_hash"]
+        if h in found or h in first:
+            hits.append(k)
+        else:
+            first[h] = k
+    fresh = list(first.values())
+
+    if fresh:
+        vectors = _for_store(embed_texts([docs[k] for k in fresh], stats))
+        collection.upsert(
+            ids=[ids[k] for k in fresh],
+            documents=[docs[k] for k in fresh],
+            metadatas=[metas[k] for k in fresh],
+            embeddings=vectors,
+        )
+        _ann_add([ids[k] for k in fresh], vectors, replaced=list(stored))
+        for k, vec in zip(fresh, vectors):
+            found.setdefault(metas[k]["text_hash"], vec)
+
+    if hits:
+        reused = [_as_list(found[metas[k]["text_hash"]]) for k in hits]
+        collection.upsert(
+            ids=[ids[k] for k in hits],
+            documents=[docs[k] for k in hits],
+            metadatas=[metas[k] for k in hits],
+            embeddings=reused,
+        )
+        # chunks re-upserted with unchanged text already have their vector in the ANN index
+        added = [j for j, k in enumerate(hits) if stored.get(ids[k]) != metas[k]["text_hash"]]
+        _ann_add([ids[hits[j]] for j in added], [reused[j] for j in added], replaced=list(stored))
+        stats["reused"] += len(hits)
+        stats["tokens_saved"] += sum(_approx_tokens(docs[k]) for k in hits)
 
 
 # ----------------- Stats -----------------
@@ -166,6 +810,25 @@ def collection_count(collection=None) -> int:
         return 0
 
 
+def is_doc_indexed(doc_id: str, collection=None) -> bool:
+    """Cheap membership check: does the collection hold at least one chunk for doc_id?"""
+    if collection is None:
+        _, collection = init_chroma()
+    try:
+        res = collection.get(where={"doc_id": doc_id}, limit=1, include=[])
+        return len(res.get("ids", [])) > 0
+    except Exception:
+        return False
+
+
+def indexed_doc_ids(collection=None) -> set:
+    """All doc_ids present in the collection (full metadata scan; use sparingly)."""
+    if collection is None:
+        _, collection = init_chroma()
+    data = collection.get(include=["metadatas"])
+    return {m.get("doc_id") for m in data["metadatas"] if m and m.get("doc_id")}
+
+
 def corpus_stats() -> dict:
     """Return {docs, chunks} or empty if no collection yet."""
     try:
@@ -0,0 +1,264 @@
+# src/indexing/embed_batcher.py
+from __future__ import annotations
+import json
+import os
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from utils.config import get_settings
+from utils.logging_utils import get_logger
+
+try:  # optional: exact token counts for batch sizing / TPM accounting
+    import tiktoken
+    _ENC = tiktoken.get_encoding("cl100k_base")
+except Exception:
+    _ENC = None
+
+log = get_logger("embed_batcher")
+
+# Concurrent embedding client for the OpenAI-compatible POST {base_url}/embeddings endpoint.
+#   - batches are cut by token count (tiktoken if installed, else ~4 chars/token) and up to
+#     `concurrency` of them are in flight at once
+#   - every request first takes 1 request from the RPM bucket and its tokens from the TPM bucket
+#   - 429 / 5xx / connection errors are retried with jittered exponential backoff (Retry-After wins)
+#   - the batch size adapts: grows while requests are fast, shrinks when they are slow or throttled
+MAX_INPUTS_PER_REQUEST = 2048     # API limit
+MIN_BATCH_TOKENS = 512
+MAX_BATCH_TOKENS = 250_000        # stays under the 300k tokens/request API limit
+_BACKOFF_BASE = 0.5
+_BACKOFF_CAP = 30.0
+_GROW, _SHRINK, _THROTTLE = 1.25, 0.7, 0.5
+
+
+def count_tokens(text: str) -> int:
+    if _ENC is not None:
+        return max(1, len(_ENC.encode(text, disallowed_special=())))
+    return max(1, len(text) // 4)
+
+
+class EmbeddingAPIError(RuntimeError):
+    def __init__(self, message: str, status: Optional[int] = None, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+    @property
+    def retryable(self) -> bool:
+        return self.status is None or self.status == 429 or self.status >= 500
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled continuously at `per_minute` / 60 per second.
+    Capacity is one minute of budget; per_minute <= 0 disables the limit.
+    """
+
+    def __init__(self, per_minute: float):
+        self.per_minute = float(per_minute or 0)
+        self.rate = self.per_minute / 60.0
+        self.capacity = self.per_minute
+        self.tokens = self.capacity
+        self._t = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._t) * self.rate)
+        self._t = now
+
+    def acquire(self, n: float) -> float:
+        """Block until n tokens are available and take them. Returns seconds waited."""
+        if self.per_minute <= 0:
+            return 0.0
+        n = min(n, self.capacity)   # a single oversized request must still be able to go through
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= n:
+                    self.tokens -= n
+                    return waited
+                delay = (n - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def charge(self, n: float) -> None:
+        """Take n more tokens without waiting (may go negative, delaying later acquires)."""
+        if self.per_minute > 0 and n:
+            with self._lock:
+                self._refill()
+                self.tokens -= n
+
+
+class OpenAIEmbeddingsHTTP:
+    """Minimal stdlib client for POST {base_url}/embeddings (OpenAI and compatible servers)."""
+
+    def __init__(
+        self,
+        model: str,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        dimensions: int = 0,
+        timeout: float = 60.0,
+    ):
+        self.model = model
+        self.api_key = api_key if api_key is not None else os.getenv("OPENAI_API_KEY", "")
+        self.base_url = (base_url or os.getenv("OPENAI_BASE_URL") or "https://api.openai.com/v1").rstrip("/")
+        self.dimensions = dimensions
+        self.timeout = timeout
+
+    def __call__(self, texts: List[str]) -> Tuple[List[List[float]], int]:
+        """Returns (vectors in input order, prompt tokens reported by the server or 0)."""
+        body: Dict[str, Any] = {"model": self.model, "input": texts}
+        if self.dimensions:
+            body["dimensions"] = self.dimensions
+        req = urllib.request.Request(
+            f"{self.base_url}/embeddings",
+            data=json.dumps(body).encode("utf-8"),
+            headers={"Content-Type": "application/json", "Authorization": f"Bearer {self.api_key}"},
+            method="POST",
+        )
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+                payload = json.loads(resp.read())
+        except urllib.error.HTTPError as e:
+            retry_after = e.headers.get("Retry-After") if e.headers else None
+            try:
+                retry_after = float(retry_after) if retry_after is not None else None
+            except ValueError:
+                retry_after = None
+            detail = e.read()[:300].decode("utf-8", "replace")
+            raise EmbeddingAPIError(f"HTTP {e.code}: {detail}", status=e.code, retry_after=retry_after) from e
+        except (urllib.error.URLError, TimeoutError, ConnectionError) as e:
+            raise EmbeddingAPIError(f"connection error: {e}") from e
+
+        data = sorted(payload["data"], key=lambda d: d["index"])
+        if len(data) != len(texts):
+            raise EmbeddingAPIError(f"expected {len(texts)} embeddings, got {len(data)}", status=500)
+        return [d["embedding"] for d in data], int((payload.get("usage") or {}).get("prompt_tokens", 0))
+
+
+class EmbeddingBatcher:
+    """
+    Embed many texts with several concurrent, rate-limited requests. `embed_call(texts)` must
+    return (vectors, reported_tokens) and raise EmbeddingAPIError on failures.
+    One instance is meant to be shared (the buckets are the process-wide budget).
+    """
+
+    def __init__(
+        self,
+        embed_call: Callable[[List[str]], Tuple[List[List[float]], int]],
+        concurrency: Optional[int] = None,
+        tpm: Optional[int] = None,
+        rpm: Optional[int] = None,
+        batch_tokens: Optional[int] = None,
+        target_latency: Optional[float] = None,
+        max_retries: Optional[int] = None,
+    ):
+        cfg = get_settings()
+        self.embed_call = embed_call
+        self.concurrency = max(1, int(concurrency or cfg.get("embed_concurrency", 4)))
+        self.tpm = TokenBucket(cfg.get("embed_tpm", 1_000_000) if tpm is None else tpm)
+        self.rpm = TokenBucket(cfg.get("embed_rpm", 3_000) if rpm is None else rpm)
+        self.batch_tokens = float(batch_tokens or cfg.get("embed_batch_tokens", 8_192))
+        self.target_latency = float(target_latency or cfg.get("embed_target_latency_s", 3.0))
+        self.max_retries = int(cfg.get("embed_max_retries", 6) if max_retries is None else max_retries)
+        self._lock = threading.Lock()
+        self.stats: Dict[str, float] = {
+            "requests": 0, "texts": 0, "tokens": 0, "errors": 0, "retries": 0, "throttled": 0, "rate_wait_s": 0.0,
+        }
+
+    # ---------- batching ----------
+    def _cut(self, items: List[Tuple[int, str, int]], start: int) -> int:
+        """End index of the next batch starting at `start`, sized by the current token target."""
+        with self._lock:
+            budget = self.batch_tokens
+        end, tokens = start, 0
+        while end < len(items) and end - start < MAX_INPUTS_PER_REQUEST:
+            t = items[end][2]
+            if end > start and tokens + t > budget:
+                break
+            tokens += t
+            end += 1
+        return end
+
+    def _adapt(self, latency: float, throttled: bool) -> None:
+        with self._lock:
+            if throttled:
+                self.batch_tokens *= _THROTTLE
+            elif latency > self.target_latency:
+                self.batch_tokens *= _SHRINK
+            elif latency < self.target_latency / 2:
+                self.batch_tokens *= _GROW
+            self.batch_tokens = min(MAX_BATCH_TOKENS, max(MIN_BATCH_TOKENS, self.batch_tokens))
+
+    def _bump(self, **kw: float) -> None:
+        with self._lock:
+            for k, v in kw.items():
+                self.stats[k] += v
+
+    # ---------- one request ----------
+    def _request(self, texts: List[str], tokens: int, adapt: bool = True) -> List[List[float]]:
+        for attempt in range(self.max_retries + 1):
+            waited = self.rpm.acquire(1) + self.tpm.acquire(tokens)
+            t0 = time.monotonic()
+            try:
+                vectors, reported = self.embed_call(texts)
+            except EmbeddingAPIError as e:
+                throttled = e.status == 429
+                self._bump(errors=1, throttled=int(throttled), rate_wait_s=waited)
+                if throttled and adapt:
+                    self._adapt(0.0, throttled=True)
+                if not e.retryable or attempt == self.max_retries:
+                    raise
+                self._bump(retries=1)
+                delay = e.retry_after if e.retry_after is not None else \
+                    min(_BACKOFF_CAP, _BACKOFF_BASE * 2 ** attempt) * random.uniform(0.5, 1.5)
+                log.warning(f"embed_retry | attempt={attempt + 1} texts={len(texts)} sleep={delay:.2f}s: {e}")
+                time.sleep(delay)
+                continue
+            if reported > tokens:
+                self.tpm.charge(reported - tokens)   # our estimate was low: pay the difference
+            if adapt:
+                self._adapt(time.monotonic() - t0, throttled=False)
+            self._bump(requests=1, texts=len(texts), tokens=reported or tokens, rate_wait_s=waited)
+            return vectors
+        raise AssertionError("unreachable")
+
+    # ---------- public ----------
+    def embed_one(self, text: str) -> List[float]:
+        """
+        One vector in a single request on the calling thread (queries): same RPM/TPM budget and
+        retries as embed(), but its latency does not steer the batch size.
+        """
+        return self._request([text], count_tokens(text), adapt=False)[0]
+
+    def embed(self, texts: Sequence[str]) -> List[List[float]]:
+        """Vectors for `texts`, in order. Raises the last EmbeddingAPIError if a batch keeps failing."""
+        items = [(i, t, count_tokens(t)) for i, t in enumerate(texts)]
+        out: List[Optional[List[float]]] = [None] * len(items)
+        if not items:
+            return []
+        # longest first: big batches start early and the tail is made of small, quick ones
+        items.sort(key=lambda it: -it[2])
+        pos = 0
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="embed") as pool:
+            running = {}
+            while pos < len(items) or running:
+                while pos < len(items) and len(running) < self.concurrency:
+                    end = self._cut(items, pos)
+                    batch = items[pos:end]
+                    fut = pool.submit(self._request, [b[1] for b in batch], sum(b[2] for b in batch))
+                    running[fut] = batch
+                    pos = end
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    batch = running.pop(fut)
+                    for (i, _, _), vec in zip(batch, fut.result()):
+                        out[i] = vec
+        return out
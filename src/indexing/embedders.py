@@ -0,0 +1,312 @@
+# src/indexing/embedders.py
+from __future__ import annotations
+import inspect
+import os
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from indexing.embed_batcher import EmbeddingBatcher, OpenAIEmbeddingsHTTP
+from utils.config import get_settings
+from utils.logging_utils import get_logger
+from utils.paths import indexes_dir
+
+log = get_logger("embedders")
+
+# Embedding backends, selected by `embedding_backend` in config.yaml:
+#   openai  OpenAI /embeddings (model from OPENAI_EMBED_MODEL); documents go through the
+#           concurrent, rate-limited EmbeddingBatcher
+#   local   in-process CPU model (`embedding_model`, a BGE / BERT-style encoder): CLS pooling +
+#           L2 norm, length-bucketed batches, optional int8 (torch dynamic quantization or
+#           ONNX Runtime), thread count from `embedding_threads`
+# Every backend is also a Chroma embedding function (__call__(input)), and exposes `name`,
+# which keys the embedding cache, so vectors of different backends/models never mix.
+TINY_MODEL = "tiny-random-bge"     # offline test model: same architecture, random weights
+_QUERY_CACHE_SIZE = 256
+
+
+class Embedder(ABC):
+    """Backend interface: embed_documents / embed_query return L2-normalized float vectors."""
+
+    name: str = ""
+
+    def __init__(self):
+        self._query_cache: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._query_lock = threading.Lock()
+
+    @abstractmethod
+    def embed_documents(self, texts: Sequence[str]) -> List[List[float]]:
+        ...
+
+    def _embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    def embed_query(self, text: str) -> List[float]:
+        """Query vector; the last few queries are memoized (UI reruns repeat them)."""
+        with self._query_lock:
+            vec = self._query_cache.get(text)
+            if vec is not None:
+                self._query_cache.move_to_end(text)
+                return vec
+        vec = self._embed_query(text)
+        with self._query_lock:
+            self._query_cache[text] = vec
+            while len(self._query_cache) > _QUERY_CACHE_SIZE:
+                self._query_cache.popitem(last=False)
+        return vec
+
+    # Chroma EmbeddingFunction protocol
+    def __call__(self, input: Sequence[str]) -> List[List[float]]:
+        return self.embed_documents(list(input))
+
+
+# ==============================
+# OpenAI
+# ==============================
+class OpenAIEmbedder(Embedder):
+    def __init__(self, model: str, dimensions: int = 0, api_key: Optional[str] = None):
+        api_key = api_key if api_key is not None else os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            raise RuntimeError("OPENAI_API_KEY not found in environment or .env")
+        super().__init__()
+        self.name = model
+        self.dimensions = dimensions
+        self.client = OpenAIEmbeddingsHTTP(model, api_key=api_key, dimensions=dimensions)
+        self.batcher = EmbeddingBatcher(self.client)
+
+    def embed_documents(self, texts: Sequence[str]) -> List[List[float]]:
+        return self.batcher.embed(texts)
+
+    def _embed_query(self, text: str) -> List[float]:
+        # one small request: no need for the batcher's thread pool, but keep its budget and retries
+        return self.batcher.embed_one(text)
+
+
+# ==============================
+# Local CPU (BGE / BERT encoders)
+# ==============================
+def _length_buckets(lengths: Sequence[int], max_tokens: int, max_batch: int) -> Iterator[List[int]]:
+    """
+    Group indices by similar length: sorted by length, a batch is closed when its padded size
+    (items x longest) would exceed max_tokens. Keeps padding, hence wasted compute, small.
+    """
+    batch: List[int] = []
+    longest = 0
+    for i in sorted(range(len(lengths)), key=lengths.__getitem__):
+        n = lengths[i]
+        if batch and ((len(batch) + 1) * max(longest, n) > max_tokens or len(batch) >= max_batch):
+            yield batch
+            batch, longest = [], 0
+        batch.append(i)
+        longest = max(longest, n)
+    if batch:
+        yield batch
+
+
+def build_tiny_bge(seed: int = 0):
+    """
+    (tokenizer, model) with the BGE/BERT architecture but 2 layers x 32 hidden units and random
+    weights, built without any download: a character-level WordPiece vocab is generated on the fly.
+    Vectors carry no semantics (similar spellings land close) but are deterministic; for offline
+    tests and benchmarks of the plumbing.
+    """
+    import torch
+    from tokenizers import Tokenizer, normalizers, pre_tokenizers, processors
+    from tokenizers.models import WordPiece
+    from transformers import BertConfig, BertModel, PreTrainedTokenizerFast
+
+    chars = [chr(c) for c in range(33, 127) if not chr(c).isupper()]
+    vocab = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + chars + [f"##{c}" for c in chars]
+    ids = {tok: i for i, tok in enumerate(vocab)}
+    tk = Tokenizer(WordPiece(ids, unk_token="[UNK]", max_input_chars_per_word=100))
+    tk.normalizer = normalizers.BertNormalizer(lowercase=True)
+    tk.pre_tokenizer = pre_tokenizers.BertPreTokenizer()
+    tk.post_processor = processors.TemplateProcessing(
+        single="[CLS] $A [SEP]", special_tokens=[("[CLS]", ids["[CLS]"]), ("[SEP]", ids["[SEP]"])],
+    )
+    tokenizer = PreTrainedTokenizerFast(
+        tokenizer_object=tk, unk_token="[UNK]", pad_token="[PAD]", cls_token="[CLS]",
+        sep_token="[SEP]", mask_token="[MASK]",
+    )
+    config = BertConfig(
+        vocab_size=len(vocab), hidden_size=32, num_hidden_layers=2, num_attention_heads=2,
+        intermediate_size=64, max_position_embeddings=512,
+        initializer_range=0.5,   # BERT's 0.02 makes every random-init CLS vector (nearly) the same
+    )
+    torch.manual_seed(seed)
+    return tokenizer, BertModel(config).eval()
+
+
+def _export_wrapper(hf_model):
+    """Export wrapper: keyword call into the HF model, last_hidden_state as the only output."""
+    import torch
+
+    class HiddenStates(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, input_ids, attention_mask):
+            return self.model(input_ids=input_ids, attention_mask=attention_mask).last_hidden_state
+
+    return HiddenStates(hf_model).eval()
+
+
+class LocalBgeEmbedder(Embedder):
+    """
+    CPU encoder with CLS pooling + L2 normalization (the BGE recipe). Queries get the model's
+    retrieval instruction prefix; documents don't.
+      runtime="torch": transformers model, optionally int8 via torch dynamic quantization
+      runtime="onnx":  exported once to data/indexes/onnx/, run with ONNX Runtime (int8 optional)
+    """
+
+    def __init__(
+        self,
+        model: str,
+        runtime: str = "torch",
+        quantize: str = "none",
+        threads: int = 0,
+        max_length: int = 512,
+        batch_tokens: int = 16_384,
+        max_batch: int = 64,
+        query_instruction: Optional[str] = None,
+    ):
+        super().__init__()
+        if runtime not in ("torch", "onnx"):
+            raise ValueError(f"embedding_runtime must be 'torch' or 'onnx', got {runtime!r}")
+        if quantize not in ("none", "int8"):
+            raise ValueError(f"embedding_quantize must be 'none' or 'int8', got {quantize!r}")
+        try:
+            import torch
+            from transformers import AutoModel, AutoTokenizer
+        except ImportError as e:
+            raise RuntimeError(
+                "embedding_backend 'local' needs 'torch' and 'transformers' (and 'onnxruntime' for runtime onnx)"
+            ) from e
+
+        if threads:
+            torch.set_num_threads(threads)
+        self.model_name = model
+        self.runtime = runtime
+        self.quantize = quantize
+        self.threads = threads
+        self.max_length = max_length
+        self.batch_tokens = batch_tokens
+        self.max_batch = max_batch
+        if query_instruction is None:
+            query_instruction = "Represent this sentence for searching relevant passages: " \
+                if "bge" in model.lower() and "-zh" not in model.lower() else ""
+        self.query_instruction = query_instruction
+        self.name = f"local:{model}" + (f"#{runtime}-int8" if quantize == "int8" else "")
+        self._lock = threading.Lock()   # torch / ORT sessions parallelize internally
+
+        if model == TINY_MODEL:
+            self.tokenizer, hf_model = build_tiny_bge()
+        else:
+            self.tokenizer = AutoTokenizer.from_pretrained(model)
+            hf_model = AutoModel.from_pretrained(model).eval()
+        self.dims = int(hf_model.config.hidden_size)
+
+        self._session = None
+        self._torch_model = None
+        if runtime == "onnx":
+            self._session = self._onnx_session(hf_model)
+        else:
+            if quantize == "int8":
+                hf_model = torch.quantization.quantize_dynamic(hf_model, {torch.nn.Linear}, dtype=torch.qint8)
+            self._torch_model = hf_model
+        log.info(f"local_embedder_ready | model={model} runtime={runtime} quantize={quantize} "
+                 f"threads={threads or torch.get_num_threads()} dims={self.dims}")
+
+    # ---------- ONNX ----------
+    def _onnx_session(self, hf_model):
+        import onnxruntime as ort
+        import torch
+
+        out_dir = indexes_dir() / "onnx"
+        out_dir.mkdir(parents=True, exist_ok=True)
+        stem = self.model_name.replace("/", "__")
+        fp32 = out_dir / f"{stem}.onnx"
+        path = fp32
+        if self.model_name == TINY_MODEL or not fp32.exists():
+            dummy = self.tokenizer(["warm up"], return_tensors="pt")
+            tmp = fp32.with_name(fp32.name + f".tmp{os.getpid()}")
+            kwargs = dict(
+                input_names=["input_ids", "attention_mask"], output_names=["last_hidden_state"],
+                dynamic_axes={"input_ids": {0: "batch", 1: "seq"}, "attention_mask": {0: "batch", 1: "seq"},
+                              "last_hidden_state": {0: "batch", 1: "seq"}},
+                opset_version=17,
+            )
+            if "dynamo" in inspect.signature(torch.onnx.export).parameters:
+                kwargs["dynamo"] = False   # TorchScript exporter: no 'onnxscript' dependency
+            torch.onnx.export(_export_wrapper(hf_model), (dummy["input_ids"], dummy["attention_mask"]), str(tmp), **kwargs)
+            os.replace(tmp, fp32)
+        if self.quantize == "int8":
+            path = out_dir / f"{stem}.int8.onnx"
+            if self.model_name == TINY_MODEL or not path.exists() or path.stat().st_mtime < fp32.stat().st_mtime:
+                from onnxruntime.quantization import QuantType, quantize_dynamic
+                quantize_dynamic(str(fp32), str(path), weight_type=QuantType.QInt8)
+
+        opts = ort.SessionOptions()
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if self.threads:
+            opts.intra_op_num_threads = self.threads
+        return ort.InferenceSession(str(path), opts, providers=["CPUExecutionProvider"])
+
+    # ---------- encoding ----------
+    def _encode_batch(self, input_ids: List[List[int]]) -> np.ndarray:
+        padded = self.tokenizer.pad({"input_ids": input_ids}, return_tensors="np")
+        ids = padded["input_ids"].astype(np.int64)
+        mask = padded["attention_mask"].astype(np.int64)
+        with self._lock:
+            if self._session is not None:
+                hidden = self._session.run(["last_hidden_state"], {"input_ids": ids, "attention_mask": mask})[0]
+                cls = hidden[:, 0]
+            else:
+                import torch
+                with torch.inference_mode():
+                    out = self._torch_model(input_ids=torch.from_numpy(ids), attention_mask=torch.from_numpy(mask))
+                cls = out.last_hidden_state[:, 0].float().numpy()
+        norms = np.linalg.norm(cls, axis=1, keepdims=True)
+        return cls / np.maximum(norms, 1e-12)
+
+    def _encode(self, texts: Sequence[str]) -> np.ndarray:
+        enc = self.tokenizer(list(texts), truncation=True, max_length=self.max_length)["input_ids"]
+        out = np.zeros((len(texts), self.dims), dtype=np.float32)
+        for idx in _length_buckets([len(e) for e in enc], self.batch_tokens, self.max_batch):
+            out[idx] = self._encode_batch([enc[i] for i in idx])
+        return out
+
+    def embed_documents(self, texts: Sequence[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        return self._encode(texts).tolist()
+
+    def _embed_query(self, text: str) -> List[float]:
+        return self._encode([self.query_instruction + text])[0].tolist()
+
+
+# ==============================
+# Factory
+# ==============================
+def make_embedder(backend: Optional[str] = None) -> Embedder:
+    cfg = get_settings()
+    backend = backend or str(cfg.get("embedding_backend", "openai"))
+    if backend == "openai":
+        return OpenAIEmbedder(
+            os.getenv("OPENAI_EMBED_MODEL", "text-embedding-3-small"),
+            dimensions=int(cfg.get("embedding_dimensions") or 0),
+        )
+    if backend == "local":
+        return LocalBgeEmbedder(
+            str(cfg.get("embedding_model", "BAAI/bge-large-en-v1.5")),
+            runtime=str(cfg.get("embedding_runtime", "torch")),
+            quantize=str(cfg.get("embedding_quantize", "none")),
+            threads=int(cfg.get("embedding_threads", 0) or 0),
+            max_length=int(cfg.get("embedding_max_length", 512)),
+            batch_tokens=int(cfg.get("embedding_batch_tokens_local", 16_384)),
+        )
+    raise ValueError(f"Unknown embedding_backend {backend!r} (expected 'openai' or 'local')")
@@ -0,0 +1,250 @@
+# src/indexing/embedding_cache.py
+from __future__ import annotations
+import hashlib
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from indexing.vector_codec import DTYPES, from_blob, to_blob
+from utils.config import get_settings
+from utils.logging_utils import get_logger
+from utils.paths import indexes_dir
+
+log = get_logger("embedding_cache")
+
+# Persistent embedding cache: data/indexes/embedding_cache/embeddings.sqlite3
+#   vectors(model, dims, key, dtype, vec, last_used)   key = sha256 of the exact text sent to the API
+#   meta(name, value)                                  running totals: bytes, hits, misses, evictions
+# dims = requested output dimensions (0 = model default), so truncated and full-size vectors of
+# the same model never mix. Vectors are stored as float16, float32 or int8 (embedding_cache_dtype,
+# see indexing.vector_codec) and always returned as float32. Unlike the Chroma collection, the
+# cache survives clear_all(), so a "wipe and rebuild" reindex only pays for text that was never
+# embedded before. It also holds the full-dimension vectors used for rescoring when the
+# collection stores truncated ones (embedding_store_dims).
+# Size is capped with LRU eviction (last_used is bumped on every hit).
+CACHE_VERSION = 1            # stored as PRAGMA user_version; a mismatch resets the cache
+_EVICT_TO = 0.9              # evict down to this share of the cap, so a full cache doesn't evict on every put
+_SQL_VARS = 500              # keys per IN (...) query
+
+
+def cache_dir() -> Path:
+    d = indexes_dir() / "embedding_cache"
+    d.mkdir(parents=True, exist_ok=True)
+    return d
+
+
+def text_key(text: str) -> bytes:
+    return hashlib.sha256(text.encode("utf-8")).digest()
+
+
+class EmbeddingCache:
+    """
+    SQLite-backed (model, dims, sha256(text)) -> vector cache.
+    Connections are short-lived (WAL mode), so one instance can be shared by worker threads.
+    Hit/miss counters are kept per instance (session) and accumulated in the meta table.
+    """
+
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        max_bytes: Optional[int] = None,
+        dtype: Optional[str] = None,
+    ):
+        cfg = get_settings()
+        self.path = Path(path) if path else cache_dir() / "embeddings.sqlite3"
+        if max_bytes is None:
+            max_bytes = int(cfg.get("embedding_cache_max_mb", 1024)) * 1024 * 1024
+        self.max_bytes = max_bytes
+        self.dtype = dtype or str(cfg.get("embedding_cache_dtype", "float16"))
+        if self.dtype not in DTYPES:
+            raise ValueError(f"embedding_cache_dtype must be one of {DTYPES}, got {self.dtype!r}")
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        with closing(self._connect()) as con, con:
+            if con.execute("PRAGMA user_version").fetchone()[0] != CACHE_VERSION:
+                con.executescript("DROP TABLE IF EXISTS vectors; DROP TABLE IF EXISTS meta;")
+                con.execute(f"PRAGMA user_version = {CACHE_VERSION}")
+            con.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS vectors (
+                    model TEXT NOT NULL,
+                    dims INTEGER NOT NULL,
+                    key BLOB NOT NULL,
+                    dtype TEXT NOT NULL,
+                    vec BLOB NOT NULL,
+                    last_used REAL NOT NULL,
+                    PRIMARY KEY (model, dims, key)
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS vectors_lru ON vectors (last_used);
+                CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+                """
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        con = sqlite3.connect(self.path, timeout=30)
+        con.execute("PRAGMA journal_mode=WAL")
+        return con
+
+    @staticmethod
+    def _bump(con: sqlite3.Connection, name: str, delta: int) -> None:
+        if delta:
+            con.execute(
+                "INSERT INTO meta (name, value) VALUES (?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+                (name, delta),
+            )
+
+    # ---------- lookups ----------
+    def get_many(
+        self,
+        model: str,
+        dims: int,
+        texts: Sequence[str],
+        record_stats: bool = True,
+    ) -> List[Optional[np.ndarray]]:
+        """
+        Cached float32 vector per text (None on a miss). Hits are LRU-touched.
+        record_stats=False keeps lookups that are not embedding requests (rescoring) out of the hit rate.
+        """
+        keys = [text_key(t) for t in texts]
+        found: Dict[bytes, np.ndarray] = {}
+        uniq = list(dict.fromkeys(keys))
+        with closing(self._connect()) as con, con:
+            for s in range(0, len(uniq), _SQL_VARS):
+                part = uniq[s:s + _SQL_VARS]
+                marks = ",".join("?" * len(part))
+                rows = con.execute(
+                    f"SELECT key, dtype, vec FROM vectors WHERE model = ? AND dims = ? AND key IN ({marks})",
+                    [model, dims, *part],
+                ).fetchall()
+                for key, dtype, blob in rows:
+                    found[key] = from_blob(blob, dtype)
+            if found:
+                now = time.time()
+                con.executemany(
+                    "UPDATE vectors SET last_used = ? WHERE model = ? AND dims = ? AND key = ?",
+                    [(now, model, dims, k) for k in found],
+                )
+            out = [found.get(k) for k in keys]
+            hits = sum(v is not None for v in out)
+            if not record_stats:
+                return out
+            self._bump(con, "hits", hits)
+            self._bump(con, "misses", len(out) - hits)
+        with self._lock:
+            self.hits += hits
+            self.misses += len(out) - hits
+        return out
+
+    def load_vectors(self, model: str, dims: int, limit: Optional[int] = None) -> np.ndarray:
+        """All cached vectors of (model, dims) as an (n, d) float32 array (benchmarks, sweeps)."""
+        sql = "SELECT dtype, vec FROM vectors WHERE model = ? AND dims = ?" + (f" LIMIT {int(limit)}" if limit else "")
+        with closing(self._connect()) as con:
+            rows = con.execute(sql, (model, dims)).fetchall()
+        if not rows:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.stack([from_blob(b, dt) for dt, b in rows])
+
+    def put_many(self, model: str, dims: int, texts: Sequence[str], vectors: Sequence) -> None:
+        if not texts:
+            return
+        now = time.time()
+        rows = {}
+        for t, v in zip(texts, vectors):
+            rows[text_key(t)] = to_blob(v, self.dtype)
+        with closing(self._connect()) as con, con:
+            # bytes already stored under these keys are replaced, not added
+            old = 0
+            keys = list(rows)
+            for s in range(0, len(keys), _SQL_VARS):
+                part = keys[s:s + _SQL_VARS]
+                marks = ",".join("?" * len(part))
+                old += con.execute(
+                    f"SELECT COALESCE(SUM(LENGTH(vec)), 0) FROM vectors WHERE model = ? AND dims = ? AND key IN ({marks})",
+                    [model, dims, *part],
+                ).fetchone()[0]
+            con.executemany(
+                "INSERT OR REPLACE INTO vectors (model, dims, key, dtype, vec, last_used) VALUES (?, ?, ?, ?, ?, ?)",
+                [(model, dims, k, self.dtype, blob, now) for k, blob in rows.items()],
+            )
+            self._bump(con, "bytes", sum(len(b) for b in rows.values()) - old)
+        if self.total_bytes() > self.max_bytes:
+            self.enforce_cap()
+
+    # ---------- maintenance ----------
+    def _meta(self, con: sqlite3.Connection, name: str) -> int:
+        row = con.execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()
+        return int(row[0]) if row else 0
+
+    def total_bytes(self) -> int:
+        """Bytes of stored vectors (running total, not the SQLite file size)."""
+        with closing(self._connect()) as con:
+            return self._meta(con, "bytes")
+
+    def enforce_cap(self, max_bytes: Optional[int] = None) -> int:
+        """Evict least-recently-used vectors until the cache fits max_bytes. Returns vectors evicted."""
+        cap = self.max_bytes if max_bytes is None else max_bytes
+        evicted = 0
+        with closing(self._connect()) as con, con:
+            total = self._meta(con, "bytes")
+            if total <= cap:
+                return 0
+            target = int(cap * _EVICT_TO)
+            freed = 0
+            doomed = []
+            for model, dims, key, n in con.execute(
+                "SELECT model, dims, key, LENGTH(vec) FROM vectors ORDER BY last_used"
+            ):
+                if total - freed <= target:
+                    break
+                doomed.append((model, dims, key))
+                freed += n
+            con.executemany("DELETE FROM vectors WHERE model = ? AND dims = ? AND key = ?", doomed)
+            evicted = len(doomed)
+            self._bump(con, "bytes", -freed)
+            self._bump(con, "evictions", evicted)
+        if evicted:
+            log.info(f"embedding_cache_evicted | vectors={evicted} total_bytes={total - freed}")
+        return evicted
+
+    def stats(self) -> Dict[str, object]:
+        """Session and lifetime hit rates, entry count and size per (model, dims)."""
+        with closing(self._connect()) as con:
+            per_model = con.execute(
+                "SELECT model, dims, COUNT(*), SUM(LENGTH(vec)) FROM vectors GROUP BY model, dims"
+            ).fetchall()
+            hits, misses = self._meta(con, "hits"), self._meta(con, "misses")
+            out = {
+                "entries": sum(r[2] for r in per_model),
+                "bytes": self._meta(con, "bytes"),
+                "max_bytes": self.max_bytes,
+                "evictions": self._meta(con, "evictions"),
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+                "session_hits": self.hits,
+                "session_misses": self.misses,
+                "session_hit_rate": self.hits / (self.hits + self.misses) if self.hits + self.misses else 0.0,
+                "models": [{"model": m, "dims": d, "entries": n, "bytes": b} for m, d, n, b in per_model],
+            }
+        return out
+
+    def purge(self, model: Optional[str] = None) -> int:
+        """Delete all vectors, or only those of one model. Returns vectors removed."""
+        with closing(self._connect()) as con, con:
+            if model is None:
+                n = con.execute("DELETE FROM vectors").rowcount
+                con.execute("DELETE FROM meta WHERE name = 'bytes'")
+            else:
+                freed = con.execute(
+                    "SELECT COALESCE(SUM(LENGTH(vec)), 0) FROM vectors WHERE model = ?", (model,)
+                ).fetchone()[0]
+                n = con.execute("DELETE FROM vectors WHERE model = ?", (model,)).rowcount
+                self._bump(con, "bytes", -freed)
+        return n
@@ -1,54 +1,122 @@
 # src/indexing/indexer.py
 from __future__ import annotations
 from pathlib import Path
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterable, Iterator, Optional, Set
 import json
 
 from indexing.chroma_db import init_chroma
-from indexing.chroma_db import add_chunks_batched
+from indexing.chroma_db import add_chunks_batched, delete_stale_chunks, is_doc_indexed
+from indexing.manifest import (
+    chunk_hash, load_manifest_entry, meta_fingerprint, save_manifest_entry, text_hash,
+)
+from ingestion.chunk_store import iter_chunk_records
 from metadata.io import load_metadata
 from metadata.schema import DocumentMetadata
+from retrieval.filters import TAG_PREFIX, tag_key
 
-def load_chunks_jsonl(jsonl_path: str | Path) -> List[Dict[str, Any]]:
-    payload = []
-    with open(jsonl_path, "r", encoding="utf-8") as f:
-        for line in f:
-            ch = json.loads(line)
-            payload.append(ch)
-    return payload
-
-def upsert_document_chunks(doc_id: str, jsonl_path: str | Path) -> None:
+def upsert_document_chunks(
+    doc_id: str,
+    chunks_path: str | Path,
+    chunker_params: Optional[Dict[str, Any]] = None,
+) -> Dict[str, int]:
+    """
+    Idempotent, manifest-aware upsert of one document's chunks.
+    Only chunks whose content hash (text + metadata) differs from the manifest are sent to
+    Chroma; chunk ids that no longer exist are deleted. Re-running with the same file is a no-op.
+    Upserted chunks whose text is already embedded somewhere in the collection reuse that vector;
+    the rest are looked up in the persistent embedding cache before anything reaches the API.
+    The chunk file is streamed: memory is bounded by one upsert batch (plus a chunk_id -> hash map).
+    Returns {chunks, upserted, unchanged, embedded, reused, cache_hits, embed_tokens_saved}.
+    """
     meta_doc = load_metadata(doc_id)
+
+    client, coll = init_chroma()
+
+    # Previous hashes are only trusted if the doc is actually still in the collection
+    prev = load_manifest_entry(doc_id)
+    indexed = is_doc_indexed(doc_id, coll)
+    prev_hashes: Dict[str, str] = (prev or {}).get("chunk_hashes", {}) if prev and indexed else {}
+    # Chroma merges metadata on upsert: tag fields of removed tags must be cleared explicitly
+    prev_tags = _indexed_tag_keys(doc_id, coll) if indexed else set()
+
+    hashes: Dict[str, str] = {}
+    payload = _changed_chunks(iter_chunk_records(chunks_path), meta_doc, prev_hashes, hashes, prev_tags)
+    emb = add_chunks_batched(coll, payload)
+
+    # Drop chunk ids left over from a previous (longer) chunking of this doc
+    if prev_hashes.keys() - hashes.keys() or not prev_hashes:
+        delete_stale_chunks(doc_id, list(hashes), coll)
+
+    save_manifest_entry(
+        doc_id,
+        chunker=chunker_params or {},
+        meta_hash=meta_fingerprint(meta_doc),
+        chunk_hashes=hashes,
+        source_path=meta_doc.source_path if meta_doc else "",
+    )
+    return {
+        "chunks": len(hashes),
+        "upserted": emb["chunks"],
+        "unchanged": len(hashes) - emb["chunks"],
+        "embedded": emb["embedded"],
+        "reused": emb["reused"],
+        "cache_hits": emb["cache_hits"],
+        "embed_tokens_saved": emb["tokens_saved"],
+    }
+
+
+def _indexed_tag_keys(doc_id: str, coll) -> Set[str]:
+    """Tag fields (tag__<slug>) currently set on any indexed chunk of the document."""
+    res = coll.get(where={"doc_id": doc_id}, include=["metadatas"])
+    return {k for m in res.get("metadatas") or [] if m for k in m if k.startswith(TAG_PREFIX)}
+
+
+def _changed_chunks(
+    records: Iterable[Dict[str, Any]],
+    meta_doc: Optional[DocumentMetadata],
+    prev_hashes: Dict[str, str],
+    hashes: Dict[str, str],
+    prev_tags: Iterable[str] = (),
+) -> Iterator[Dict[str, Any]]:
+    """
+    Lazily turn chunk records into Chroma payloads, skipping chunks identical to what is indexed.
+    Fills `hashes` (chunk_id -> content hash) as it goes. Tag fields in `prev_tags` that the
+    document no longer has are sent as None, which removes them from the stored metadata.
+    """
     title = meta_doc.title if meta_doc else ""
     source_path = meta_doc.source_path if meta_doc else ""
-    authors = (meta_doc.authors or []) if meta_doc else []
+    authors_json = json.dumps((meta_doc.authors or []) if meta_doc else [], ensure_ascii=False)
     year = meta_doc.year if meta_doc else None
     doc_type = meta_doc.doc_type if meta_doc else None
-    tags = (meta_doc.tags or []) if meta_doc else []
-
-    payload_raw = load_chunks_jsonl(jsonl_path)
+    tags_json = json.dumps((meta_doc.tags or []) if meta_doc else [], ensure_ascii=False)
+    # one boolean field per tag: Chroma can filter on these, not on the JSON list
+    tag_fields = {k: True for k in (tag_key(t) for t in ((meta_doc.tags or []) if meta_doc else [])) if k}
+    cleared = {k: None for k in prev_tags if k not in tag_fields}
 
-    payload: List[Dict[str, Any]] = []
-    for ch in payload_raw:
+    for ch in records:
         meta = {
             "doc_id": ch["doc_id"],
             "chunk_id": ch["chunk_id"],
             "chunk_idx": ch.get("chunk_idx", 0),                         # int
             "title": title or "",                                        # str
-            "authors": json.dumps(authors, ensure_ascii=False),          # JSON string (Chroma-safe)
+            "authors": authors_json,                                     # JSON string (Chroma-safe)
             "year": year,                                                # int | None
             "doc_type": doc_type or "",                                  # str
-            "tags": json.dumps(tags, ensure_ascii=False),                # JSON string
+            "tags": tags_json,                                           # JSON string
             "pages_covered": ",".join(map(str, ch["pages_covered"])),    # comma string
             "source_path": source_path or "",
             "md5": ch["doc_id"],
             "anchors_json": json.dumps(ch.get("anchors", []), ensure_ascii=False),
+            "text_hash": text_hash(ch["text_clean"]),                     # embedding reuse key
+            **tag_fields,                                                # tag__<slug>: True
         }
-        payload.append({
+        h = chunk_hash(ch["text_clean"], meta)
+        hashes[ch["chunk_id"]] = h
+        if prev_hashes.get(ch["chunk_id"]) == h:
+            continue  # identical chunk already indexed
+        meta.update(cleared)                                             # after hashing: not content
+        yield {
             "chunk_id": ch["chunk_id"],
             "text_clean": ch["text_clean"],
             "metadata": meta,
-        })
-
-    client, coll = init_chroma()
-    add_chunks_batched(coll, payload)
+        }
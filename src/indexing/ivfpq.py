@@ -0,0 +1,344 @@
+# src/indexing/ivfpq.py
+from __future__ import annotations
+import json
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from indexing.vector_codec import truncate_normalize
+from utils.paths import indexes_dir
+
+# IVF-PQ approximate index (inverted file + product quantization): data/indexes/ivfpq/
+#   coarse.npy     float32 (nlist, d)        k-means centroids; each vector lives in its nearest list
+#   codebooks.npy  float32 (m, 256, d/m)     PQ codebooks of the residuals (vector - its centroid)
+#   codes.u8       uint8   (n, m)            one byte per sub-vector          } append-only,
+#   lists.i32      int32   (n,)              inverted list of each row        } memory-mapped,
+#   ids.bin        S64     (n,)              chunk id of each row             } row-aligned
+#   vectors.f32    float32 (n, d)            unit vectors, read only for the rescored shortlist
+#   tombstones.jsonl  [chunk id, row count at removal] per removed / replaced chunk
+#   meta.json      {version, dims, nlist, m, count, tombstones, signature, trained_on, built_at}
+# Search: rank the nprobe nearest lists, score their rows with per-list lookup tables (asymmetric
+# distance: exact query vs quantized rows), then rescore the best k x rescore rows exactly with
+# their float32 vectors. Resident memory is ~m + 12 bytes per vector (codes, list, row order);
+# vectors.f32 stays on disk and only shortlist rows are paged in.
+# Rows are only appended. Removing a chunk (deleted, or re-added with a new vector) writes a
+# tombstone that hides its rows below the row count at that moment; rows added later stay
+# visible. Dead rows keep their space until a rebuild compacts the index.
+INDEX_VERSION = 1
+KSUB = 256                   # centroids per PQ sub-quantizer (one uint8 code)
+ID_BYTES = 64                # fixed-width chunk id records
+_BLOCK = 4096                # rows per matmul when assigning / encoding
+
+
+def ivfpq_dir() -> Path:
+    return indexes_dir() / "ivfpq"
+
+
+def clear_ivfpq_index(path: Optional[Path] = None) -> None:
+    shutil.rmtree(Path(path) if path else ivfpq_dir(), ignore_errors=True)
+
+
+def auto_nlist(n: int) -> int:
+    """~4 sqrt(n) lists (1M vectors -> 4000), at least 1 and at most n / 39 (enough training points)."""
+    return int(max(1, min(4 * np.sqrt(max(n, 1)), n // 39 or 1)))
+
+
+def pq_subquantizers(dims: int, m: int) -> int:
+    """Largest divisor of dims that is <= m (sub-vectors must split the vector evenly)."""
+    m = max(1, min(m, dims))
+    while dims % m:
+        m -= 1
+    return m
+
+
+def _assign(x: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Nearest centroid (L2) of each row, in blocks."""
+    c_norm = (centroids ** 2).sum(axis=1)
+    out = np.empty(len(x), dtype=np.int32)
+    for s in range(0, len(x), _BLOCK):
+        out[s:s + _BLOCK] = np.argmin(c_norm - 2.0 * (x[s:s + _BLOCK] @ centroids.T), axis=1)
+    return out
+
+
+def kmeans(x: np.ndarray, k: int, iters: int = 15, seed: int = 0) -> np.ndarray:
+    """Lloyd's k-means from k random points; empty clusters are re-seeded with random points."""
+    rng = np.random.default_rng(seed)
+    x = np.ascontiguousarray(x, dtype=np.float32)
+    k = min(k, len(x))
+    c = x[rng.choice(len(x), k, replace=False)].copy()
+    for _ in range(iters):
+        a = _assign(x, c)
+        order = np.argsort(a, kind="stable")
+        counts = np.bincount(a, minlength=k)
+        used = np.flatnonzero(counts)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))[used]
+        c[used] = np.add.reduceat(x[order], starts, axis=0) / counts[used, None]
+        empty = np.flatnonzero(counts == 0)
+        if len(empty):
+            c[empty] = x[rng.choice(len(x), len(empty), replace=False)]
+    return c
+
+
+class IVFPQIndex:
+    """
+    Memory-mapped IVF-PQ index. Create with IVFPQIndex.train(), grow with add(), query with
+    search(). One writer at a time; readers in other processes pick up appended rows on their
+    next search (meta.json changes).
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self.dir = Path(path) if path else ivfpq_dir()
+        self._lock = threading.Lock()
+        self._meta_mtime = None
+        self._load()
+
+    # ---------- build ----------
+    @classmethod
+    def train(
+        cls,
+        sample,
+        nlist: int,
+        m: int,
+        signature: str,
+        path: Optional[Path] = None,
+        iters: int = 15,
+    ) -> "IVFPQIndex":
+        """Train the coarse quantizer and PQ codebooks on a sample and write an empty index."""
+        d = Path(path) if path else ivfpq_dir()
+        clear_ivfpq_index(d)
+        d.mkdir(parents=True, exist_ok=True)
+        x = truncate_normalize(sample, 0)
+        dims = x.shape[1]
+        m = pq_subquantizers(dims, m)
+        coarse = kmeans(x, nlist, iters=iters)
+        resid = (x - coarse[_assign(x, coarse)]).reshape(len(x), m, dims // m)
+        codebooks = np.zeros((m, KSUB, dims // m), dtype=np.float32)
+        for j in range(m):
+            cb = kmeans(resid[:, j], KSUB, iters=iters, seed=j + 1)
+            codebooks[j, :len(cb)] = cb          # < 256 training points: unused codes stay at 0
+        np.save(d / "coarse.npy", coarse)
+        np.save(d / "codebooks.npy", codebooks)
+        for name in ("codes.u8", "lists.i32", "ids.bin", "vectors.f32", "tombstones.jsonl"):
+            (d / name).write_bytes(b"")
+        meta = {"version": INDEX_VERSION, "dims": dims, "nlist": len(coarse), "m": m, "count": 0,
+                "tombstones": 0, "signature": signature, "trained_on": len(x), "built_at": time.time()}
+        (d / "meta.json").write_text(json.dumps(meta), encoding="utf-8")
+        return cls(d)
+
+    def _load(self) -> None:
+        meta_path = self.dir / "meta.json"
+        self._meta_mtime = meta_path.stat().st_mtime
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        if meta.get("version") != INDEX_VERSION:
+            raise ValueError(f"ivfpq index version {meta.get('version')} != {INDEX_VERSION}; rebuild it")
+        self.meta = meta
+        self.dims, self.nlist, self.m, self.count = meta["dims"], meta["nlist"], meta["m"], meta["count"]
+        self.signature: str = meta["signature"]
+        self.coarse = np.load(self.dir / "coarse.npy")
+        self.codebooks = np.load(self.dir / "codebooks.npy")
+        self._cb_norm = (self.codebooks ** 2).sum(axis=2)                 # (m, 256)
+        n = self.count
+        if n:
+            self.codes = np.memmap(self.dir / "codes.u8", dtype=np.uint8, mode="r", shape=(n, self.m))
+            self.lists = np.memmap(self.dir / "lists.i32", dtype=np.int32, mode="r", shape=(n,))
+            self.ids = np.memmap(self.dir / "ids.bin", dtype=f"S{ID_BYTES}", mode="r", shape=(n,))
+            self.vectors = np.memmap(self.dir / "vectors.f32", dtype=np.float32, mode="r", shape=(n, self.dims))
+        else:
+            self.codes = np.zeros((0, self.m), dtype=np.uint8)
+            self.lists = np.zeros(0, dtype=np.int32)
+            self.ids = np.zeros(0, dtype=f"S{ID_BYTES}")
+            self.vectors = np.zeros((0, self.dims), dtype=np.float32)
+        # chunk id -> rows below this index are dead
+        self._dead_below = {}
+        with open(self.dir / "tombstones.jsonl", "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    cid, below = json.loads(line)
+                    self._dead_below[cid.encode("utf-8")] = below
+        self._grouped = None         # built on the first search, not on every add()
+        self._live = None            # same, for the live-row mask
+
+    def inverted_lists(self) -> Tuple[np.ndarray, np.ndarray]:
+        """(order, offsets): inverted list l holds rows order[offsets[l]:offsets[l + 1]]."""
+        if self._grouped is None:
+            order = np.argsort(self.lists, kind="stable")
+            offsets = np.concatenate(([0], np.cumsum(np.bincount(self.lists, minlength=self.nlist))))
+            self._grouped = (order, offsets)
+        return self._grouped
+
+    def live_rows(self) -> Optional[np.ndarray]:
+        """Boolean mask of rows not hidden by a tombstone, or None when no row is."""
+        if self._live is None and self._dead_below:
+            dead = np.array(sorted(self._dead_below), dtype=f"S{ID_BYTES}")
+            below = np.array([self._dead_below[cid] for cid in dead.tolist()], dtype=np.int64)
+            ids = np.asarray(self.ids)
+            rows = np.flatnonzero(np.isin(ids, dead))
+            live = np.ones(self.count, dtype=bool)
+            live[rows[rows < below[np.searchsorted(dead, ids[rows])]]] = False
+            self._live = live
+        return self._live
+
+    def refresh(self) -> None:
+        """Re-map the files if another process (or add()) appended rows."""
+        if (self.dir / "meta.json").stat().st_mtime != self._meta_mtime:
+            with self._lock:
+                self._load()
+
+    # ---------- add ----------
+    def encode(self, x: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Unit vectors -> (inverted list per row, PQ codes of the residuals)."""
+        lists = _assign(x, self.coarse)
+        resid = (x - self.coarse[lists]).reshape(len(x), self.m, -1)
+        codes = np.empty((len(x), self.m), dtype=np.uint8)
+        for j in range(self.m):
+            codes[:, j] = _assign(resid[:, j], self.codebooks[j])
+        return lists, codes
+
+    def add(self, ids: Sequence[str], vectors) -> int:
+        """Append rows; returns the new row count."""
+        if not len(ids):
+            return self.count
+        x = truncate_normalize(vectors, 0)
+        if x.shape[1] != self.dims:
+            raise ValueError(f"ivfpq index holds {self.dims}-dim vectors, got {x.shape[1]}")
+        raw_ids = np.array([str(i).encode("utf-8") for i in ids], dtype=f"S{ID_BYTES}")
+        if any(len(str(i).encode("utf-8")) > ID_BYTES for i in ids):
+            raise ValueError(f"chunk ids longer than {ID_BYTES} bytes cannot be stored in the ivfpq index")
+        lists, codes = self.encode(x)
+        with self._lock:
+            n = self.count
+            parts = (("codes.u8", codes, self.m), ("lists.i32", lists, 4),
+                     ("ids.bin", raw_ids, ID_BYTES), ("vectors.f32", x, 4 * self.dims))
+            for name, arr, row_bytes in parts:
+                with open(self.dir / name, "r+b") as f:
+                    f.truncate(n * row_bytes)               # drop rows of an interrupted add
+                    f.seek(0, os.SEEK_END)
+                    f.write(np.ascontiguousarray(arr).tobytes())
+            self._write_meta(count=n + len(x))             # readers see the rows only from here on
+        return self.count
+
+    def remove(self, ids: Sequence[str]) -> None:
+        """Hide every current row of these chunk ids (later add()s of the same ids stay visible)."""
+        if not len(ids):
+            return
+        with self._lock:
+            with open(self.dir / "tombstones.jsonl", "a", encoding="utf-8") as f:
+                for cid in ids:
+                    f.write(json.dumps([str(cid), self.count]) + "\n")
+            self._write_meta(tombstones=self.meta.get("tombstones", 0) + len(ids))
+
+    def _write_meta(self, **changes) -> None:
+        tmp = self.dir / "meta.json.tmp"
+        tmp.write_text(json.dumps(dict(self.meta, **changes)), encoding="utf-8")
+        os.replace(tmp, self.dir / "meta.json")
+        self._load()
+
+    # ---------- search ----------
+    def search(
+        self, queries, k: int, nprobe: int = 16, rescore: int = 10, allowed: Optional[np.ndarray] = None,
+    ) -> Tuple[List[List[str]], List[np.ndarray]]:
+        """
+        Per query: (chunk ids, cosine similarities), best first, at most k. The best k x rescore
+        live rows by quantized distance are re-ranked with their exact vectors (rescore <= 1:
+        ranked and scored by the quantized distance alone). Rows hidden by tombstones are masked
+        out before the shortlist, so old copies of re-added chunks never take its places.
+        allowed: optional boolean row mask (metadata filter). When it selects no more rows than
+        nprobe lists hold on average, those rows are searched exactly; otherwise only allowed rows
+        of the probed lists are scored, probing more lists if needed to fill the shortlist.
+        """
+        self.refresh()
+        q = truncate_normalize(np.atleast_2d(queries), 0)
+        nprobe = max(1, min(nprobe, self.nlist))
+        live = self.live_rows()
+        if allowed is None:
+            allowed = live
+        else:
+            # rows appended after the mask was built (refresh() above) are not allowed
+            allowed = np.pad(np.asarray(allowed[:self.count], dtype=bool), (0, max(0, self.count - len(allowed))))
+            if live is not None:
+                allowed &= live
+            n_allowed = int(allowed.sum())
+            if n_allowed * self.nlist <= self.count * nprobe:
+                return self._search_exact(q, k, np.flatnonzero(allowed))
+            # probe enough lists to expect a full shortlist of allowed rows
+            needed = int(np.ceil(k * max(rescore, 1) * self.nlist / n_allowed))
+            nprobe = min(self.nlist, max(nprobe, needed))
+        c_norm = (self.coarse ** 2).sum(axis=1)
+        probes = np.argsort(c_norm - 2.0 * (q @ self.coarse.T), axis=1)[:, :nprobe]
+        out_ids: List[List[str]] = []
+        out_sims: List[np.ndarray] = []
+        for qi, probe in zip(q, probes):
+            rows, adc = self._scan(qi, probe, allowed)
+            if not len(rows):
+                out_ids.append([])
+                out_sims.append(np.zeros(0, dtype=np.float32))
+                continue
+            short = min(len(rows), k * max(rescore, 1))
+            pick = np.argpartition(adc, short - 1)[:short] if short < len(rows) else np.arange(len(rows))
+            rows = rows[pick]
+            if rescore > 1:
+                srt = np.sort(rows)                                          # sorted rows: sequential reads
+                sims = np.asarray(self.vectors[srt] @ qi)[np.searchsorted(srt, rows)]
+            else:
+                sims = 1.0 - adc[pick] / 2.0                                # ||q - x||^2 = 2 - 2cos
+            ids, best = self._dedupe(rows, sims, k)
+            out_ids.append(ids)
+            out_sims.append(best)
+        return out_ids, out_sims
+
+    def _search_exact(self, q: np.ndarray, k: int, rows: np.ndarray) -> Tuple[List[List[str]], List[np.ndarray]]:
+        """Exact search restricted to `rows` (sorted), using the stored full vectors."""
+        sims = np.asarray(self.vectors[rows] @ q.T) if len(rows) else np.zeros((0, len(q)), dtype=np.float32)
+        out = [self._dedupe(rows, sims[:, i], k) for i in range(len(q))]
+        return [ids for ids, _ in out], [s for _, s in out]
+
+    def _scan(
+        self, q: np.ndarray, probe: np.ndarray, allowed: Optional[np.ndarray] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Rows of the probed lists (only `allowed` ones, if given) and their asymmetric
+        distances ||q - (centroid + PQ residual)||^2.
+        """
+        rq = (q[None, :] - self.coarse[probe]).reshape(len(probe), self.m, -1)       # (p, m, dsub)
+        luts = ((rq ** 2).sum(axis=2)[:, :, None]
+                - 2.0 * np.einsum("pmd,mcd->pmc", rq, self.codebooks)
+                + self._cb_norm[None])                                              # (p, m, 256)
+        sub = np.arange(self.m)
+        order, offsets = self.inverted_lists()
+        rows_all, dist_all = [], []
+        for p, lst in enumerate(probe):
+            rows = order[offsets[lst]:offsets[lst + 1]]
+            if allowed is not None:
+                rows = rows[allowed[rows]]
+            if len(rows):
+                rows_all.append(rows)
+                dist_all.append(luts[p][sub, self.codes[rows]].sum(axis=1))
+        if not rows_all:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        return np.concatenate(rows_all), np.concatenate(dist_all)
+
+    def _dedupe(self, rows: np.ndarray, sims: np.ndarray, k: int) -> Tuple[List[str], np.ndarray]:
+        """Top k by similarity over live rows, one row per chunk id (the newest one)."""
+        newest = {}
+        for r in sorted(rows.tolist()):
+            cid = self.ids[r]
+            if r >= self._dead_below.get(cid, 0):
+                newest[cid] = r
+        keep = np.isin(rows, list(newest.values()))
+        rows, sims = rows[keep], sims[keep]
+        order = np.argsort(-sims)[:k]
+        return [self.ids[r].decode("utf-8") for r in rows[order]], sims[order].astype(np.float32)
+
+    # ---------- stats ----------
+    def memory_bytes(self) -> dict:
+        """Resident (codes, lists, row order, model) vs on-disk-only (ids, vectors) bytes."""
+        model = self.coarse.nbytes + self.codebooks.nbytes
+        resident = self.count * (self.m + 4 + 8) + model
+        return {"resident": resident, "resident_per_vector": (resident - model) / max(self.count, 1),
+                "tombstones": len(self._dead_below),
+                "disk": resident + self.count * (ID_BYTES + 4 * self.dims)}
@@ -0,0 +1,130 @@
+# src/indexing/manifest.py
+from __future__ import annotations
+import hashlib
+import json
+import os
+import re
+import shutil
+import unicodedata
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from utils.paths import indexes_dir
+
+# Index manifest: one JSON per indexed document, data/indexes/manifest/{doc_id}.json
+#   {
+#     "doc_id": str,
+#     "chunker": {...},                    # chunker/parser/cleaner params the chunks were built with
+#     "meta_hash": str,                    # fingerprint of doc-level metadata copied into chunks
+#     "chunk_hashes": {chunk_id: str},     # content hash of each indexed chunk (text + metadata)
+#     "indexed_at": ISO-8601 UTC,
+#     "source_path": str,
+#   }
+# Per-doc files (like metadata/) keep each update O(one document).
+
+# Bump when the layout of chunk metadata written to Chroma changes
+INDEX_SCHEMA_VERSION = "3"   # 2: chunks carry text_hash (embedding reuse); 3: tag__<slug> filter fields
+
+_WS_RE = re.compile(r"\s+")
+
+
+def manifest_dir() -> Path:
+    d = indexes_dir() / "manifest"
+    d.mkdir(parents=True, exist_ok=True)
+    return d
+
+
+def _entry_path(doc_id: str) -> Path:
+    return manifest_dir() / f"{doc_id}.json"
+
+
+def load_manifest_entry(doc_id: str) -> Optional[Dict[str, Any]]:
+    path = _entry_path(doc_id)
+    if not path.exists():
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return None
+
+
+def save_manifest_entry(
+    doc_id: str,
+    *,
+    chunker: Dict[str, Any],
+    meta_hash: str,
+    chunk_hashes: Dict[str, str],
+    source_path: Optional[str] = None,
+) -> Dict[str, Any]:
+    entry = {
+        "doc_id": doc_id,
+        "chunker": chunker,
+        "meta_hash": meta_hash,
+        "chunk_hashes": chunk_hashes,
+        "indexed_at": datetime.now(timezone.utc).isoformat(),
+        "source_path": source_path or "",
+    }
+    path = _entry_path(doc_id)
+    tmp = path.with_suffix(".json.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(entry, f, ensure_ascii=False)
+    os.replace(tmp, path)  # atomic: never leave a half-written entry
+    return entry
+
+
+def delete_manifest_entry(doc_id: str) -> bool:
+    path = _entry_path(doc_id)
+    if path.exists():
+        path.unlink()
+        return True
+    return False
+
+
+def list_manifest_doc_ids() -> List[str]:
+    return sorted(p.stem for p in manifest_dir().glob("*.json"))
+
+
+def clear_manifest() -> None:
+    d = indexes_dir() / "manifest"
+    if d.exists():
+        shutil.rmtree(d, ignore_errors=True)
+
+
+# ----------------- Fingerprints -----------------
+def meta_fingerprint(meta: Any) -> str:
+    """Hash of the doc-level metadata fields that are copied into every chunk's metadata."""
+    get = (lambda k: getattr(meta, k, None)) if meta is not None else (lambda k: None)
+    payload = {
+        "schema": INDEX_SCHEMA_VERSION,
+        "title": get("title") or "",
+        "authors": list(get("authors") or []),
+        "year": get("year"),
+        "doc_type": get("doc_type") or "",
+        "tags": list(get("tags") or []),
+        "source_path": get("source_path") or "",
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()[:32]
+
+
+def text_hash(text: str) -> str:
+    """
+    Hash of a chunk's normalized text (NFKC, whitespace collapsed): identical paragraphs in
+    different documents/editions share it, and with it one embedding vector.
+    """
+    norm = _WS_RE.sub(" ", unicodedata.normalize("NFKC", text or "")).strip()
+    return hashlib.sha256(norm.encode("utf-8")).hexdigest()[:32]
+
+
+def chunk_hash(text: str, metadata: Dict[str, Any]) -> str:
+    """Content hash of what is stored in Chroma for one chunk (document text + metadata)."""
+    h = hashlib.sha256(text.encode("utf-8"))
+    h.update(b"\0")
+    h.update(json.dumps(metadata, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+    return h.hexdigest()[:32]
+
+
+def is_current(entry: Optional[Dict[str, Any]], chunker: Dict[str, Any], meta: Any) -> bool:
+    """True if the indexed chunks were built with the same chunker params and doc metadata."""
+    return bool(entry) and entry.get("chunker") == chunker and entry.get("meta_hash") == meta_fingerprint(meta)
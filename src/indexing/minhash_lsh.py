@@ -0,0 +1,205 @@
+# src/indexing/minhash_lsh.py
+from __future__ import annotations
+import hashlib
+import re
+import sqlite3
+import zlib
+from contextlib import closing
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from utils.paths import indexes_dir
+
+# Near-duplicate detection over cleaned document text.
+#   - shingles: word 5-grams, hashed with crc32
+#   - signature: NUM_PERM min-hashes, h_i(x) = ((a_i * x + b_i) mod P) & 0xFFFFFFFF
+#   - LSH: NUM_BANDS bands x ROWS_PER_BAND rows; two docs become candidates when any band matches.
+#     With 16 x 8 the candidate curve is steep around Jaccard ~0.7, so a lookup touches only
+#     the few docs sharing a band bucket (indexed SQLite lookups, not a corpus scan);
+#     candidates are then confirmed with the full-signature estimate.
+# Stored in data/indexes/minhash/lsh.sqlite3 (next to metadata/, outside its *.json glob).
+
+SHINGLE_WORDS = 5
+NUM_PERM = 128
+NUM_BANDS = 16
+ROWS_PER_BAND = NUM_PERM // NUM_BANDS
+MINHASH_VERSION = 1          # stored as PRAGMA user_version; a mismatch resets the index
+
+_P = np.uint64((1 << 61) - 1)
+_MAX32 = np.uint64(0xFFFFFFFF)
+_rng = np.random.RandomState(1)
+_A = _rng.randint(1, 1 << 31, size=NUM_PERM).astype(np.uint64)   # a*x < 2^63: no uint64 overflow
+_B = _rng.randint(0, 1 << 32, size=NUM_PERM, dtype=np.int64).astype(np.uint64)
+_WORD_RE = re.compile(r"\w+")
+_BLOCK = 4096                # shingles hashed per numpy block (bounds the (n, NUM_PERM) temp)
+
+
+class MinHasher:
+    """
+    Streaming MinHash: feed text page by page with update(); shingles spanning page boundaries
+    are kept. Memory is O(page + NUM_PERM).
+    """
+
+    def __init__(self):
+        self._tail: List[str] = []
+        self._sig = np.full(NUM_PERM, np.iinfo(np.uint32).max, dtype=np.uint64)
+        self.n_shingles = 0
+
+    def update(self, text: str) -> None:
+        words = self._tail + _WORD_RE.findall((text or "").lower())
+        if len(words) < SHINGLE_WORDS:
+            self._tail = words
+            return
+        hashes = np.fromiter(
+            (zlib.crc32(" ".join(words[i:i + SHINGLE_WORDS]).encode("utf-8"))
+             for i in range(len(words) - SHINGLE_WORDS + 1)),
+            dtype=np.uint64,
+        )
+        self._tail = words[-(SHINGLE_WORDS - 1):]
+        hashes = np.unique(hashes)
+        self.n_shingles += len(hashes)
+        for s in range(0, len(hashes), _BLOCK):
+            x = hashes[s:s + _BLOCK, None]
+            h = ((x * _A + _B) % _P) & _MAX32
+            np.minimum(self._sig, h.min(axis=0), out=self._sig)
+
+    def signature(self) -> Optional[np.ndarray]:
+        """uint32[NUM_PERM], or None if the text was too short to shingle."""
+        if self.n_shingles == 0:
+            return None
+        return self._sig.astype(np.uint32)
+
+
+def minhash_text(text: str) -> Optional[np.ndarray]:
+    m = MinHasher()
+    m.update(text)
+    return m.signature()
+
+
+def jaccard_estimate(a: np.ndarray, b: np.ndarray) -> float:
+    return float(np.count_nonzero(a == b)) / len(a)
+
+
+def _band_keys(sig: np.ndarray) -> List[int]:
+    keys = []
+    for band in range(NUM_BANDS):
+        chunk = sig[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND].tobytes()
+        keys.append(int.from_bytes(hashlib.blake2b(chunk, digest_size=8).digest(), "little", signed=True))
+    return keys
+
+
+def minhash_dir() -> Path:
+    d = indexes_dir() / "minhash"
+    d.mkdir(parents=True, exist_ok=True)
+    return d
+
+
+class MinHashIndex:
+    """
+    SQLite-backed LSH index of document signatures.
+    Registration order is kept (seq), so the earliest registered copy is treated as the original.
+    Connections are short-lived, so the index can be used from worker threads.
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path) if path else minhash_dir() / "lsh.sqlite3"
+        with closing(self._connect()) as con, con:
+            if con.execute("PRAGMA user_version").fetchone()[0] != MINHASH_VERSION:
+                con.executescript("DROP TABLE IF EXISTS bands; DROP TABLE IF EXISTS signatures;")
+                con.execute(f"PRAGMA user_version = {MINHASH_VERSION}")
+            con.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS signatures (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    doc_id TEXT UNIQUE NOT NULL,
+                    sig BLOB NOT NULL,
+                    n_shingles INTEGER,
+                    added_at TEXT
+                );
+                CREATE TABLE IF NOT EXISTS bands (
+                    band INTEGER NOT NULL,
+                    key INTEGER NOT NULL,
+                    doc_id TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS bands_lookup ON bands (band, key);
+                CREATE INDEX IF NOT EXISTS bands_doc ON bands (doc_id);
+                """
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    def add(self, doc_id: str, sig: np.ndarray, n_shingles: int = 0) -> None:
+        """Register (or refresh) a document; keeps its original registration order."""
+        sig = np.asarray(sig, dtype=np.uint32)
+        with closing(self._connect()) as con, con:
+            con.execute(
+                "INSERT INTO signatures (doc_id, sig, n_shingles, added_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(doc_id) DO UPDATE SET sig = excluded.sig, n_shingles = excluded.n_shingles",
+                (doc_id, sig.tobytes(), n_shingles, datetime.now(timezone.utc).isoformat()),
+            )
+            con.execute("DELETE FROM bands WHERE doc_id = ?", (doc_id,))
+            con.executemany(
+                "INSERT INTO bands (band, key, doc_id) VALUES (?, ?, ?)",
+                [(b, k, doc_id) for b, k in enumerate(_band_keys(sig))],
+            )
+
+    def remove(self, doc_id: str) -> None:
+        with closing(self._connect()) as con, con:
+            con.execute("DELETE FROM bands WHERE doc_id = ?", (doc_id,))
+            con.execute("DELETE FROM signatures WHERE doc_id = ?", (doc_id,))
+
+    def candidates(self, sig: np.ndarray) -> List[str]:
+        """Doc ids sharing at least one LSH band with `sig`."""
+        keys = _band_keys(np.asarray(sig, dtype=np.uint32))
+        clause = " OR ".join(["(band = ? AND key = ?)"] * NUM_BANDS)
+        params = [v for b, k in enumerate(keys) for v in (b, k)]
+        with closing(self._connect()) as con:
+            rows = con.execute(f"SELECT DISTINCT doc_id FROM bands WHERE {clause}", params).fetchall()
+        return [r[0] for r in rows]
+
+    def query(
+        self,
+        sig: np.ndarray,
+        threshold: float,
+        exclude: Optional[str] = None,
+    ) -> List[Tuple[str, float]]:
+        """
+        Near-duplicates of `sig` with estimated Jaccard >= threshold, best first.
+        If `exclude` is itself registered, only documents registered before it are returned,
+        so an original never gets flagged as a copy of its own duplicate.
+        """
+        sig = np.asarray(sig, dtype=np.uint32)
+        cands = [c for c in self.candidates(sig) if c != exclude]
+        if not cands:
+            return []
+        with closing(self._connect()) as con:
+            own = con.execute("SELECT seq FROM signatures WHERE doc_id = ?", (exclude,)).fetchone() if exclude else None
+            marks = ",".join("?" * len(cands))
+            rows = con.execute(f"SELECT doc_id, sig, seq FROM signatures WHERE doc_id IN ({marks})", cands).fetchall()
+        out = []
+        for doc_id, blob, seq in rows:
+            if own is not None and seq > own[0]:
+                continue
+            sim = jaccard_estimate(sig, np.frombuffer(blob, dtype=np.uint32))
+            if sim >= threshold:
+                out.append((doc_id, sim))
+        return sorted(out, key=lambda t: -t[1])
+
+    def doc_ids(self) -> List[str]:
+        with closing(self._connect()) as con:
+            return [r[0] for r in con.execute("SELECT doc_id FROM signatures ORDER BY seq")]
+
+    def __len__(self) -> int:
+        with closing(self._connect()) as con:
+            return con.execute("SELECT COUNT(*) FROM signatures").fetchone()[0]
+
+
+def clear_minhash_index() -> None:
+    p = indexes_dir() / "minhash" / "lsh.sqlite3"
+    if p.exists():
+        p.unlink()
+
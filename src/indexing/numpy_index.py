@@ -0,0 +1,142 @@
+# src/indexing/numpy_index.py
+from __future__ import annotations
+import json
+import os
+import time
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from indexing.vector_codec import truncate_normalize
+from utils.paths import indexes_dir
+
+# Exact-search snapshot of the collection: data/indexes/numpy_index/
+#   vectors.npy   float32 (n, d), L2-normalized rows, C-contiguous (np.load(mmap_mode="r"))
+#   ids.npy       fixed-width unicode (n,) chunk ids, row-aligned with vectors.npy
+#   meta.json     {version, count, dims, signature, exported_at}
+#   STALE         touched by every collection write; newer than exported_at = snapshot is stale
+# Both arrays are opened read-only and memory-mapped, so worker processes on one machine share
+# the same page-cache copy instead of each loading the matrix. A re-export writes new files and
+# renames them into place: readers that still map the old ones keep a consistent view.
+INDEX_VERSION = 1
+QUERY_BLOCK = 64             # queries per matmul: bounds the (block, n) score matrix
+SUBSET_GATHER = 4            # filtered search copies out the allowed rows when they are < 1/4 of all
+
+
+def numpy_index_dir() -> Path:
+    return indexes_dir() / "numpy_index"
+
+
+def mark_stale(path: Optional[Path] = None) -> None:
+    """Record that the collection changed after the last export (no-op without a snapshot)."""
+    d = Path(path) if path else numpy_index_dir()
+    if (d / "meta.json").exists():
+        (d / "STALE").touch()
+
+
+class NumpyIndexWriter:
+    """Streams (ids, vectors) pages into a new snapshot; commit() swaps it in atomically."""
+
+    def __init__(self, count: int, dims: int, path: Optional[Path] = None):
+        self.dir = Path(path) if path else numpy_index_dir()
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.started = time.time()
+        self.count = count
+        self.dims = dims
+        self._tmp = self.dir / "vectors.npy.tmp"
+        self._vecs = np.lib.format.open_memmap(self._tmp, mode="w+", dtype=np.float32, shape=(count, dims))
+        self._ids: List[str] = []
+
+    def add(self, ids: Sequence[str], vectors) -> None:
+        n = min(len(ids), self.count - len(self._ids))     # the collection may grow during export
+        if n <= 0:
+            return
+        row = len(self._ids)
+        self._vecs[row:row + n] = truncate_normalize(np.asarray(vectors)[:n], 0)
+        self._ids.extend(str(i) for i in ids[:n])
+
+    def commit(self, signature: str) -> int:
+        """Publish the snapshot; returns rows written."""
+        n = len(self._ids)
+        self._vecs.flush()
+        del self._vecs
+        if n < self.count:                                 # rows removed during export: shrink
+            vecs = np.load(self._tmp, mmap_mode="r")[:n]
+            tmp2 = self.dir / "vectors.npy.tmp2"
+            np.save(tmp2, np.ascontiguousarray(vecs))
+            del vecs
+            os.replace(tmp2, self._tmp)
+        ids_tmp = self.dir / "ids.npy.tmp"
+        with open(ids_tmp, "wb") as f:
+            np.save(f, np.array(self._ids, dtype=str) if n else np.zeros(0, dtype="<U1"))
+        os.replace(self._tmp, self.dir / "vectors.npy")
+        os.replace(ids_tmp, self.dir / "ids.npy")
+        meta = {"version": INDEX_VERSION, "count": n, "dims": self.dims,
+                "signature": signature, "exported_at": self.started}
+        meta_tmp = self.dir / "meta.json.tmp"
+        meta_tmp.write_text(json.dumps(meta), encoding="utf-8")
+        os.replace(meta_tmp, self.dir / "meta.json")      # last: readers reload on meta.json changes
+        return n
+
+
+class NumpyIndex:
+    """Read-only, memory-mapped exact cosine search over a snapshot written by NumpyIndexWriter."""
+
+    def __init__(self, path: Optional[Path] = None):
+        self.dir = Path(path) if path else numpy_index_dir()
+        self.meta_mtime = (self.dir / "meta.json").stat().st_mtime
+        meta = json.loads((self.dir / "meta.json").read_text(encoding="utf-8"))
+        if meta.get("version") != INDEX_VERSION:
+            raise ValueError(f"numpy index version {meta.get('version')} != {INDEX_VERSION}; re-export it")
+        self.signature: str = meta["signature"]
+        self.exported_at: float = meta["exported_at"]
+        self.vectors = np.load(self.dir / "vectors.npy", mmap_mode="r")
+        self.ids = np.load(self.dir / "ids.npy", mmap_mode="r")
+        if len(self.ids) != len(self.vectors):
+            raise ValueError("numpy index ids and vectors are out of sync; re-export it")
+
+    @property
+    def count(self) -> int:
+        return len(self.ids)
+
+    @property
+    def dims(self) -> int:
+        return self.vectors.shape[1]
+
+    def is_stale(self) -> bool:
+        stale = self.dir / "STALE"
+        return stale.exists() and stale.stat().st_mtime >= self.exported_at
+
+    def search(self, queries, k: int, allowed: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (nq, d) or (d,) queries -> (rows, cosine similarities), each (nq, min(k, candidates)),
+        best first. One matmul per QUERY_BLOCK queries, then argpartition for the top k.
+        allowed: optional boolean row mask (metadata filter). A small subset is gathered and
+        searched on its own; a large one is searched in place with the other rows at -inf.
+        """
+        q = truncate_normalize(np.atleast_2d(queries), 0)
+        subset = None if allowed is None else np.flatnonzero(allowed[:self.count])
+        gather = subset is not None and len(subset) * SUBSET_GATHER < self.count
+        mat = self.vectors[subset] if gather else self.vectors
+        k = min(k, self.count if subset is None else len(subset))
+        rows = np.empty((len(q), k), dtype=np.int64)
+        sims = np.empty((len(q), k), dtype=np.float32)
+        if k == 0:
+            return rows, sims
+        for s in range(0, len(q), QUERY_BLOCK):
+            scores = q[s:s + QUERY_BLOCK] @ mat.T
+            if subset is not None and not gather:
+                scores[:, ~allowed[:self.count]] = -np.inf
+            n = scores.shape[1]
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k] if k < n else \
+                np.broadcast_to(np.arange(n), scores.shape).copy()
+            top_s = np.take_along_axis(scores, top, axis=1)
+            order = np.argsort(-top_s, axis=1)
+            top = np.take_along_axis(top, order, axis=1)
+            rows[s:s + QUERY_BLOCK] = subset[top] if gather else top
+            sims[s:s + QUERY_BLOCK] = np.take_along_axis(top_s, order, axis=1)
+        return rows, sims
+
+    def chunk_ids(self, rows) -> List[str]:
+        return [str(self.ids[r]) for r in rows]
@@ -0,0 +1,62 @@
+# src/indexing/vector_codec.py
+from __future__ import annotations
+from typing import Optional, Tuple
+
+import numpy as np
+
+# Compact vector representations.
+#   truncate: keep the first `dims` components and re-normalize. text-embedding-3 models are
+#             trained Matryoshka-style (leading dims carry most of the signal), so cosine ranking
+#             survives truncation well; for other models check recall first (scripts/bench_vector_storage.py).
+#   float16:  2 bytes/dim, ~1e-3 relative error.
+#   int8:     1 byte/dim + one float32 scale per vector (symmetric, scale = max|x| / 127).
+DTYPES = ("float32", "float16", "int8")
+
+
+def truncate_normalize(vecs, dims: int) -> np.ndarray:
+    """(n, d) or (d,) -> first `dims` components, L2-normalized. dims <= 0 or >= d: normalize only."""
+    v = np.asarray(vecs, dtype=np.float32)
+    if 0 < dims < v.shape[-1]:
+        v = v[..., :dims]
+    norms = np.linalg.norm(v, axis=-1, keepdims=True)
+    return v / np.maximum(norms, 1e-12)
+
+
+def encode(vecs, dtype: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """(n, d) float -> (codes, scales); scales is None except for int8."""
+    v = np.asarray(vecs, dtype=np.float32)
+    if dtype == "float32":
+        return v, None
+    if dtype == "float16":
+        return v.astype(np.float16), None
+    if dtype == "int8":
+        scales = np.abs(v).max(axis=-1) / 127.0
+        scales = np.where(scales > 0, scales, 1.0).astype(np.float32)
+        codes = np.clip(np.rint(v / scales[..., None]), -127, 127).astype(np.int8)
+        return codes, scales
+    raise ValueError(f"dtype must be one of {DTYPES}, got {dtype!r}")
+
+
+def decode(codes: np.ndarray, scales: Optional[np.ndarray] = None) -> np.ndarray:
+    if codes.dtype == np.int8:
+        return codes.astype(np.float32) * scales[..., None]
+    return codes.astype(np.float32)
+
+
+def bytes_per_vector(dims: int, dtype: str) -> int:
+    return {"float32": 4 * dims, "float16": 2 * dims, "int8": dims + 4}[dtype]
+
+
+def to_blob(vec, dtype: str) -> bytes:
+    """One vector -> bytes (int8: float32 scale followed by the codes)."""
+    codes, scales = encode(np.asarray(vec, dtype=np.float32)[None, :], dtype)
+    if scales is None:
+        return codes.tobytes()
+    return scales.tobytes() + codes.tobytes()
+
+
+def from_blob(blob: bytes, dtype: str) -> np.ndarray:
+    if dtype == "int8":
+        scale = np.frombuffer(blob, dtype=np.float32, count=1)
+        return np.frombuffer(blob, dtype=np.int8, offset=4).astype(np.float32) * scale[0]
+    return np.frombuffer(blob, dtype=np.float16 if dtype == "float16" else np.float32).astype(np.float32)
@@ -0,0 +1,237 @@
+# src/ingestion/chunk_store.py
+from __future__ import annotations
+import json
+import mmap
+import os
+import struct
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+
+from utils.config import get_settings
+from utils.logging_utils import get_logger
+from utils.paths import indexes_dir
+
+try:  # optional: per-record compression
+    import zstandard as zstd
+except ImportError:
+    zstd = None
+
+log = get_logger("chunk_store")
+
+# Chunk store file ({doc_id}.chunks):
+#   header   MAGIC(4) flags:u8 reserved(3)                 flags bit0 = records are zstd-compressed
+#   records  repeated: length:u32 payload                  payload = UTF-8 JSON of one chunk record
+#   index    count:u32, offsets:u64[count], lengths:u32[count], ids_len:u32, chunk_ids ("\n"-joined)
+#   trailer  index_offset:u64 END_MAGIC(4)
+# Records are compressed one by one, so any chunk can be decoded without touching the others.
+# The index is read once per open; lookups by chunk_id or position are O(1) slices of the mmap.
+MAGIC = b"CHK1"
+END_MAGIC = b"CHKI"
+FLAG_ZSTD = 0x01
+SUFFIX = ".chunks"
+_HEADER = struct.Struct("<4sB3x")
+_LEN = struct.Struct("<I")
+_TRAILER = struct.Struct("<Q4s")
+_WRITE_BUFFER = 1 << 20
+_warned_no_zstd = False
+
+
+def _compress_default() -> bool:
+    return bool(get_settings().get("chunk_store_compress", True))
+
+
+class ChunkStoreWriter:
+    """
+    Buffered, append-only writer. The file appears atomically (tmp + rename) on a clean close;
+    on an exception the partial file is removed.
+    """
+
+    def __init__(self, path: str | Path, compress: Optional[bool] = None, level: int = 3):
+        self.path = Path(path)
+        if compress is None:
+            compress = _compress_default()
+        if compress and zstd is None:
+            global _warned_no_zstd
+            if not _warned_no_zstd:
+                log.warning("zstandard not installed; writing uncompressed chunk stores")
+                _warned_no_zstd = True
+            compress = False
+        self.compress = compress
+        self._cctx = zstd.ZstdCompressor(level=level) if compress else None
+        self._tmp = self.path.with_name(self.path.name + f".tmp{os.getpid()}")
+        self._fh = None
+        self._pos = 0
+        self._offsets: List[int] = []
+        self._lengths: List[int] = []
+        self._ids: List[str] = []
+
+    def __enter__(self) -> "ChunkStoreWriter":
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._fh = open(self._tmp, "wb", buffering=_WRITE_BUFFER)
+        self._fh.write(_HEADER.pack(MAGIC, FLAG_ZSTD if self.compress else 0))
+        self._pos = _HEADER.size
+        return self
+
+    def write(self, record: Dict[str, Any]) -> None:
+        payload = json.dumps(record, ensure_ascii=False).encode("utf-8")
+        if self._cctx is not None:
+            payload = self._cctx.compress(payload)
+        self._fh.write(_LEN.pack(len(payload)))
+        self._fh.write(payload)
+        self._offsets.append(self._pos + _LEN.size)
+        self._lengths.append(len(payload))
+        self._ids.append(str(record["chunk_id"]))
+        self._pos += _LEN.size + len(payload)
+
+    def _write_index(self) -> None:
+        ids_blob = "\n".join(self._ids).encode("utf-8")
+        self._fh.write(_LEN.pack(len(self._ids)))
+        self._fh.write(np.asarray(self._offsets, dtype="<u8").tobytes())
+        self._fh.write(np.asarray(self._lengths, dtype="<u4").tobytes())
+        self._fh.write(_LEN.pack(len(ids_blob)))
+        self._fh.write(ids_blob)
+        self._fh.write(_TRAILER.pack(self._pos, END_MAGIC))
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        try:
+            if exc_type is None:
+                self._write_index()
+        finally:
+            self._fh.close()
+        if exc_type is None:
+            os.replace(self._tmp, self.path)
+        else:
+            self._tmp.unlink(missing_ok=True)
+        return False
+
+
+class ChunkStoreReader:
+    """mmap-backed reader: len(), iteration in chunk order, get(chunk_id), at(position)."""
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self._f = open(self.path, "rb")
+        try:
+            self._mm = mmap.mmap(self._f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # empty file
+            self._f.close()
+            raise ValueError(f"Not a chunk store: {self.path}")
+        magic, flags = _HEADER.unpack_from(self._mm, 0)
+        index_off, end = _TRAILER.unpack_from(self._mm, len(self._mm) - _TRAILER.size)
+        if magic != MAGIC or end != END_MAGIC:
+            self.close()
+            raise ValueError(f"Not a chunk store (or truncated): {self.path}")
+        if flags & FLAG_ZSTD and zstd is None:
+            self.close()
+            raise RuntimeError(f"{self.path.name} is zstd-compressed; install 'zstandard' to read it")
+        self._dctx = zstd.ZstdDecompressor() if flags & FLAG_ZSTD else None
+
+        (n,) = _LEN.unpack_from(self._mm, index_off)
+        p = index_off + _LEN.size
+        self._offsets = np.frombuffer(self._mm, dtype="<u8", count=n, offset=p); p += 8 * n
+        self._lengths = np.frombuffer(self._mm, dtype="<u4", count=n, offset=p); p += 4 * n
+        (ids_len,) = _LEN.unpack_from(self._mm, p); p += _LEN.size
+        ids = bytes(self._mm[p:p + ids_len]).decode("utf-8").split("\n") if n else []
+        self._pos_by_id: Dict[str, int] = {cid: i for i, cid in enumerate(ids)}
+        self._ids = ids
+
+    def __enter__(self) -> "ChunkStoreReader":
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        self.close()
+        return False
+
+    def close(self) -> None:
+        # drop numpy views first, otherwise mmap.close() raises BufferError
+        self._offsets = self._lengths = None
+        try:
+            self._mm.close()
+        except (AttributeError, BufferError):
+            pass
+        self._f.close()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def ids(self) -> List[str]:
+        return list(self._ids)
+
+    def __contains__(self, chunk_id: str) -> bool:
+        return chunk_id in self._pos_by_id
+
+    def at(self, i: int) -> Dict[str, Any]:
+        off, ln = int(self._offsets[i]), int(self._lengths[i])
+        payload = self._mm[off:off + ln]
+        if self._dctx is not None:
+            payload = self._dctx.decompress(payload)
+        return json.loads(payload)
+
+    def get(self, chunk_id: str) -> Optional[Dict[str, Any]]:
+        i = self._pos_by_id.get(chunk_id)
+        return None if i is None else self.at(i)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for i in range(len(self._ids)):
+            yield self.at(i)
+
+
+class JsonlChunkWriter:
+    """Legacy one-JSON-per-line writer with the same interface as ChunkStoreWriter."""
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self._fh = None
+
+    def __enter__(self) -> "JsonlChunkWriter":
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._fh = self.path.open("w", encoding="utf-8")
+        return self
+
+    def write(self, record: Dict[str, Any]) -> None:
+        self._fh.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def __exit__(self, *exc) -> bool:
+        self._fh.close()
+        return False
+
+
+def open_chunk_writer(path: str | Path):
+    """Writer chosen by file suffix: '.jsonl' -> JSONL, anything else -> chunk store."""
+    return JsonlChunkWriter(path) if Path(path).suffix == ".jsonl" else ChunkStoreWriter(path)
+
+
+def iter_chunk_records(path: str | Path) -> Iterator[Dict[str, Any]]:
+    """Stream chunk records from a chunk store or a legacy JSONL file."""
+    path = Path(path)
+    if path.suffix == ".jsonl":
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        return
+    with ChunkStoreReader(path) as r:
+        yield from r
+
+
+def chunks_dir() -> Path:
+    d = indexes_dir() / "chunks"
+    d.mkdir(parents=True, exist_ok=True)
+    return d
+
+
+def chunk_store_path(doc_id: str) -> Path:
+    return chunks_dir() / f"{doc_id}{SUFFIX}"
+
+
+def jsonl_to_store(jsonl_path: str | Path, out_path: Optional[str | Path] = None,
+                   compress: Optional[bool] = None) -> Path:
+    """Convert a legacy {doc_id}.jsonl chunk file into a chunk store next to it."""
+    jsonl_path = Path(jsonl_path)
+    out = Path(out_path) if out_path else jsonl_path.with_suffix(SUFFIX)
+    with ChunkStoreWriter(out, compress=compress) as w:
+        for rec in iter_chunk_records(jsonl_path):
+            w.write(rec)
+    return out
@@ -5,6 +5,8 @@ from typing import Iterable, Iterator, Tuple, List, Dict, Any, Optional, Callabl
 from pathlib import Path
 import json, io, hashlib
 
+from ingestion.chunk_store import open_chunk_writer
+
 ProgressCB = Optional[Callable[[float, str], None]]
 
 # --------- data ---------
@@ -68,7 +70,8 @@ def build_chunks_streaming(
     meta_doc: object | None = None,   # <--- NEW
 ) -> Path:
     """
-    Stream pages -> paragraphs -> chunks; write each chunk to JSONL immediately.
+    Stream pages -> paragraphs -> chunks; write each chunk to out_path immediately
+    (chunk store, or JSONL if out_path ends with '.jsonl').
     Keeps O(overlap) text in memory, not O(document).
     """
     out_path = Path(out_path)
@@ -87,7 +90,7 @@ def build_chunks_streaming(
     chunk_idx = 0
 
     # open output once
-    with out_path.open("w", encoding="utf-8") as f:
+    with open_chunk_writer(out_path) as f:
         # consume pages one by one (iterator-friendly)
         total_pages = 0
         for total_pages, (pno, text) in enumerate(cleaned_pages_iter, start=1):
@@ -146,11 +149,11 @@ def _flush_chunk(
     idx: int,
     blocks: List[Tuple[int, str]],
     tok_sum: int,
-    fhandle,
+    writer,
     meta_doc: object | None = None
 ) -> None:
     """
-    Write one chunk with doc-level metadata into JSONL.
+    Write one chunk with doc-level metadata through the chunk writer.
     """
     # Join text paragraphs
     text = "\n\n".join(para for _, para in blocks)
@@ -180,5 +183,4 @@ def _flush_chunk(
             "source_path": get("source_path")
         })
 
-    # Write JSONL line
-    fhandle.write(json.dumps(record, ensure_ascii=False) + "\n")
+    writer.write(record)
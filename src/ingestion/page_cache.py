@@ -0,0 +1,217 @@
+# src/ingestion/page_cache.py
+from __future__ import annotations
+import gzip
+import os
+import struct
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from ingestion.pdf_parser import PARSER_VERSION
+from ingestion.text_cleaning import CLEANER_VERSION, CleanedPage, hf_removal_counts
+from utils.config import get_settings
+from utils.logging_utils import get_logger
+from utils.paths import indexes_dir
+
+log = get_logger("page_cache")
+
+# File layout (gzip stream):
+#   MAGIC
+#   repeated: <page_number:i32><raw_len:u32><clean_len:u32><hf_lines:u32><hf_chars:u32><hf_tokens:u32>
+#             raw_utf8 clean_utf8
+# hf_*: header/footer lines stripped from the page by the cleaner, replayed into stats on a hit.
+_FORMAT = 2
+_MAGIC = b"PGC2"
+_REC = struct.Struct("<iIIIII")
+_SUFFIX = ".pages.gz"
+
+
+@dataclass
+class CacheEntry:
+    key: str
+    path: Path
+    size: int
+    last_used: float
+
+
+def cache_dir() -> Path:
+    d = indexes_dir() / "page_cache"
+    d.mkdir(parents=True, exist_ok=True)
+    return d
+
+
+def cache_key(md5: str, fidelity: str) -> str:
+    """Content-addressed key: PDF bytes + parser version/fidelity + cleaner version + file format."""
+    return f"{md5}-p{PARSER_VERSION}{fidelity}-c{CLEANER_VERSION}-f{_FORMAT}"
+
+
+class PageCacheWriter:
+    """
+    Streaming writer: add() pages as they are produced; the entry only becomes visible
+    (atomic rename) when the context exits without an exception.
+    """
+
+    def __init__(self, cache: "PageCache", key: str):
+        self._cache = cache
+        self._final = cache.path_for(key)
+        self._tmp = self._final.with_name(self._final.name + f".tmp{os.getpid()}")
+        self._fh = None
+        self.pages = 0
+
+    def __enter__(self) -> "PageCacheWriter":
+        self._fh = gzip.open(self._tmp, "wb", compresslevel=3)
+        self._fh.write(_MAGIC)
+        return self
+
+    def add(self, page: CleanedPage) -> None:
+        raw = (page.raw_text or "").encode("utf-8")
+        clean = (page.cleaned_text or "").encode("utf-8")
+        self._fh.write(_REC.pack(page.page_number, len(raw), len(clean), *hf_removal_counts(page.removed_lines)))
+        self._fh.write(raw)
+        self._fh.write(clean)
+        self.pages += 1
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self._fh.close()
+        if exc_type is None:
+            os.replace(self._tmp, self._final)
+            self._cache.enforce_cap()
+        else:
+            self._tmp.unlink(missing_ok=True)
+        return False
+
+
+class PageCache:
+    """
+    On-disk cache of parsed + cleaned pages under data/indexes/page_cache.
+    PDFs are immutable per md5, so an entry never goes stale; a parser/cleaner version bump
+    simply changes the key. Size is capped with LRU eviction (mtime is bumped on every hit).
+    """
+
+    def __init__(self, root: Optional[Path] = None, max_bytes: Optional[int] = None):
+        self.root = Path(root) if root else cache_dir()
+        self.root.mkdir(parents=True, exist_ok=True)
+        if max_bytes is None:
+            max_bytes = int(get_settings().get("page_cache_max_mb", 2048)) * 1024 * 1024
+        self.max_bytes = max_bytes
+
+    def path_for(self, key: str) -> Path:
+        return self.root / f"{key}{_SUFFIX}"
+
+    def open(
+        self, md5: str, fidelity: str, stats: Optional[Dict[str, Any]] = None,
+    ) -> Optional[Iterator[CleanedPage]]:
+        """
+        Return a lazy iterator over cached pages, or None on a miss. The entry is checked end
+        to end first (record lengths + gzip CRC), so a corrupt one is a miss, never a stream that
+        breaks off after some pages were already handed out.
+        `stats` (if given) accumulates hf_lines_removed / hf_chars_removed / hf_tokens_saved as
+        pages are read, the same counters iter_clean_pages reports on a miss.
+        """
+        path = self.path_for(cache_key(md5, fidelity))
+        if not path.exists():
+            return None
+        try:
+            self._validate(path)
+        except (OSError, EOFError, ValueError, struct.error) as e:
+            log.error(f"Corrupt page cache entry {path.name}: {e}; removing")
+            path.unlink(missing_ok=True)
+            return None
+        try:
+            os.utime(path, None)  # LRU touch
+        except OSError:
+            pass
+        return self._read(path, stats)
+
+    def writer(self, md5: str, fidelity: str) -> PageCacheWriter:
+        return PageCacheWriter(self, cache_key(md5, fidelity))
+
+    @staticmethod
+    def _validate(path: Path) -> int:
+        """Walk every record without decoding text (gzip checks its CRC at EOF). Returns pages."""
+        pages = 0
+        with gzip.open(path, "rb") as fh:
+            if fh.read(len(_MAGIC)) != _MAGIC:
+                raise ValueError("bad magic")
+            while True:
+                head = fh.read(_REC.size)
+                if not head:
+                    return pages
+                _, raw_len, clean_len, *_ = _REC.unpack(head)
+                want = raw_len + clean_len
+                while want:
+                    got = len(fh.read(min(want, 1 << 20)))
+                    if not got:
+                        raise EOFError("truncated record")
+                    want -= got
+                pages += 1
+
+    def _read(self, path: Path, stats: Optional[Dict[str, Any]] = None) -> Iterator[CleanedPage]:
+        try:
+            with gzip.open(path, "rb") as fh:
+                if fh.read(len(_MAGIC)) != _MAGIC:
+                    raise ValueError("bad magic")
+                while True:
+                    head = fh.read(_REC.size)
+                    if not head:
+                        return
+                    pno, raw_len, clean_len, hf_lines, hf_chars, hf_tokens = _REC.unpack(head)
+                    raw = fh.read(raw_len).decode("utf-8")
+                    clean = fh.read(clean_len).decode("utf-8")
+                    if stats is not None:
+                        for key, n in (("hf_lines_removed", hf_lines), ("hf_chars_removed", hf_chars),
+                                       ("hf_tokens_saved", hf_tokens)):
+                            stats[key] = stats.get(key, 0) + n
+                    yield CleanedPage(
+                        page_number=pno,
+                        raw_text=raw,
+                        cleaned_text=clean,
+                        removed_lines=[],
+                        kept_line_indices=[],
+                    )
+        except (OSError, EOFError, ValueError, struct.error) as e:
+            log.error(f"Corrupt page cache entry {path.name}: {e}; removing")
+            path.unlink(missing_ok=True)
+            raise
+
+    # ---------- maintenance ----------
+    def entries(self) -> List[CacheEntry]:
+        out: List[CacheEntry] = []
+        for p in self.root.glob(f"*{_SUFFIX}"):
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            out.append(CacheEntry(key=p.name[: -len(_SUFFIX)], path=p, size=st.st_size, last_used=st.st_mtime))
+        return out
+
+    def total_bytes(self) -> int:
+        return sum(e.size for e in self.entries())
+
+    def enforce_cap(self, max_bytes: Optional[int] = None) -> List[CacheEntry]:
+        """Evict least-recently-used entries until the cache fits max_bytes."""
+        cap = self.max_bytes if max_bytes is None else max_bytes
+        entries = sorted(self.entries(), key=lambda e: e.last_used)
+        total = sum(e.size for e in entries)
+        evicted: List[CacheEntry] = []
+        for e in entries:
+            if total <= cap:
+                break
+            e.path.unlink(missing_ok=True)
+            total -= e.size
+            evicted.append(e)
+        if evicted:
+            log.info(f"page_cache_evicted | entries={len(evicted)} total_bytes={total}")
+        return evicted
+
+    def purge(self, md5: Optional[str] = None) -> int:
+        """Delete all entries, or only those for one md5. Returns number of files removed."""
+        n = 0
+        if md5 is None:
+            for tmp in self.root.glob(f"*{_SUFFIX}.tmp*"):   # leftovers of interrupted writes
+                tmp.unlink(missing_ok=True)
+        for e in self.entries():
+            if md5 is None or e.key.startswith(f"{md5}-"):
+                e.path.unlink(missing_ok=True)
+                n += 1
+        return n
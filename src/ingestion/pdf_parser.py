@@ -1,30 +1,39 @@
 # src/ingestion/pdf_parser.py
 from __future__ import annotations
 import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass, asdict
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Callable, Iterator, Literal, Optional, Tuple
 
 import fitz  # PyMuPDF
 
+from ingestion.spans import Span, SpanTable, SpanTableBuilder  # Span re-exported for callers
+from utils.config import get_settings
 from utils.logging_utils import get_logger
 
 log = get_logger(__name__)
 
+# Bump whenever extraction output changes (invalidates the on-disk page cache)
+PARSER_VERSION = "1"
 
-@dataclass
-class Span:
-    text: str
-    bbox: List[float]         # [x0, y0, x1, y1]
-    start: int                # char start offset in page_text
-    end: int                  # char end offset (exclusive)
+# Below this many pages per shard, process start-up and pickling cost more than they save
+MIN_PAGES_PER_SHARD = 8
+
+# Extraction fidelity, cheapest first:
+#   text   -> plain page text, no geometry (spans empty)
+#   blocks -> paragraph-level boxes, one "span" per text block
+#   spans  -> span-level text + bboxes + offsets (precise citation mapping)
+Fidelity = Literal["text", "blocks", "spans"]
+FIDELITY_LEVELS = ("text", "blocks", "spans")
 
 
 @dataclass
 class PageParse:
     page_number: int          # 1-based
     text: str                 # full page text
-    spans: List[Span]         # span-level details
+    spans: SpanTable          # span-level details (columnar; iterates as Span objects)
 
 
 @dataclass
@@ -49,11 +58,104 @@ def _md5_file(path: Path, chunk_size: int = 1 << 20) -> str:
     return h.hexdigest()
 
 
-def parse_pdf(pdf_path: str | Path) -> ParsedDocument:
+def file_md5(pdf_path: str | Path) -> str:
+    """MD5 of the raw file bytes; this is the doc_id used across metadata, chunks and the index."""
+    return _md5_file(Path(pdf_path))
+
+
+def _parse_page_text(page, page_no: int) -> PageParse:
+    """Fastest level: plain text extraction, no per-span geometry."""
+    page_text = page.get_text("text").rstrip("\n")
+    return PageParse(page_number=page_no, text=page_text, spans=SpanTable.empty())
+
+
+def _parse_page_blocks(page, page_no: int) -> PageParse:
+    """Paragraph-level boxes: one entry per text block, offsets into the joined page text."""
+    # Each block: (x0, y0, x1, y1, text, block_no, block_type); block_type 1 = image
+    page_text_parts: List[str] = []
+    spans = SpanTableBuilder()
+    cursor = 0
+
+    for x0, y0, x1, y1, text, _block_no, block_type in page.get_text("blocks"):
+        if block_type != 0:
+            continue
+        text = (text or "").rstrip("\n")
+        if page_text_parts:
+            page_text_parts.append("\n")
+            cursor += 1
+        spans.append(text, (x0, y0, x1, y1), cursor, cursor + len(text))
+        page_text_parts.append(text)
+        cursor += len(text)
+
+    page_text = "".join(page_text_parts).rstrip("\n")
+    return PageParse(page_number=page_no, text=page_text, spans=spans.build())
+
+
+def _parse_page_spans(page, page_no: int) -> PageParse:
+    """Extract full text plus span-level geometry/offsets for a single fitz page."""
+    # Use 'dict' to get blocks/lines/spans with geometry
+    # Structure: { "blocks": [ { "lines": [ { "spans": [ { "text", "size", "flags", "font", "bbox" } ] } ] } ] }
+    pdict: Dict[str, Any] = page.get_text("dict")  # layout-aware
+    page_text_parts: List[str] = []
+    spans = SpanTableBuilder()
+    cursor = 0
+
+    for block in pdict.get("blocks", []):
+        for line in block.get("lines", []):
+            for sp in line.get("spans", []):
+                text: str = sp.get("text", "") or ""
+                bbox = sp.get("bbox", [0, 0, 0, 0])
+
+                # Normalize newlines: PyMuPDF spans rarely include '\n'; we insert spaces/newlines
+                # Heuristic: append text; add a space between spans in same line
+                if page_text_parts and not page_text_parts[-1].endswith((" ", "\n")):
+                    # add a space before next span to avoid gluing tokens
+                    page_text_parts.append(" ")
+                    cursor += 1
+
+                start = cursor
+                page_text_parts.append(text)
+                cursor += len(text)
+                end = cursor
+
+                spans.append(text, bbox, start, end)
+
+            # End of a line: add newline
+            page_text_parts.append("\n")
+            cursor += 1
+
+    page_text = "".join(page_text_parts).rstrip("\n")
+
+    # NOTE: If page has no text (e.g., image-only), page_text may be empty.
+    return PageParse(page_number=page_no, text=page_text, spans=spans.build())
+
+
+_PAGE_PARSERS: Dict[str, Callable[[Any, int], PageParse]] = {
+    "text": _parse_page_text,
+    "blocks": _parse_page_blocks,
+    "spans": _parse_page_spans,
+}
+
+
+def _page_parser(fidelity: str) -> Callable[[Any, int], PageParse]:
+    try:
+        return _PAGE_PARSERS[fidelity]
+    except KeyError:
+        raise ValueError(f"fidelity must be one of {FIDELITY_LEVELS}, got {fidelity!r}") from None
+
+
+def iter_pages(
+    pdf_path: str | Path,
+    start: int = 0,
+    stop: Optional[int] = None,
+    fidelity: Fidelity = "spans",
+) -> Iterator[PageParse]:
     """
-    Parse a PDF with PyMuPDF, returning per-page full text plus span-level text with bboxes and
-    character offsets (for precise citation mapping).
+    Lazily parse pages [start, stop) of a PDF, yielding one PageParse at a time.
+    The document is opened on the first next() and closed when the generator is exhausted or
+    closed, so callers that stream pages onwards keep at most one parsed page alive.
     """
+    parse_page = _page_parser(fidelity)
     pdf_path = Path(pdf_path)
     if not pdf_path.exists():
         raise FileNotFoundError(f"PDF not found: {pdf_path}")
@@ -64,52 +166,106 @@ def parse_pdf(pdf_path: str | Path) -> ParsedDocument:
         log.error(f"Failed to open PDF: {pdf_path} | error={e}")
         raise PdfParseError(f"Cannot open PDF: {pdf_path}") from e
 
-    pages: List[PageParse] = []
+    i = start
     try:
-        for i, page in enumerate(doc):  # 0-based in fitz
-            page_no = i + 1
-            # Use 'dict' to get blocks/lines/spans with geometry
-            # Structure: { "blocks": [ { "lines": [ { "spans": [ { "text", "size", "flags", "font", "bbox" } ] } ] } ] }
-            pdict: Dict[str, Any] = page.get_text("dict")  # layout-aware
-            page_text_parts: List[str] = []
-            spans: List[Span] = []
-            cursor = 0
-
-            for block in pdict.get("blocks", []):
-                for line in block.get("lines", []):
-                    for sp in line.get("spans", []):
-                        text: str = sp.get("text", "") or ""
-                        bbox = sp.get("bbox", [0, 0, 0, 0])
-
-                        # Normalize newlines: PyMuPDF spans rarely include '\n'; we insert spaces/newlines
-                        # Heuristic: append text; add a space between spans in same line
-                        if page_text_parts and not page_text_parts[-1].endswith((" ", "\n")):
-                            # add a space before next span to avoid gluing tokens
-                            page_text_parts.append(" ")
-                            cursor += 1
-
-                        start = cursor
-                        page_text_parts.append(text)
-                        cursor += len(text)
-                        end = cursor
-
-                        spans.append(Span(text=text, bbox=[float(x) for x in bbox], start=start, end=end))
-
-                    # End of a line: add newline
-                    page_text_parts.append("\n")
-                    cursor += 1
+        stop = doc.page_count if stop is None else min(stop, doc.page_count)
+        for i in range(start, stop):
+            page = parse_page(doc[i], i + 1)
+            yield page
+    except Exception as e:
+        log.exception(f"Parsing failed at page index {i} for {pdf_path}: {e}")
+        raise PdfParseError(f"Parsing failed for {pdf_path} at page {i+1}") from e
+    finally:
+        doc.close()
+
+
+def _parse_page_range(pdf_path: str, start: int, stop: int, fidelity: Fidelity = "spans") -> List[PageParse]:
+    """
+    Worker entry point for parallel parsing: open the document once and parse pages [start, stop).
+    Must stay a module-level function so ProcessPoolExecutor can pickle it.
+    """
+    return list(iter_pages(pdf_path, start, stop, fidelity=fidelity))
+
+
+def _page_shards(page_count: int, workers: int) -> List[Tuple[int, int]]:
+    """Split [0, page_count) into contiguous, near-equal (start, stop) ranges, one per worker."""
+    workers = max(1, min(workers, page_count))
+    base, extra = divmod(page_count, workers)
+    shards: List[Tuple[int, int]] = []
+    start = 0
+    for w in range(workers):
+        stop = start + base + (1 if w < extra else 0)
+        shards.append((start, stop))
+        start = stop
+    return shards
+
+
+def _resolve_workers(workers: Optional[int]) -> int:
+    if workers is None:
+        workers = int(get_settings().get("parse_workers", 1) or 1)
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+    return workers
+
+
+def parse_pdf(
+    pdf_path: str | Path,
+    workers: Optional[int] = None,
+    fidelity: Fidelity = "spans",
+) -> ParsedDocument:
+    """
+    Parse a PDF with PyMuPDF, returning per-page full text plus span-level text with bboxes and
+    character offsets (for precise citation mapping).
 
-            page_text = "".join(page_text_parts).rstrip("\n")
+    fidelity: "spans" (default, full geometry), "blocks" (paragraph boxes) or "text" (plain text,
+      no geometry). Every level returns the same PageParse type; lower levels are much faster.
+    workers: number of processes used to parse page shards in parallel.
+      None -> `parse_workers` from config.yaml; 0 or negative -> os.cpu_count(); 1 -> serial.
+    Parallel mode returns exactly the same pages (text and span offsets) as the serial path,
+    because every page is parsed independently and shards are merged back in page order.
+    """
+    parse_page = _page_parser(fidelity)
+    pdf_path = Path(pdf_path)
+    if not pdf_path.exists():
+        raise FileNotFoundError(f"PDF not found: {pdf_path}")
 
-            # NOTE: If page has no text (e.g., image-only), page_text may be empty.
-            pages.append(PageParse(page_number=page_no, text=page_text, spans=spans))
+    try:
+        doc = fitz.open(pdf_path.as_posix())
+    except Exception as e:
+        log.error(f"Failed to open PDF: {pdf_path} | error={e}")
+        raise PdfParseError(f"Cannot open PDF: {pdf_path}") from e
+
+    workers = _resolve_workers(workers)
+    page_count = doc.page_count
+    shards = _page_shards(page_count, min(workers, page_count // MIN_PAGES_PER_SHARD)) if workers > 1 else []
+    parallel = len(shards) > 1
 
+    pages: List[PageParse] = []
+    i = 0
+    try:
+        if not parallel:
+            for i, page in enumerate(doc):  # 0-based in fitz
+                pages.append(parse_page(page, i + 1))
     except Exception as e:
         log.exception(f"Parsing failed at page index {i} for {pdf_path}: {e}")
         raise PdfParseError(f"Parsing failed for {pdf_path} at page {i+1}") from e
     finally:
         doc.close()
 
+    if parallel:
+        try:
+            with ProcessPoolExecutor(max_workers=len(shards)) as pool:
+                futures = [pool.submit(_parse_page_range, pdf_path.as_posix(), a, b, fidelity) for a, b in shards]
+                # Merge in shard order (== page order); result() re-raises worker errors
+                for fut in futures:
+                    pages.extend(fut.result())
+        except PdfParseError as e:
+            log.error(f"Parallel parsing failed for {pdf_path}: {e}")
+            raise
+        except Exception as e:
+            log.exception(f"Parallel parsing failed for {pdf_path}: {e}")
+            raise PdfParseError(f"Parsing failed for {pdf_path}") from e
+
     parsed = ParsedDocument(
         file_path=str(pdf_path.resolve()),
         file_name=pdf_path.name,
@@ -118,7 +274,8 @@ def parse_pdf(pdf_path: str | Path) -> ParsedDocument:
         pages=pages,
     )
     log.info(
-        f"Parsed PDF: name={parsed.file_name} pages={len(parsed.pages)} size={parsed.file_size} md5={parsed.md5}"
+        f"Parsed PDF: name={parsed.file_name} pages={len(parsed.pages)} size={parsed.file_size} "
+        f"md5={parsed.md5} fidelity={fidelity} workers={max(1, len(shards))}"
     )
     return parsed
 
@@ -1,16 +1,30 @@
 # src/ingestion/pipeline.py
 from __future__ import annotations
+import multiprocessing
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 from pathlib import Path
-from typing import Optional, Iterable, Tuple, Callable
+from typing import Optional, Iterator, Tuple, Callable, Dict, Any, List
 
+from utils.config import get_settings
 from utils.logging_utils import get_logger
 from utils.paths import indexes_dir, pdfs_dir
 
-from ingestion.text_cleaning import clean_document_pages
+from ingestion.text_cleaning import iter_clean_pages
 from ingestion.chunking_stream import build_chunks_streaming
-from ingestion.pdf_parser import parse_pdf
+from ingestion.chunk_store import chunk_store_path
+from ingestion.pdf_parser import PARSER_VERSION, file_md5, iter_pages
+from ingestion.text_cleaning import CLEANER_VERSION
+from ingestion.page_cache import PageCache
 from indexing.indexer import upsert_document_chunks
-from indexing.chroma_db import corpus_stats, clear_all, init_chroma
+from indexing.chroma_db import (
+    corpus_stats, clear_all, init_chroma, collection_count, delete_doc, indexed_doc_ids,
+    refresh_vector_index,
+)
+from indexing.minhash_lsh import MinHasher, MinHashIndex
+from indexing.manifest import (
+    delete_manifest_entry, is_current, list_manifest_doc_ids, load_manifest_entry,
+)
 
 from metadata.io import load_metadata, save_metadata, exists_metadata
 from metadata.schema import DocumentMetadata
@@ -22,6 +36,20 @@ log = get_logger("pipeline")
 ProgressCB = Optional[Callable[[float, str], None]]  # percent 0..100, message
 StatusCB   = Optional[Callable[[str], None]]          # text status lines
 
+# The pipeline only consumes page text (geometry is never used downstream),
+# so parse at the cheapest fidelity level.
+PARSE_FIDELITY = "text"
+
+# Everything that determines chunk content; recorded in the index manifest so a change
+# here (or a parser/cleaner version bump) marks every document for re-chunking.
+CHUNKER_PARAMS = {
+    "target_tokens": 1000,
+    "overlap_tokens": 180,
+    "min_block_len_chars": 20,
+    "parser": f"{PARSER_VERSION}{PARSE_FIDELITY}",
+    "cleaner": CLEANER_VERSION,
+}
+
 
 def ensure_metadata_for_pdf(pdf_path: Path, doc_id: str):
     """Create draft metadata JSON if not exists."""
@@ -42,6 +70,150 @@ def ensure_metadata_for_pdf(pdf_path: Path, doc_id: str):
     )
     save_metadata(meta)
 
+
+def _cleaned_page_stream(
+    pdf_path: str | Path,
+    counters: Dict[str, Any],
+    doc_id: Optional[str] = None,
+) -> Iterator[Tuple[int, str]]:
+    """
+    Lazily parse -> clean one page at a time and hand (page_number, cleaned_text) to the chunker.
+    Nothing document-sized is materialized; counters["pages"] is updated as pages flow through,
+    header/footer stripping stats (hf_tokens_saved, ...) once the document is exhausted (replayed
+    from the cache entry on a hit).
+    With doc_id given and the page cache enabled, a cache hit skips parsing and cleaning
+    entirely, and a miss fills the cache as pages stream by.
+    """
+    cache = PageCache() if doc_id and get_settings().get("page_cache_enabled", True) else None
+
+    cached = cache.open(doc_id, PARSE_FIDELITY, stats=counters) if cache else None
+    if cached is not None:
+        counters["cache_hit"] = 1
+        for cp in cached:
+            counters["pages"] = counters.get("pages", 0) + 1
+            yield cp.page_number, cp.cleaned_text
+        return
+
+    raw_pages = ((p.page_number, p.text) for p in iter_pages(pdf_path, fidelity=PARSE_FIDELITY))
+    if cache is None:
+        for cp in iter_clean_pages(raw_pages, stats=counters):
+            counters["pages"] = counters.get("pages", 0) + 1
+            yield cp.page_number, cp.cleaned_text
+        return
+
+    # Miss: tee pages into the cache; entry is committed only if the whole document streams through
+    with cache.writer(doc_id, PARSE_FIDELITY) as w:
+        for cp in iter_clean_pages(raw_pages, stats=counters):
+            w.add(cp)
+            counters["pages"] = counters.get("pages", 0) + 1
+            yield cp.page_number, cp.cleaned_text
+
+
+def _chunk_document(
+    pdf_path: str | Path,
+    doc_id: str,
+    meta: DocumentMetadata,
+    on_progress: ProgressCB = None,
+) -> Tuple[Path, Dict[str, Any]]:
+    """parse -> clean -> chunk one document into the chunk store data/indexes/chunks/{doc_id}.chunks (no Chroma access)."""
+    counters: Dict[str, Any] = {"pages": 0}
+    chunks_path = chunk_store_path(doc_id)
+
+    pages = _cleaned_page_stream(pdf_path, counters, doc_id)
+    hasher = MinHasher() if _near_dup_action() != "off" else None
+    if hasher is not None:
+        pages = _minhash_tee(pages, hasher)
+
+    build_chunks_streaming(
+        doc_id=doc_id,
+        cleaned_pages_iter=pages,
+        out_path=chunks_path,
+        target_tokens=CHUNKER_PARAMS["target_tokens"],
+        overlap_tokens=CHUNKER_PARAMS["overlap_tokens"],
+        min_block_len_chars=CHUNKER_PARAMS["min_block_len_chars"],
+        on_progress=on_progress,
+        meta_doc=meta,               # <-- for titles in chunks
+    )
+    if hasher is not None:
+        counters["minhash"] = hasher.signature()   # None for (near-)empty text
+    return chunks_path, counters
+
+
+def _minhash_tee(pages: Iterator[Tuple[int, str]], hasher: MinHasher) -> Iterator[Tuple[int, str]]:
+    for pno, text in pages:
+        hasher.update(text)
+        yield pno, text
+
+
+def _near_dup_action() -> str:
+    action = str(get_settings().get("near_dup_action", "flag")).lower()
+    return action if action in ("off", "flag", "skip") else "flag"
+
+
+def _near_dup_gate(doc_id: str, meta: DocumentMetadata, signature, report: Callable[[str], None]) -> bool:
+    """
+    Check a freshly chunked document against the MinHash/LSH index before anything is embedded.
+    Records the result in meta.duplicate_of. Returns False if the document must not be indexed
+    (near_dup_action=skip and an earlier near-duplicate exists); any chunks it already had in
+    Chroma are then removed. Otherwise the signature is registered and True is returned.
+    """
+    action = _near_dup_action()
+    if action == "off" or signature is None:
+        return True
+    index = MinHashIndex()
+    threshold = float(get_settings().get("near_dup_threshold", 0.85))
+    matches = index.query(signature, threshold, exclude=doc_id)
+    dup_of = matches[0][0] if matches else None
+    if dup_of != meta.duplicate_of:
+        meta.duplicate_of = dup_of
+        save_metadata(meta)
+    if matches:
+        report(f"near_duplicate | md5={doc_id} of={dup_of} similarity={matches[0][1]:.3f} action={action}")
+        if action == "skip":
+            index.remove(doc_id)
+            delete_doc(doc_id)
+            delete_manifest_entry(doc_id)
+            return False
+    index.add(doc_id, signature)
+    return True
+
+
+def _quiet_progress(pct: float, msg: str) -> None:
+    # Worker processes cannot reach UI callbacks; also keeps the chunker from printing per page
+    pass
+
+
+def _prepare_document(pdf_path: str, doc_id: str, meta: DocumentMetadata) -> Dict[str, Any]:
+    """
+    Worker stage of reindex_all_pdfs (runs in a child process): parse -> clean -> chunk.
+    Never touches Chroma. Any error is caught and returned so one bad PDF cannot take down
+    the pool; the result is a small picklable record for the writer stage.
+    """
+    try:
+        chunks_path, counters = _chunk_document(pdf_path, doc_id, meta, _quiet_progress)
+        return {
+            "doc_id": doc_id,
+            "chunks_path": str(chunks_path),
+            "pages": counters["pages"],
+            "cache_hit": bool(counters.get("cache_hit")),
+            "hf_tokens_saved": counters.get("hf_tokens_saved", 0),
+            "minhash": counters.get("minhash"),
+            "error": None,
+        }
+    except Exception as e:
+        log.error(f"prepare_failed | path={pdf_path} md5={doc_id}: {e}")
+        return {"doc_id": doc_id, "chunks_path": None, "pages": 0, "cache_hit": False,
+                "error": f"{type(e).__name__}: {e}"}
+
+
+def _resolve_reindex_workers(workers: Optional[int], n_jobs: int) -> int:
+    if workers is None:
+        workers = int(get_settings().get("reindex_workers", 0) or 0)
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+    return max(1, min(workers, n_jobs))
+
+
 def ingest_one_pdf(
     pdf_path: str | Path,
     *,
@@ -50,6 +222,10 @@ def ingest_one_pdf(
     on_chunk_progress: ProgressCB = None,
 ) -> str:
     """End-to-end ingestion for a single PDF: parse -> clean -> chunk -> index.
+    The doc_id is computed from the file bytes first; metadata status and the index manifest are
+    checked before PyMuPDF is opened, so drafts and unchanged docs cost one hash pass.
+    Indexing is an idempotent upsert: re-ingesting the same PDF never duplicates chunk ids.
+    reindex=True re-processes a document even if the manifest says it is current.
     Returns: doc_id (md5)
     """
     def report_status(msg: str):
@@ -61,10 +237,9 @@ def ingest_one_pdf(
     pdf_path = str(pdf_path)
     report_status(f"ingest_start | path={pdf_path}")
 
-    # 1) Parse
-    parsed = parse_pdf(pdf_path)
-    doc_id = parsed.md5
-    report_status(f"parsed_pdf | md5={doc_id} pages={len(parsed.pages)}")
+    # 1) Fingerprint (file bytes only; PDF is parsed lazily while chunking)
+    doc_id = file_md5(pdf_path)
+    report_status(f"fingerprinted | md5={doc_id}")
 
     # 2) Metadata handling
     meta = load_metadata(doc_id)
@@ -77,45 +252,66 @@ def ingest_one_pdf(
         log.info(f"Skipping {doc_id}: metadata not ready")
         return doc_id
 
-    # 3) Clean
-    page_texts = [(p.page_number, p.text) for p in parsed.pages]
-    cleaned = clean_document_pages(page_texts)
-    cleaned_iter: Iterable[Tuple[int, str]] = ((cp.page_number, cp.cleaned_text) for cp in cleaned.pages)
-    report_status("cleaned_pages_ready")
-
-    # 4) Chunk (streaming)
-    chunks_dir = indexes_dir() / "chunks"; chunks_dir.mkdir(parents=True, exist_ok=True)
-    jsonl_path = chunks_dir / f"{doc_id}.jsonl"
+    # Already indexed with the same chunker params and metadata → nothing to do
+    if not reindex and is_current(load_manifest_entry(doc_id), CHUNKER_PARAMS, meta):
+        report_status(f"already_indexed | md5={doc_id} (skipping parse)")
+        return doc_id
 
+    # 3-4) Parse + clean + chunk (streaming, one page in memory at a time)
     report_status("chunking_started")
-    build_chunks_streaming(
-        doc_id=doc_id,
-        cleaned_pages_iter=cleaned_iter,
-        out_path=jsonl_path,
-        target_tokens=1000,
-        overlap_tokens=180,
-        min_block_len_chars=20,
-        on_progress=on_chunk_progress,   # <-- drives UI bar
-        meta_doc=meta,               # <-- for titles in chunks
+    chunks_path, counters = _chunk_document(pdf_path, doc_id, meta, on_chunk_progress)  # <-- drives UI bar
+    report_status(
+        f"chunking_done | file={chunks_path} pages={counters['pages']} "
+        f"page_cache={'hit' if counters.get('cache_hit') else 'miss'} "
+        f"hf_lines_removed={counters.get('hf_lines_removed', 0)} hf_tokens_saved={counters.get('hf_tokens_saved', 0)}"
     )
-    report_status(f"chunking_done | file={jsonl_path}")
 
-    # 5) Index
+    # 5) Near-duplicate check (before any embedding call)
+    if not _near_dup_gate(doc_id, meta, counters.get("minhash"), report_status):
+        report_status(f"ingest_skipped | md5={doc_id} near-duplicate of {meta.duplicate_of}")
+        return doc_id
+
+    # 6) Index
     report_status("indexing_started")
-    upsert_document_chunks(doc_id, jsonl_path)
-    report_status("indexing_done")
+    stats = upsert_document_chunks(doc_id, chunks_path, CHUNKER_PARAMS)
+    report_status(
+        f"indexing_done | chunks={stats['chunks']} upserted={stats['upserted']} unchanged={stats['unchanged']} "
+        f"embedded={stats['embedded']} reused={stats['reused']} cache_hits={stats['cache_hits']} embed_tokens_saved={stats['embed_tokens_saved']}"
+    )
+
+    exported = refresh_vector_index()
+    if exported is not None:
+        report_status(f"vector_index_refreshed | rows={exported}")
 
-    report_status("ingest_done")
+    report_status(f"ingest_done | md5={doc_id} pages={counters['pages']}")
     return doc_id
 
 
 def reindex_all_pdfs(
     on_status: StatusCB = None,
     on_progress: ProgressCB = None,
-    force: bool = True
+    force: bool = False,
+    workers: Optional[int] = None,
 ) -> dict:
     """
-    Reindex all PDFs from data/pdfs folder in a robust, isolated way.
+    Incrementally reindex all PDFs from data/pdfs folder in a robust, isolated way.
+
+    The index manifest (doc_id -> chunker params, metadata hash, chunk hashes) is diffed
+    against data/pdfs and the metadata store:
+      - new docs are chunked and added,
+      - docs whose PDF was removed (or whose metadata is no longer ready) are deleted from Chroma,
+      - docs whose chunker params or metadata changed are re-chunked; only changed chunks are upserted,
+      - untouched docs are skipped without opening the PDF,
+      - near-duplicates of another document (MinHash/LSH, see near_dup_action) are flagged or skipped
+        before embedding.
+    force=True wipes the collection and rebuilds everything from scratch.
+
+    Pipelined: a pool of `workers` processes (None -> `reindex_workers` from config.yaml,
+    0 -> all cores, 1 -> serial in-process) parses, cleans and chunks documents concurrently,
+    while this process is the single writer doing Chroma upserts, so the persistent client is
+    never shared across processes. At most 2 x workers documents are in flight, which bounds
+    both pending work and finished-but-unwritten chunk files (backpressure). Callbacks are only
+    ever invoked from this process.
     Returns final corpus stats {docs, chunks}.
     """
 
@@ -127,13 +323,19 @@ def reindex_all_pdfs(
                 pass
         log.info(msg)
 
+    def progress(pct: float, msg: str):
+        if on_progress:
+            try:
+                on_progress(pct, msg)
+            except Exception:
+                pass
+
     pdf_dir = Path(pdfs_dir())
     pdfs = sorted(pdf_dir.glob("*.pdf"))
     if not pdfs:
-        report("No PDFs found in data/pdfs")
-        return {"docs": 0, "chunks": 0}
+        report("No PDFs found in data/pdfs")   # still continue: previously indexed docs get removed
 
-    # Step 1: Clear collection if requested
+    # Step 1: Clear collection (and manifest) if a full rebuild was requested
     if force:
         report("Clearing existing Chroma collection...")
         clear_all()
@@ -141,63 +343,164 @@ def reindex_all_pdfs(
     # Step 2: Ensure collection exists before starting
     _, coll = init_chroma()
 
-    # Prepare chunks dir
-    chunks_dir = indexes_dir() / "chunks"
-    chunks_dir.mkdir(parents=True, exist_ok=True)
+    # What is currently indexed. Without a manifest (index built before manifests existed)
+    # fall back to a one-off scan of the collection so orphans can still be removed.
+    indexed = set(list_manifest_doc_ids())
+    if not indexed and collection_count(coll) > 0:
+        indexed = indexed_doc_ids(coll)
 
     total = len(pdfs)
-    successes, failures = 0, 0
+    successes, failures, skipped, unchanged = 0, 0, 0, 0
 
-    report(f"Starting reindex for {total} PDFs...")
+    report(f"Starting {'full' if force else 'incremental'} reindex for {total} PDFs...")
 
-    # Step 3: Process each PDF independently
+    # Step 3: Plan — hash + metadata + manifest diff (cheap, no PDF parsing)
+    wanted: set = set()
+    jobs: List[Tuple[Path, str, DocumentMetadata]] = []
+    known_dups: List[Tuple[int, Path, str, DocumentMetadata]] = []
+    skip_dups = _near_dup_action() == "skip"
     for i, pdf_path in enumerate(pdfs, start=1):
-        report(f"[{i}/{total}] Processing {pdf_path.name}")
-
         try:
-            parsed = parse_pdf(pdf_path)
-            doc_id = parsed.md5
+            doc_id = file_md5(pdf_path)
 
             # Load and validate metadata
             meta = load_metadata(doc_id)
             if not meta or meta.status != "ready":
                 report(f"Skipping {doc_id}: metadata missing or not ready")
-                failures += 1
+                skipped += 1
+                continue
+
+            if doc_id in wanted:
+                report(f"[{i}/{total}] Skipping {pdf_path.name}: duplicate of an earlier file (md5={doc_id})")
+                skipped += 1
                 continue
 
-            # Clean text
-            page_texts = [(p.page_number, p.text) for p in parsed.pages]
-            cleaned = clean_document_pages(page_texts)
-            cleaned_iter = ((cp.page_number, cp.cleaned_text) for cp in cleaned.pages)
-
-            # Chunk to JSONL
-            jsonl_path = chunks_dir / f"{doc_id}.jsonl"
-            build_chunks_streaming(
-                doc_id=doc_id,
-                cleaned_pages_iter=cleaned_iter,
-                out_path=jsonl_path,
-                target_tokens=1000,
-                overlap_tokens=180,
-                min_block_len_chars=20,
-                on_progress=on_progress,
-                meta_doc=meta,
-            )
-
-            # Index into Chroma
-            upsert_document_chunks(doc_id, jsonl_path)
-
-            successes += 1
-            report(f"[{i}/{total}] Done: {pdf_path.name}")
+            # Known near-duplicate: decided once all originals are known (below)
+            if skip_dups and meta.duplicate_of and meta.duplicate_of != doc_id:
+                known_dups.append((i, pdf_path, doc_id, meta))
+                continue
+            wanted.add(doc_id)
+
+            # Same bytes, same chunker params, same metadata → chunks in Chroma are current
+            if not force and is_current(load_manifest_entry(doc_id), CHUNKER_PARAMS, meta):
+                unchanged += 1
+                continue
 
+            jobs.append((pdf_path, doc_id, meta))
         except Exception as e:
             failures += 1
             report(f"[{i}/{total}] Failed: {pdf_path.name} | Error: {e}")
 
-    # Step 4: Final corpus stats
+    # Near-duplicates whose original is still in the corpus are not re-processed at all;
+    # if the original is gone, the copy is processed (and re-checked) like any other doc.
+    for i, pdf_path, doc_id, meta in known_dups:
+        if meta.duplicate_of in wanted:
+            report(f"[{i}/{total}] Skipping {pdf_path.name}: near-duplicate of {meta.duplicate_of}")
+            skipped += 1
+            continue
+        wanted.add(doc_id)
+        jobs.append((pdf_path, doc_id, meta))
+    meta_by_id = {doc_id: meta for _, doc_id, meta in jobs}
+
+    # Step 4: Remove docs that are indexed but no longer wanted (PDF gone / metadata not ready)
+    removed = 0
+    near_dup_index = MinHashIndex()
+    for doc_id in sorted(indexed - wanted):
+        try:
+            delete_doc(doc_id, coll)
+            delete_manifest_entry(doc_id)
+            near_dup_index.remove(doc_id)
+            chunk_store_path(doc_id).unlink(missing_ok=True)
+            (indexes_dir() / "chunks" / f"{doc_id}.jsonl").unlink(missing_ok=True)   # pre-chunk-store files
+            removed += 1
+            report(f"Removed from index: {doc_id}")
+        except Exception as e:
+            failures += 1
+            report(f"Failed to remove {doc_id} | Error: {e}")
+
+    # Step 5: Worker stage (parse/clean/chunk) feeding the single writer stage (Chroma upserts)
+    n_jobs = len(jobs)
+    written = 0
+    upserted_chunks = 0
+    hf_tokens_saved = 0
+    embed_tokens_saved = 0
+
+    def write(pdf_path: Path, result: Dict[str, Any]) -> None:
+        nonlocal successes, failures, skipped, written, upserted_chunks, hf_tokens_saved, embed_tokens_saved
+        written += 1
+        tag = f"[{written}/{n_jobs}]"
+        if result.get("error"):
+            failures += 1
+            report(f"{tag} Failed: {pdf_path.name} | Error: {result['error']}")
+        else:
+            try:
+                meta = meta_by_id[result["doc_id"]]
+                if not _near_dup_gate(result["doc_id"], meta, result.get("minhash"), report):
+                    skipped += 1
+                    report(f"{tag} Skipped: {pdf_path.name} | near-duplicate of {meta.duplicate_of}")
+                else:
+                    st = upsert_document_chunks(result["doc_id"], result["chunks_path"], CHUNKER_PARAMS)
+                    upserted_chunks += st["upserted"]
+                    embed_tokens_saved += st["embed_tokens_saved"]
+                    hf_tokens_saved += result.get("hf_tokens_saved", 0)
+                    successes += 1
+                    report(
+                        f"{tag} Done: {pdf_path.name} | md5={result['doc_id']} pages={result['pages']} "
+                        f"chunks={st['chunks']} upserted={st['upserted']} reused={st['reused']} cache_hits={st['cache_hits']} "
+                        f"hf_tokens_saved={result.get('hf_tokens_saved', 0)} embed_tokens_saved={st['embed_tokens_saved']}"
+                    )
+            except Exception as e:
+                failures += 1
+                report(f"{tag} Failed: {pdf_path.name} | Error: {e}")
+        progress(written * 100.0 / n_jobs, f"Indexed {written}/{n_jobs} documents")
+
+    if n_jobs:
+        n_workers = _resolve_reindex_workers(workers, n_jobs)
+        report(f"Processing {n_jobs} PDFs with {n_workers} worker(s)...")
+
+        if n_workers == 1:
+            for pdf_path, doc_id, meta in jobs:
+                write(pdf_path, _prepare_document(str(pdf_path), doc_id, meta))
+        else:
+            max_in_flight = 2 * n_workers
+            queue = iter(jobs)
+            pending: Dict[Any, Tuple[Path, str]] = {}
+            # spawn, not fork: the parent already holds the Chroma client (native threads) and
+            # often runs inside Streamlit; a forked child could inherit locks held at fork time
+            ctx = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=n_workers, mp_context=ctx) as pool:
+                while True:
+                    # Refill up to the in-flight bound
+                    while len(pending) < max_in_flight:
+                        job = next(queue, None)
+                        if job is None:
+                            break
+                        pdf_path, doc_id, meta = job
+                        fut = pool.submit(_prepare_document, str(pdf_path), doc_id, meta)
+                        pending[fut] = (pdf_path, doc_id)
+                    if not pending:
+                        break
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for fut in done:
+                        pdf_path, doc_id = pending.pop(fut)
+                        try:
+                            result = fut.result()
+                        except Exception as e:   # e.g. worker process died
+                            result = {"doc_id": doc_id, "error": f"{type(e).__name__}: {e}"}
+                        write(pdf_path, result)
+    else:
+        progress(100.0, "Index is up to date")
+
+    exported = refresh_vector_index()
+    if exported is not None:
+        report(f"Local vector index refreshed: {exported} vectors")
+
+    # Step 6: Final corpus stats
     stats = corpus_stats()
     report(
         f"Reindex complete. "
-        f"Successes: {successes}, Failures: {failures}, "
-        f"Docs: {stats['docs']}, Chunks: {stats['chunks']}"
+        f"Successes: {successes}, Failures: {failures}, Skipped: {skipped}, "
+        f"Unchanged: {unchanged}, Removed: {removed}, Chunks upserted: {upserted_chunks}, "
+        f"Header/footer tokens saved: {hf_tokens_saved}, Embedding tokens saved: {embed_tokens_saved}, Docs: {stats['docs']}, Chunks: {stats['chunks']}"
     )
     return stats
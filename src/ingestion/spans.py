@@ -0,0 +1,176 @@
+# src/ingestion/spans.py
+from __future__ import annotations
+from array import array
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Iterator, List, Sequence
+
+import numpy as np
+
+
+@dataclass
+class Span:
+    text: str
+    bbox: List[float]         # [x0, y0, x1, y1]
+    start: int                # char start offset in page_text
+    end: int                  # char end offset (exclusive)
+
+
+class SpanTable:
+    """
+    Columnar, array-backed span storage for one page.
+      bboxes:       float32 (n, 4)
+      starts/ends:  int32 (n,)   char offsets into the page text
+      text_offsets: int64 (n+1,) byte offsets of each span's text inside `text_buf`
+      text_buf:     uint8 buffer holding all span texts UTF-8 encoded and joined
+    Arrays may be in-memory or np.memmap views (see load_spans); iteration still yields Span
+    objects lazily, so existing consumers (parsed_document_to_dict, citations) keep working.
+    """
+    __slots__ = ("bboxes", "starts", "ends", "text_offsets", "text_buf")
+
+    def __init__(
+        self,
+        bboxes: np.ndarray,
+        starts: np.ndarray,
+        ends: np.ndarray,
+        text_offsets: np.ndarray,
+        text_buf: np.ndarray,
+    ):
+        self.bboxes = bboxes
+        self.starts = starts
+        self.ends = ends
+        self.text_offsets = text_offsets
+        self.text_buf = text_buf
+
+    @classmethod
+    def empty(cls) -> "SpanTable":
+        return SpanTableBuilder().build()
+
+    def __len__(self) -> int:
+        return int(self.starts.shape[0])
+
+    def __iter__(self) -> Iterator[Span]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def __getitem__(self, i: int) -> Span:
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return Span(
+            text=self.text_of(i),
+            bbox=[float(x) for x in self.bboxes[i]],
+            start=int(self.starts[i]),
+            end=int(self.ends[i]),
+        )
+
+    def text_of(self, i: int) -> str:
+        a, b = int(self.text_offsets[i]), int(self.text_offsets[i + 1])
+        return self.text_buf[a:b].tobytes().decode("utf-8")
+
+    @property
+    def nbytes(self) -> int:
+        lo, hi = (int(self.text_offsets[0]), int(self.text_offsets[-1])) if len(self) else (0, 0)
+        return (self.bboxes.nbytes + self.starts.nbytes + self.ends.nbytes
+                + self.text_offsets.nbytes + (hi - lo))
+
+
+class SpanTableBuilder:
+    """Append spans one at a time (as the parser walks a page), then freeze into a SpanTable."""
+    __slots__ = ("_bboxes", "_starts", "_ends", "_offsets", "_text")
+
+    def __init__(self):
+        self._bboxes = array("f")
+        self._starts = array("i")
+        self._ends = array("i")
+        self._offsets = array("q", [0])
+        self._text = bytearray()
+
+    def append(self, text: str, bbox: Sequence[float], start: int, end: int) -> None:
+        self._bboxes.extend(bbox)
+        self._starts.append(start)
+        self._ends.append(end)
+        self._text += text.encode("utf-8")
+        self._offsets.append(len(self._text))
+
+    def build(self) -> SpanTable:
+        return SpanTable(
+            bboxes=np.frombuffer(self._bboxes, dtype=np.float32).reshape(-1, 4).copy(),
+            starts=np.frombuffer(self._starts, dtype=np.int32).copy(),
+            ends=np.frombuffer(self._ends, dtype=np.int32).copy(),
+            text_offsets=np.frombuffer(self._offsets, dtype=np.int64).copy(),
+            text_buf=np.frombuffer(bytes(self._text), dtype=np.uint8),
+        )
+
+
+# ==============================
+# Persistence (np.save / mmap)
+# ==============================
+_FILES = ("bboxes", "starts", "ends", "text_offsets", "text_buf", "page_offsets", "page_numbers")
+
+
+def save_spans(pages: Iterable[object], out_dir: str | Path) -> Path:
+    """
+    Persist the spans of a document (iterable of PageParse) as one set of .npy files:
+    all pages are concatenated and `page_offsets` (P+1) marks where each page's spans begin.
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    bboxes: List[np.ndarray] = []
+    starts: List[np.ndarray] = []
+    ends: List[np.ndarray] = []
+    text_parts: List[np.ndarray] = []
+    offsets: List[np.ndarray] = [np.zeros(1, dtype=np.int64)]
+    page_offsets = [0]
+    page_numbers: List[int] = []
+    text_base = 0
+
+    for p in pages:
+        t: SpanTable = p.spans
+        bboxes.append(t.bboxes)
+        starts.append(t.starts)
+        ends.append(t.ends)
+        lo, hi = int(t.text_offsets[0]), int(t.text_offsets[-1])
+        text_parts.append(t.text_buf[lo:hi])
+        offsets.append(t.text_offsets[1:] - lo + text_base)
+        text_base += hi - lo
+        page_offsets.append(page_offsets[-1] + len(t))
+        page_numbers.append(p.page_number)
+
+    arrays = {
+        "bboxes": np.concatenate(bboxes) if bboxes else np.zeros((0, 4), dtype=np.float32),
+        "starts": np.concatenate(starts) if starts else np.zeros(0, dtype=np.int32),
+        "ends": np.concatenate(ends) if ends else np.zeros(0, dtype=np.int32),
+        "text_offsets": np.concatenate(offsets).astype(np.int64),
+        "text_buf": np.concatenate(text_parts) if text_parts else np.zeros(0, dtype=np.uint8),
+        "page_offsets": np.asarray(page_offsets, dtype=np.int64),
+        "page_numbers": np.asarray(page_numbers, dtype=np.int32),
+    }
+    for name in _FILES:
+        np.save(out_dir / f"{name}.npy", arrays[name])
+    return out_dir
+
+
+def load_spans(in_dir: str | Path, mmap: bool = True) -> List[SpanTable]:
+    """
+    Load spans written by save_spans, one SpanTable per page (in saved order).
+    With mmap=True every table is a zero-copy view over memory-mapped files.
+    """
+    in_dir = Path(in_dir)
+    mode = "r" if mmap else None
+    a = {name: np.load(in_dir / f"{name}.npy", mmap_mode=mode) for name in _FILES}
+
+    tables: List[SpanTable] = []
+    po = a["page_offsets"]
+    for k in range(len(po) - 1):
+        lo, hi = int(po[k]), int(po[k + 1])
+        tables.append(SpanTable(
+            bboxes=a["bboxes"][lo:hi],
+            starts=a["starts"][lo:hi],
+            ends=a["ends"][lo:hi],
+            text_offsets=a["text_offsets"][lo:hi + 1],   # absolute offsets into the shared buffer
+            text_buf=a["text_buf"],
+        ))
+    return tables
@@ -1,7 +1,9 @@
 # src/ingestion/text_cleaning.py
 from __future__ import annotations
+from collections import Counter
 from dataclasses import dataclass
-from typing import List, Tuple, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Tuple, Optional
+import hashlib
 import re
 import unicodedata
 
@@ -9,6 +11,9 @@ from utils.logging_utils import get_logger
 
 log = get_logger("text_cleaning")
 
+# Bump whenever cleaned_text output changes (invalidates the on-disk page cache)
+CLEANER_VERSION = "2"   # 2: repeated header/footer lines are stripped
+
 
 # ==============================
 # Data structures
@@ -18,36 +23,51 @@ class CleanedPage:
     page_number: int                  # 1-based
     raw_text: str                     # original page text (unchanged)
     cleaned_text: str                 # cleaned content used for embeddings/BM25/LLM
-    removed_lines: List[str]          # unused in minimal mode (kept for API compatibility)
-    kept_line_indices: List[int]      # unused in minimal mode (kept for API compatibility)
+    removed_lines: List[str]          # header/footer lines stripped before cleaning
+    kept_line_indices: List[int]      # indices into raw_text.split("\n") kept (empty = nothing removed)
 
 
 @dataclass
 class CleanedDocument:
     pages: List[CleanedPage]
-    header_candidates: List[str]      # empty in minimal mode
-    footer_candidates: List[str]      # empty in minimal mode
+    header_candidates: List[str]      # one example per detected repeated header line
+    footer_candidates: List[str]      # one example per detected repeated footer line
+    tokens_saved: int = 0             # estimated tokens removed with those lines
 
 
 # ==============================
-# Regex helpers (minimal mode)
+# Regex helpers
 # ==============================
-_DEHYPHENATE_RE      = re.compile(r"(\w+)-\n(\w+)")
-_SINGLE_NL_RE        = re.compile(r"(?<!\n)\n(?!\n)")  # single \n not part of \n\n
-_MULTI_BLANKS_RE     = re.compile(r"\n{3,}")           # 3+ blank lines
+# One pass handles chained hyphens ('a-\nb-\nc'): lookarounds don't consume the word chars,
+# which is why the old '(\w+)-\n(\w+)' needed a re-scan loop.
+_DEHYPHENATE_RE      = re.compile(r"(?<=\w)-\n(?=\w)")
+_PARAGRAPH_RE        = re.compile(r"\n\n+")            # 2+ newlines = paragraph break
 _MULTI_SPACES_RE     = re.compile(r"[ \t]{2,}")        # 2+ spaces/tabs
 _CONTROL_CHARS_RE    = re.compile(r"[\u0000-\u0008\u000B\u000C\u000E-\u001F\u007F]")
+_CONTROL_CHARS_TABLE = dict.fromkeys([*range(0x00, 0x09), 0x0B, 0x0C, *range(0x0E, 0x20), 0x7F])
+_PARA_SENTINEL       = "\x00"   # control chars are already gone, so it cannot occur in the text
+
+# Header/footer detection
+HF_EDGE_LINES        = 3       # non-empty lines inspected at the top and at the bottom of a page
+HF_MIN_PAGES         = 3       # a line must repeat on at least this many pages ...
+HF_MIN_RATIO         = 0.5     # ... and on at least this share of the pages seen so far
+HF_WARMUP_PAGES      = 12      # pages buffered before the first strip decision (streaming)
+HF_MAX_LINE_CHARS    = 160     # longer lines are body text, never headers
+_DIGITS_RE           = re.compile(r"\d+")
+_WHITESPACE_RE       = re.compile(r"\s+")
 
 
 # ==============================
-# Public API (minimal cleaning)
+# Public API
 # ==============================
 def clean_document_pages(
     page_texts: List[Tuple[int, str]],
     pdf_path: Optional[str] = None,   # ignored in the simplified version
+    strip_repeated: bool = True,
 ) -> CleanedDocument:
     """
-    Minimal cleaning for v1 (header/footer detection disabled):
+    Page cleaning:
+      - Strip running headers/footers (page numbers, titles, copyright lines) that repeat across pages
       - Unicode normalize (NFKC) + strip control chars
       - Standardize newlines to '\n'
       - Fix hyphenation across line breaks: 'word-\\nword' -> 'wordword'
@@ -56,66 +76,187 @@ def clean_document_pages(
     Returns a CleanedDocument with per-page cleaned_text for embeddings/BM25/LLM.
     raw_text remains untouched for citation anchoring elsewhere.
     """
-    cleaned_pages: List[CleanedPage] = []
+    stats: Dict[str, Any] = {}
+    cleaned_pages: List[CleanedPage] = list(iter_clean_pages(page_texts, strip_repeated, stats))
 
-    for (pno, raw_page_text) in page_texts:
-        # 1) Normalize unicode (NFKC) and remove control characters
-        txt = _normalize_unicode(raw_page_text)
-        txt = _strip_control_chars(txt)
+    log.info(
+        f"cleaned_pages_done | count={len(cleaned_pages)} "
+        f"hf_lines_removed={stats.get('hf_lines_removed', 0)} hf_tokens_saved={stats.get('hf_tokens_saved', 0)}"
+    )
+    return CleanedDocument(
+        pages=cleaned_pages,
+        header_candidates=stats.get("header_candidates", []),
+        footer_candidates=stats.get("footer_candidates", []),
+        tokens_saved=stats.get("hf_tokens_saved", 0),
+    )
 
-        # 2) Standardize newlines
-        txt = txt.replace("\r\n", "\n").replace("\r", "\n")
 
-        # 3) De-hyphenate across line breaks: 'foo-\\nbar' -> 'foobar'
-        txt = _dehyphenate_across_lines(txt)
+def iter_clean_pages(
+    page_texts: Iterable[Tuple[int, str]],
+    strip_repeated: bool = True,
+    stats: Optional[Dict[str, Any]] = None,
+) -> Iterator[CleanedPage]:
+    """
+    Streaming counterpart of clean_document_pages: consume (page_number, raw_text) pairs lazily
+    and yield one CleanedPage at a time. With strip_repeated, the first HF_WARMUP_PAGES pages are
+    buffered to build line statistics; after that memory is bounded by a single page again.
+    When the stream is exhausted, `stats` (if given) is updated with
+    hf_lines_removed / hf_tokens_saved / header_candidates / footer_candidates.
+    """
+    if not strip_repeated:
+        for (pno, raw_page_text) in page_texts:
+            yield _make_page(pno, raw_page_text, [], None)
+        return
 
-        # 4) Collapse SINGLE newlines -> space; keep DOUBLE newlines as paragraph breaks
-        txt = _collapse_single_newlines(txt)
+    det = HeaderFooterDetector()
+    buffered: List[Tuple[int, str, List[Tuple[int, str, bytes]]]] = []
+    for (pno, raw_page_text) in page_texts:
+        buffered.append((pno, raw_page_text, det.observe(raw_page_text)))
+        if det.pages_seen < HF_WARMUP_PAGES:
+            continue
+        for item in buffered:
+            yield det.clean(*item)
+        buffered.clear()
+    for item in buffered:   # short documents: decided on all of their pages at once
+        yield det.clean(*item)
 
-        # 5) Collapse multiple spaces + reduce 3+ blank lines to exactly 2
-        txt = _collapse_whitespace(txt)
+    if stats is not None:
+        stats.update(det.summary())
 
-        cleaned_pages.append(CleanedPage(
-            page_number=pno,
-            raw_text=raw_page_text,   # keep original for precise citation offsets
-            cleaned_text=txt,
-            removed_lines=[],         # not used in minimal mode
-            kept_line_indices=[],     # not used in minimal mode
-        ))
 
-    log.info(f"cleaned_pages_done | count={len(cleaned_pages)} (minimal mode)")
-    return CleanedDocument(
-        pages=cleaned_pages,
-        header_candidates=[],  # not computed in minimal mode
-        footer_candidates=[],
+def _make_page(pno: int, raw_page_text: str, removed: List[str], kept: Optional[List[int]]) -> CleanedPage:
+    if removed:
+        lines = raw_page_text.split("\n")
+        text_in = "\n".join(lines[i] for i in kept)
+    else:
+        text_in = raw_page_text
+        kept = []   # nothing removed: every line kept, not worth materializing
+    return CleanedPage(
+        page_number=pno,
+        raw_text=raw_page_text,   # keep original for precise citation offsets
+        cleaned_text=_clean_page_text(text_in),
+        removed_lines=removed,
+        kept_line_indices=kept,
     )
 
 
 # ==============================
-# Internal helpers (minimal mode)
+# Header/footer detection
+# ==============================
+def line_fingerprint(line: str) -> Optional[bytes]:
+    """
+    Hash of a normalized line: NFKC, lowercase, digit runs -> '#', whitespace collapsed, so
+    'Page 3 of 120' and 'Page 4 of 120' share a fingerprint. None for blank/overlong lines.
+    """
+    norm = unicodedata.normalize("NFKC", line).lower()
+    norm = _WHITESPACE_RE.sub(" ", _DIGITS_RE.sub("#", norm)).strip()
+    if not norm or len(norm) > HF_MAX_LINE_CHARS:
+        return None
+    return hashlib.blake2b(norm.encode("utf-8"), digest_size=8).digest()
+
+
+class HeaderFooterDetector:
+    """
+    Single-pass repeated-line detector. Each page contributes the fingerprints of its first and
+    last HF_EDGE_LINES non-empty lines (counted once per page and per zone). A line is stripped
+    when its fingerprint was seen on >= HF_MIN_PAGES pages and on >= HF_MIN_RATIO of all pages
+    observed so far. Only 8-byte hashes are kept per distinct line, plus one example per zone key.
+    """
+
+    def __init__(self):
+        self.pages_seen = 0
+        self.counts: Counter = Counter()
+        self.examples: Dict[Tuple[str, bytes], str] = {}
+        self.lines_removed = 0
+        self.chars_removed = 0
+        self.tokens_saved = 0
+
+    def observe(self, raw_page_text: str) -> List[Tuple[int, str, bytes]]:
+        """Count this page's edge lines; returns them as (line_idx, zone, fingerprint)."""
+        self.pages_seen += 1
+        lines = (raw_page_text or "").split("\n")
+        non_empty = [i for i, ln in enumerate(lines) if ln.strip()]
+        edges: List[Tuple[int, str, bytes]] = []
+        seen = set()
+        for zone, idxs in (("header", non_empty[:HF_EDGE_LINES]), ("footer", non_empty[-HF_EDGE_LINES:])):
+            for i in idxs:
+                fp = line_fingerprint(lines[i])
+                if fp is None:
+                    continue
+                edges.append((i, zone, fp))
+                if (zone, fp) not in seen:
+                    seen.add((zone, fp))
+                    self.counts[(zone, fp)] += 1
+                    self.examples.setdefault((zone, fp), lines[i].strip())
+        return edges
+
+    def is_repeated(self, key: Tuple[str, bytes]) -> bool:
+        c = self.counts.get(key, 0)
+        return c >= HF_MIN_PAGES and c >= HF_MIN_RATIO * self.pages_seen
+
+    def clean(self, pno: int, raw_page_text: str, edges: List[Tuple[int, str, bytes]]) -> CleanedPage:
+        drop = {i for (i, zone, fp) in edges if self.is_repeated((zone, fp))}
+        if not drop:
+            return _make_page(pno, raw_page_text, [], None)
+        lines = raw_page_text.split("\n")
+        removed = [lines[i] for i in sorted(drop)]
+        kept = [i for i in range(len(lines)) if i not in drop]
+        lines_n, chars_n, tokens_n = hf_removal_counts(removed)
+        self.lines_removed += lines_n
+        self.chars_removed += chars_n
+        self.tokens_saved += tokens_n
+        return _make_page(pno, raw_page_text, removed, kept)
+
+    def summary(self) -> Dict[str, Any]:
+        repeated = [k for k in self.counts if self.is_repeated(k)]
+        return {
+            "hf_lines_removed": self.lines_removed,
+            "hf_chars_removed": self.chars_removed,
+            "hf_tokens_saved": self.tokens_saved,
+            "header_candidates": [self.examples[k] for k in repeated if k[0] == "header"],
+            "footer_candidates": [self.examples[k] for k in repeated if k[0] == "footer"],
+        }
+
+
+def hf_removal_counts(removed_lines: List[str]) -> Tuple[int, int, int]:
+    """(lines, chars, ~tokens) saved by stripping these header/footer lines from one page."""
+    chars = [len(ln.strip()) for ln in removed_lines]
+    # same ~4 chars/token estimate as the chunker
+    return len(chars), sum(chars), sum(max(1, n // 4) for n in chars)
+
+
+# ==============================
+# Internal helpers
 # ==============================
-def _normalize_unicode(text: str) -> str:
-    return unicodedata.normalize("NFKC", text or "")
-
-def _strip_control_chars(text: str) -> str:
-    return _CONTROL_CHARS_RE.sub("", text)
-
-def _dehyphenate_across_lines(text: str) -> str:
-    # Apply repeatedly in case there are several occurrences
-    prev = None
-    while prev != text:
-        prev = text
-        text = _DEHYPHENATE_RE.sub(r"\1\2", text)
-    return text
-
-def _collapse_single_newlines(text: str) -> str:
-    # Turn single \n into a space; leave \n\n intact (paragraph separation)
-    return _SINGLE_NL_RE.sub(" ", text)
-
-def _collapse_whitespace(text: str) -> str:
-    # Reduce 3+ blank lines to exactly 2 (keep paragraph separation)
-    text = _MULTI_BLANKS_RE.sub("\n\n", text)
-    # Collapse multiple spaces/tabs
-    text = _MULTI_SPACES_RE.sub(" ", text)
-    # Final trim
-    return text.strip()
+def _clean_page_text(raw_page_text: str) -> str:
+    """
+    Fused cleaner: every step is skipped when it has nothing to do, and the remaining ones are
+    single passes (str.translate / str.replace where possible). Output is identical to the
+    original step-by-step implementation (see scripts/bench_text_cleaning.py).
+    """
+    txt = raw_page_text or ""
+
+    # 1) Normalize unicode (NFKC) and remove control characters
+    if not unicodedata.is_normalized("NFKC", txt):
+        txt = unicodedata.normalize("NFKC", txt)
+    if txt.isascii():
+        txt = txt.translate(_CONTROL_CHARS_TABLE)   # fast path for ASCII strings only
+    else:
+        txt = _CONTROL_CHARS_RE.sub("", txt)
+
+    # 2) Standardize newlines
+    if "\r" in txt:
+        txt = txt.replace("\r\n", "\n").replace("\r", "\n")
+
+    # 3) De-hyphenate across line breaks: 'foo-\\nbar' -> 'foobar'
+    if "-\n" in txt:
+        txt = _DEHYPHENATE_RE.sub("", txt)
+
+    # 4) SINGLE newlines -> space; runs of 2+ -> exactly one paragraph break
+    if "\n\n" in txt:
+        txt = _PARAGRAPH_RE.sub(_PARA_SENTINEL, txt).replace("\n", " ").replace(_PARA_SENTINEL, "\n\n")
+    else:
+        txt = txt.replace("\n", " ")
+
+    # 5) Collapse multiple spaces/tabs + final trim
+    return _MULTI_SPACES_RE.sub(" ", txt).strip()
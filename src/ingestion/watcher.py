@@ -0,0 +1,268 @@
+# src/ingestion/watcher.py
+from __future__ import annotations
+import json
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from utils.config import get_settings
+from utils.logging_utils import get_logger
+from utils.paths import indexes_dir, metadata_dir, pdfs_dir
+
+from ingestion.pdf_parser import file_md5
+from ingestion.pipeline import _quiet_progress, ensure_metadata_for_pdf, ingest_one_pdf
+from indexing.manifest import meta_fingerprint
+from metadata.io import load_metadata
+
+log = get_logger("watcher")
+
+MAX_ATTEMPTS = 3
+THROUGHPUT_WINDOW_S = 600   # docs/min is computed over the last 10 minutes
+
+
+def _state_path() -> Path:
+    return indexes_dir() / "watch_state.json"
+
+
+def _stats_path() -> Path:
+    return indexes_dir() / "watch_stats.json"
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class PdfWatcher:
+    """
+    Polling watcher for data/pdfs and the metadata dir (works on any filesystem, incl. network
+    shares where inotify/FSEvents are unavailable).
+
+    - A PDF is considered stable once its (size, mtime) has not changed for `debounce` seconds.
+      New stable PDFs get draft metadata; if metadata is already ready, the doc is enqueued.
+    - A metadata JSON that becomes ready (or changes while ready) enqueues its document.
+    - The queue is persisted in data/indexes/watch_state.json together with what has already
+      been seen, so a restart resumes pending work without re-enqueueing handled files.
+      Items stay in the queue until ingestion finishes (at-least-once; ingestion is idempotent).
+    - Up to `workers` documents are ingested concurrently (thread pool). Only the polling
+      thread touches the queue/state, so no locking is needed.
+    - Counters (queue depth, in-flight, processed/failed totals, docs/min) are available from
+      stats() and written to data/indexes/watch_stats.json every poll.
+    """
+
+    def __init__(
+        self,
+        poll_interval: Optional[float] = None,
+        debounce: Optional[float] = None,
+        workers: Optional[int] = None,
+        state_path: Optional[Path] = None,
+    ):
+        cfg = get_settings()
+        self.poll_interval = float(poll_interval if poll_interval is not None else cfg.get("watch_poll_seconds", 5))
+        self.debounce = float(debounce if debounce is not None else cfg.get("watch_debounce_seconds", 10))
+        self.workers = max(1, int(workers if workers is not None else cfg.get("watch_workers", 2)))
+        self.state_path = Path(state_path) if state_path else _state_path()
+
+        self.state: Dict[str, Any] = self._load_state()
+        self._unstable: Dict[str, Tuple[List[int], float]] = {}   # key -> (signature, first seen)
+        self._inflight: Dict[Future, str] = {}                     # future -> doc_id
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ingest")
+        self._done_times: Deque[float] = deque()
+        self._started = time.time()
+        self._counters = {"enqueued": 0, "processed": 0, "failed": 0, "dropped": 0}
+
+    # ---------- persistence ----------
+    def _load_state(self) -> Dict[str, Any]:
+        state: Dict[str, Any] = {"queue": [], "pdfs": {}, "meta": {}}
+        if self.state_path.exists():
+            try:
+                with open(self.state_path, "r", encoding="utf-8") as f:
+                    state.update(json.load(f))
+                log.info(f"watch_state_loaded | pending={len(state['queue'])}")
+            except Exception as e:
+                log.error(f"Cannot read {self.state_path}: {e}; starting with empty state")
+        return state
+
+    def _save_state(self) -> None:
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.state_path.with_suffix(".json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, ensure_ascii=False)
+        os.replace(tmp, self.state_path)
+
+    # ---------- queue ----------
+    def _enqueue(self, doc_id: str, pdf_path: str, reason: str) -> bool:
+        if any(item["doc_id"] == doc_id for item in self.state["queue"]):
+            return False
+        self.state["queue"].append({
+            "doc_id": doc_id, "path": pdf_path, "reason": reason,
+            "enqueued_at": _now_iso(), "attempts": 0,
+        })
+        self._counters["enqueued"] += 1
+        log.info(f"enqueued | md5={doc_id} reason={reason} path={pdf_path}")
+        return True
+
+    def _stable(self, key: str, sig: List[int], now: float) -> bool:
+        """Debounce: True once `sig` has been observed unchanged for at least self.debounce seconds."""
+        prev = self._unstable.get(key)
+        if prev is None or prev[0] != sig:
+            self._unstable[key] = (sig, now)
+            return self.debounce <= 0
+        if now - prev[1] >= self.debounce:
+            del self._unstable[key]
+            return True
+        return False
+
+    # ---------- scanning ----------
+    def scan_once(self) -> int:
+        """Poll both directories once; returns number of newly enqueued documents."""
+        now = time.time()
+        enqueued = 0
+        seen_pdfs: Dict[str, List[int]] = self.state["pdfs"]
+        seen_meta: Dict[str, str] = self.state["meta"]
+
+        for pdf in sorted(pdfs_dir().glob("*.pdf")):
+            try:
+                st = pdf.stat()
+            except OSError:
+                continue  # vanished between glob and stat
+            key, sig = str(pdf), [st.st_size, st.st_mtime_ns]
+            if seen_pdfs.get(key) == sig or not self._stable(key, sig, now):
+                continue
+            try:
+                doc_id = file_md5(pdf)
+                meta = load_metadata(doc_id)
+                if meta is None:
+                    ensure_metadata_for_pdf(pdf, doc_id)   # draft; user fills it in, then it flips to ready
+                elif meta.status == "ready":
+                    enqueued += self._enqueue(doc_id, key, "pdf_added")
+                    seen_meta[doc_id] = f"ready:{meta_fingerprint(meta)}"
+                seen_pdfs[key] = sig
+            except Exception as e:
+                log.error(f"scan_failed | path={pdf}: {e}")
+
+        for jf in metadata_dir().glob("*.json"):
+            try:
+                sig = [jf.stat().st_mtime_ns]
+            except OSError:
+                continue
+            key = f"meta:{jf.stem}"
+            if seen_pdfs.get(key) == sig or not self._stable(key, sig, now):
+                continue
+            try:
+                meta = load_metadata(jf.stem)
+            except Exception as e:
+                log.warning(f"metadata_unreadable | file={jf.name}: {e}")   # retried on next change
+                seen_pdfs[key] = sig
+                continue
+            seen_pdfs[key] = sig
+            if meta is None:
+                continue
+            marker = f"{meta.status}:{meta_fingerprint(meta)}"
+            if seen_meta.get(meta.doc_id) == marker:
+                continue
+            seen_meta[meta.doc_id] = marker
+            if meta.status == "ready" and meta.source_path and Path(meta.source_path).exists():
+                enqueued += self._enqueue(meta.doc_id, meta.source_path, "metadata_ready")
+
+        self._save_state()
+        return enqueued
+
+    # ---------- processing ----------
+    def _ingest(self, pdf_path: str) -> str:
+        return ingest_one_pdf(pdf_path, reindex=False, on_chunk_progress=_quiet_progress)
+
+    def pump(self) -> None:
+        """Collect finished ingestions, then start queued ones up to the worker bound."""
+        self._collect()
+        self._start()
+        self._save_state()
+        self._write_stats()
+
+    def _collect(self) -> None:
+        """Record finished ingestions: successes leave the queue, failures count an attempt."""
+        for fut in [f for f in self._inflight if f.done()]:
+            doc_id = self._inflight.pop(fut)
+            item = next((it for it in self.state["queue"] if it["doc_id"] == doc_id), None)
+            err = fut.exception()
+            if err is None:
+                self._counters["processed"] += 1
+                self._done_times.append(time.time())
+                if item:
+                    self.state["queue"].remove(item)
+                log.info(f"ingested | md5={doc_id}")
+            else:
+                self._counters["failed"] += 1
+                if item:
+                    item["attempts"] += 1
+                    item["last_error"] = str(err)
+                    if item["attempts"] >= MAX_ATTEMPTS:
+                        self.state["queue"].remove(item)
+                        self._counters["dropped"] += 1
+                        log.error(f"ingest_dropped | md5={doc_id} after {MAX_ATTEMPTS} attempts: {err}")
+                    else:
+                        log.warning(f"ingest_failed | md5={doc_id} attempt={item['attempts']}: {err}")
+
+    def _start(self) -> None:
+        """Submit queued documents (not already in flight) up to the worker bound."""
+        busy = set(self._inflight.values())
+        for item in self.state["queue"]:
+            if len(self._inflight) >= self.workers:
+                break
+            if item["doc_id"] in busy:
+                continue
+            fut = self._pool.submit(self._ingest, item["path"])
+            self._inflight[fut] = item["doc_id"]
+            busy.add(item["doc_id"])
+
+    # ---------- counters ----------
+    def stats(self) -> Dict[str, Any]:
+        now = time.time()
+        while self._done_times and now - self._done_times[0] > THROUGHPUT_WINDOW_S:
+            self._done_times.popleft()
+        window = min(THROUGHPUT_WINDOW_S, max(1.0, now - self._started))
+        return {
+            "queue_depth": len(self.state["queue"]),
+            "in_flight": len(self._inflight),
+            "workers": self.workers,
+            **self._counters,
+            "docs_per_min": round(len(self._done_times) * 60.0 / window, 2),
+            "uptime_s": round(now - self._started, 1),
+            "updated_at": _now_iso(),
+        }
+
+    def _write_stats(self) -> None:
+        try:
+            with open(_stats_path(), "w", encoding="utf-8") as f:
+                json.dump(self.stats(), f, indent=2)
+        except OSError:
+            pass
+
+    # ---------- main loop ----------
+    def run_forever(self, stop: Optional[threading.Event] = None) -> None:
+        stop = stop or threading.Event()
+        log.info(
+            f"watcher_start | pdfs={pdfs_dir()} interval={self.poll_interval}s "
+            f"debounce={self.debounce}s workers={self.workers} pending={len(self.state['queue'])}"
+        )
+        try:
+            while not stop.is_set():
+                try:
+                    self.scan_once()
+                    self.pump()
+                except Exception as e:
+                    log.exception(f"watcher_loop_error: {e}")
+                stop.wait(self.poll_interval)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            log.info("watcher_stopping | waiting for in-flight ingestions")
+            self._pool.shutdown(wait=True)
+            self._collect()   # record results of whatever just finished; start nothing new
+            self._save_state()
+            self._write_stats()
+            log.info(f"watcher_stopped | {self.stats()}")
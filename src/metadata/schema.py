@@ -29,6 +29,9 @@ class DocumentMetadata(BaseModel):
     )
     tags: Optional[List[str]] = Field(default_factory=list, description="Optional thematic tags")
 
+    # Set by ingestion (MinHash near-duplicate check), not by the user
+    duplicate_of: Optional[str] = Field(None, description="doc_id of an earlier document this one near-duplicates")
+
     # --- Validators (Pydantic v2) ---
     @field_validator("year")
     @classmethod
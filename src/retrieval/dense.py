@@ -1,9 +1,10 @@
 # src/retrieval/dense.py
 from __future__ import annotations
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from dataclasses import dataclass
 
-from indexing.chroma_db import init_chroma, query as chroma_query
+from indexing.chroma_db import init_chroma, query as chroma_query, query_batch as chroma_query_batch
+from retrieval.filters import SearchFilters
 
 @dataclass
 class RetrievedChunk:
@@ -12,20 +13,13 @@ class RetrievedChunk:
     text: str
     distance: float
     metadata: Dict[str, Any]
+    expanded_text: Optional[str] = None   # hit + neighboring chunk text (retrieval.expansion)
+    expansion_chars: int = 0              # chars added around the hit by expansion
 
-def retrieve(
-    query_text: str,
-    top_k: int = 5,
-    collection_name: str = "documents",
-) -> List[RetrievedChunk]:
-    """
-    Query Chroma and return normalized results.
-    """
-    _, coll = init_chroma(collection_name=collection_name)
-    res = chroma_query(coll, query_text, top_k)
-    docs = res.get("documents", [[]])[0]
-    metas = res.get("metadatas", [[]])[0]
-    dists = res.get("distances", [[]])[0]
+def _hits(res: Dict[str, Any], i: int = 0) -> List[RetrievedChunk]:
+    docs = (res.get("documents") or [[]])[i]
+    metas = (res.get("metadatas") or [[]])[i]
+    dists = (res.get("distances") or [[]])[i]
 
     hits: List[RetrievedChunk] = []
     for text, meta, dist in zip(docs, metas, dists):
@@ -38,4 +32,30 @@ def retrieve(
         ))
     # sort by ascending distance (smaller = closer)
     hits.sort(key=lambda h: h.distance)
-    return hits
\ No newline at end of file
+    return hits
+
+def retrieve(
+    query_text: str,
+    top_k: int = 5,
+    collection_name: str = "documents",
+    filters: Optional[SearchFilters] = None,
+) -> List[RetrievedChunk]:
+    """
+    Query Chroma and return normalized results.
+    `filters` restrict the search to matching chunks (applied before ranking, not to the top_k).
+    """
+    _, coll = init_chroma(collection_name=collection_name)
+    return _hits(chroma_query(coll, query_text, top_k, filters.to_where() if filters else None))
+
+def retrieve_batch(
+    query_texts: List[str],
+    top_k: int = 5,
+    collection_name: str = "documents",
+    filters: Optional[SearchFilters] = None,
+) -> List[List[RetrievedChunk]]:
+    """retrieve() for several queries in one search call (one matmul with vector_backend = numpy)."""
+    if not query_texts:
+        return []
+    _, coll = init_chroma(collection_name=collection_name)
+    res = chroma_query_batch(coll, list(query_texts), top_k, filters.to_where() if filters else None)
+    return [_hits(res, i) for i in range(len(query_texts))]
@@ -0,0 +1,144 @@
+# src/retrieval/expansion.py
+from __future__ import annotations
+from typing import Dict, List, Optional, Set, Tuple
+
+from ingestion.chunk_store import ChunkStoreReader, chunk_store_path
+from retrieval.dense import RetrievedChunk
+from utils.config import get_settings
+from utils.logging_utils import get_logger
+
+log = get_logger("expansion")
+
+
+def _open_reader(doc_id: str) -> Optional[ChunkStoreReader]:
+    """Open the chunk store of a document, or None if it has none (or it is unreadable)."""
+    path = chunk_store_path(doc_id)
+    if not path.exists():
+        return None   # no chunk store (e.g. doc chunked before the store existed)
+    try:
+        return ChunkStoreReader(path)
+    except (OSError, ValueError, RuntimeError) as e:
+        log.warning(f"chunk_store_unreadable | doc={doc_id}: {e}")
+        return None
+
+
+def _paras(text: str) -> List[str]:
+    return text.split("\n\n")
+
+
+def _overlap(a: List[str], b: List[str]) -> int:
+    """
+    Number of paragraphs at the end of `a` that start `b`. The chunker carries the last
+    paragraphs of a chunk over as the head of the next one, so the overlap is paragraph-aligned.
+    """
+    if not a or not b:
+        return 0
+    first = b[0]
+    for j in range(len(a) - 1, -1, -1):
+        if a[j] == first:
+            k = len(a) - j
+            return k if a[j:] == b[:k] else 0
+    return 0
+
+
+def _tail(text: str, max_chars: int) -> str:
+    """Last ~max_chars of text, starting at a sentence/paragraph boundary when possible."""
+    if len(text) <= max_chars:
+        return text
+    cut = text[-max_chars:]
+    for sep in ("\n\n", ". "):
+        i = cut.find(sep)
+        if i != -1 and i < len(cut) - len(sep):
+            return cut[i + len(sep):]
+    return "…" + cut
+
+
+def _head(text: str, max_chars: int) -> str:
+    """First ~max_chars of text, ending at a sentence/paragraph boundary when possible."""
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars]
+    for sep in ("\n\n", ". "):
+        i = cut.rfind(sep)
+        if i > 0:
+            return cut[:i + 1].rstrip()
+    return cut + "…"
+
+
+def expand_hits(
+    hits: List[RetrievedChunk],
+    neighbors: Optional[int] = None,
+    neighbor_chars: Optional[int] = None,
+) -> List[RetrievedChunk]:
+    """
+    Fill hit.expanded_text with the text around each hit: up to `neighbors` chunks before/after
+    (chunk_idx ± k), read from the local chunk store by position, with the chunker's paragraph
+    overlap removed and at most `neighbor_chars` characters taken from each side.
+    Neighbors that are themselves hits are not pulled in (their text is in the context anyway).
+    Hits without a chunk store keep expanded_text=None. Returns the same list.
+    Each store is mapped only for the duration of the call: an open mapping would keep
+    re-ingestion (os.replace) or removal of that file from succeeding on Windows.
+    """
+    cfg = get_settings()
+    neighbors = int(cfg.get("context_neighbors", 1) if neighbors is None else neighbors)
+    neighbor_chars = int(cfg.get("context_neighbor_chars", 600) if neighbor_chars is None else neighbor_chars)
+    if neighbors <= 0 or neighbor_chars <= 0:
+        return hits
+
+    retrieved: Set[Tuple[str, int]] = set()
+    for h in hits:
+        idx = h.metadata.get("chunk_idx")
+        if idx is not None:
+            retrieved.add((h.doc_id, int(idx)))
+
+    readers: Dict[str, Optional[ChunkStoreReader]] = {}
+    try:
+        for h in hits:
+            idx = h.metadata.get("chunk_idx")
+            if idx is None:
+                continue
+            if h.doc_id not in readers:
+                readers[h.doc_id] = _open_reader(h.doc_id)
+            if readers[h.doc_id] is not None:
+                _expand_one(h, int(idx), readers[h.doc_id], retrieved, neighbors, neighbor_chars)
+    finally:
+        for reader in readers.values():
+            if reader is not None:
+                reader.close()
+    return hits
+
+
+def _expand_one(
+    h: RetrievedChunk,
+    idx: int,
+    reader: ChunkStoreReader,
+    retrieved: Set[Tuple[str, int]],
+    neighbors: int,
+    neighbor_chars: int,
+) -> None:
+    core = _paras(h.text)
+
+    # Walk outwards, dropping the overlap between consecutive chunks
+    before: List[str] = []
+    nxt = core
+    for i in range(idx - 1, idx - 1 - neighbors, -1):
+        rec = reader.get(f"{h.doc_id}_{i}") if i >= 0 and (h.doc_id, i) not in retrieved else None
+        if rec is None:
+            break
+        prev = _paras(rec["text_clean"])
+        before = prev[:len(prev) - _overlap(prev, nxt)] + before
+        nxt = prev
+    after: List[str] = []
+    last = core
+    for i in range(idx + 1, idx + 1 + neighbors):
+        rec = reader.get(f"{h.doc_id}_{i}") if (h.doc_id, i) not in retrieved else None
+        if rec is None:
+            break
+        nb = _paras(rec["text_clean"])
+        after += nb[_overlap(last, nb):]
+        last = nb
+
+    prefix = _tail("\n\n".join(p for p in before if p), neighbor_chars) if before else ""
+    suffix = _head("\n\n".join(p for p in after if p), neighbor_chars) if after else ""
+    h.expanded_text = "\n\n".join(p for p in (prefix, h.text.strip(), suffix) if p)
+    h.expansion_chars = len(prefix) + len(suffix)
@@ -0,0 +1,79 @@
+# src/retrieval/filters.py
+from __future__ import annotations
+import re
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional
+
+_TAG_RE = re.compile(r"[^a-z0-9]+")
+TAG_PREFIX = "tag__"
+
+
+def tag_key(tag: str) -> str:
+    """
+    Chunk metadata key of one tag ("Population Ageing" -> "tag__population_ageing").
+    Chroma metadata can't hold lists, so every tag of a document is stored as its own
+    boolean field on each chunk and filtered with {"tag__x": True}.
+    """
+    slug = _TAG_RE.sub("_", (tag or "").strip().lower()).strip("_")
+    return TAG_PREFIX + slug if slug else ""
+
+
+@dataclass
+class SearchFilters:
+    """Typed retrieval filters; unset fields don't filter. Compiled to a Chroma `where` clause."""
+    year_min: Optional[int] = None
+    year_max: Optional[int] = None
+    doc_types: List[str] = field(default_factory=list)
+    tags: List[str] = field(default_factory=list)
+    all_tags: bool = False                 # tags: match any (default) or all of them
+    doc_ids: List[str] = field(default_factory=list)
+
+    def to_where(self) -> Optional[Dict[str, Any]]:
+        """Chroma where clause, or None when nothing is filtered."""
+        clauses: List[Dict[str, Any]] = []
+        if self.year_min is not None:
+            clauses.append({"year": {"$gte": int(self.year_min)}})
+        if self.year_max is not None:
+            clauses.append({"year": {"$lte": int(self.year_max)}})
+        if self.doc_types:
+            clauses.append({"doc_type": {"$in": list(self.doc_types)}})
+        if self.doc_ids:
+            clauses.append({"doc_id": {"$in": list(self.doc_ids)}})
+        keys = [k for k in dict.fromkeys(tag_key(t) for t in self.tags) if k]
+        if keys:
+            tag_clauses = [{k: True} for k in keys]
+            if len(tag_clauses) == 1:
+                clauses.append(tag_clauses[0])
+            else:
+                clauses.append({"$and" if self.all_tags else "$or": tag_clauses})
+        if not clauses:
+            return None
+        return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+    def is_empty(self) -> bool:
+        return self.to_where() is None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> Optional["SearchFilters"]:
+        """Inverse of to_dict() (service requests); unknown keys and mistyped values raise ValueError."""
+        if not data:
+            return None
+        if not isinstance(data, dict):
+            raise ValueError("filters must be a JSON object")
+        unknown = set(data) - set(cls.__dataclass_fields__)
+        if unknown:
+            raise ValueError(f"unknown filter fields: {sorted(unknown)}")
+        for name in ("year_min", "year_max"):
+            v = data.get(name)
+            if v is not None and (isinstance(v, bool) or not isinstance(v, int)):
+                raise ValueError(f"filters.{name} must be an integer, got {v!r}")
+        for name in ("doc_types", "tags", "doc_ids"):
+            v = data.get(name)
+            if v is not None and (not isinstance(v, list) or not all(isinstance(x, str) for x in v)):
+                raise ValueError(f"filters.{name} must be a list of strings, got {v!r}")
+        if not isinstance(data.get("all_tags", False), bool):
+            raise ValueError(f"filters.all_tags must be true or false, got {data['all_tags']!r}")
+        return cls(**{k: v for k, v in data.items() if v is not None})
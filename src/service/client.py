@@ -0,0 +1,119 @@
+# src/service/client.py
+from __future__ import annotations
+import http.client
+import json
+import select
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from generation.answerer import Answer, Citation
+from retrieval.dense import RetrievedChunk
+from retrieval.filters import SearchFilters
+from utils.config import get_settings
+
+
+class ServiceError(RuntimeError):
+    def __init__(self, status: int, message: str):
+        super().__init__(f"retrieval service returned {status}: {message}")
+        self.status = status
+
+
+class ServiceClient:
+    """
+    Client of service.server. Each thread keeps one persistent HTTP/1.1 connection, so a
+    request costs one round trip instead of a TCP connect + request.
+    """
+
+    def __init__(self, base_url: str, timeout: float = 120.0):
+        parts = urlsplit(base_url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise ValueError(f"service_url must look like http://host:port, got {base_url!r}")
+        self.base_url = base_url.rstrip("/")
+        self._https = parts.scheme == "https"
+        self._host = parts.hostname
+        self._port = parts.port
+        self._prefix = parts.path.rstrip("/")
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _conn(self) -> http.client.HTTPConnection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            cls = http.client.HTTPSConnection if self._https else http.client.HTTPConnection
+            conn = cls(self._host, self._port, timeout=self.timeout)
+            self._local.conn = conn
+        elif conn.sock is not None and select.select([conn.sock], [], [], 0)[0]:
+            conn.close()              # idle socket readable = closed by the server; reconnects on request
+        return conn
+
+    def _request(
+        self, method: str, path: str, payload: Optional[Dict[str, Any]] = None, idempotent: bool = True,
+    ) -> Dict[str, Any]:
+        """
+        One request on this thread's connection. If the server dropped an idle keep-alive
+        connection, the request is retried once on a new one, but a non-idempotent request
+        (/answer: a paid LLM call) only when it failed before it was sent.
+        """
+        body = json.dumps(payload).encode("utf-8") if payload is not None else None
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        for attempt in (0, 1):
+            conn = self._conn()
+            sent = False
+            try:
+                conn.request(method, self._prefix + path, body=body, headers=headers)
+                sent = True
+                resp = conn.getresponse()
+                data = resp.read()
+                break
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                conn.close()
+                self._local.conn = None
+                if attempt or (sent and not idempotent):
+                    raise
+        out = json.loads(data.decode("utf-8")) if data else {}
+        if resp.status != 200:
+            raise ServiceError(resp.status, out.get("error", ""))
+        return out
+
+    # ---------- API ----------
+    def health(self) -> Dict[str, Any]:
+        return self._request("GET", "/health")
+
+    def stats(self) -> Dict[str, Any]:
+        return self._request("GET", "/stats")
+
+    def retrieve(self, query: str, top_k: int = 5, filters: Optional[SearchFilters] = None) -> List[RetrievedChunk]:
+        payload: Dict[str, Any] = {"query": query, "top_k": top_k}
+        if filters is not None and not filters.is_empty():
+            payload["filters"] = filters.to_dict()
+        out = self._request("POST", "/retrieve", payload)
+        return [RetrievedChunk(**h) for h in out["hits"]]
+
+    def answer(
+        self, question: str, top_k: int = 5, model: Optional[str] = None, filters: Optional[SearchFilters] = None,
+    ) -> Tuple[Answer, List[RetrievedChunk]]:
+        """(answer, hits it was generated from)."""
+        payload: Dict[str, Any] = {"question": question, "top_k": top_k, "model": model}
+        if filters is not None and not filters.is_empty():
+            payload["filters"] = filters.to_dict()
+        out = self._request("POST", "/answer", payload, idempotent=False)
+        ans = Answer(answer=out["answer"], citations=[Citation(**c) for c in out["citations"]])
+        return ans, [RetrievedChunk(**h) for h in out["hits"]]
+
+    def reload(self) -> Dict[str, Any]:
+        return self._request("POST", "/reload", {})
+
+
+_CLIENT: Optional[ServiceClient] = None
+
+
+def get_service_client() -> Optional[ServiceClient]:
+    """Client for service_url (config.yaml or RAG_SERVICE_URL), or None to work in-process."""
+    global _CLIENT
+    url = str(get_settings().get("service_url") or "").strip()
+    if not url:
+        return None
+    if _CLIENT is None or _CLIENT.base_url != url.rstrip("/"):
+        _CLIENT = ServiceClient(url)
+    return _CLIENT
@@ -0,0 +1,181 @@
+# src/service/server.py
+from __future__ import annotations
+import json
+import threading
+import time
+from dataclasses import asdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+from generation.answerer import Answer, answer_with_citations, get_openai_client
+from indexing.chroma_db import collection_count, corpus_stats, get_embedder, init_chroma, reset_handles
+from retrieval.dense import RetrievedChunk, retrieve
+from retrieval.filters import SearchFilters
+from utils.config import pin_settings
+from utils.logging_utils import get_logger
+
+log = get_logger("service")
+
+# Long-lived retrieval service: one process keeps the Chroma client/collection, the embedder
+# (local model weights or the OpenAI connection pool) and the chat client warm, and serves
+#   GET  /health                              -> {"ok": true, "uptime_s": ...}
+#   GET  /stats                               -> {"docs", "chunks", "requests", ...}
+#   POST /retrieve {"query", "top_k", "filters"}  -> {"hits": [...]}
+#   POST /answer   {"question", "top_k", "model", "filters"} -> {"answer", "citations", "hits"}
+#   POST /reload                               -> re-read config.yaml and re-open the index (after
+#                                                 another process re-indexed or the config changed)
+# "filters" is optional: SearchFilters fields, e.g. {"year_min": 2015, "tags": ["pensions"]}.
+# Requests are handled on a thread per connection (HTTP/1.1 keep-alive); see service.client.
+WARMUP_QUERY = "warm-up query"
+_STATS_TTL_S = 30.0          # corpus_stats() reads every chunk's metadata; cache it briefly
+
+
+class RetrievalService:
+    """The in-process functions behind the HTTP handler, plus warm-up and request counters."""
+
+    def __init__(self, default_model: str = "gpt-4.1"):
+        self.default_model = default_model
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._counts: Dict[str, int] = {"retrieve": 0, "answer": 0, "errors": 0}
+        self._corpus: Optional[Tuple[float, dict]] = None
+
+    def warm_up(self) -> float:
+        """
+        Pin the settings, open the collection, load the embedder, touch the HNSW index and open
+        the chat client.
+        """
+        t0 = time.perf_counter()
+        pin_settings()                             # requests don't re-parse config.yaml
+        _, coll = init_chroma()
+        get_embedder().embed_query(WARMUP_QUERY)
+        if collection_count(coll) > 0:
+            retrieve(WARMUP_QUERY, top_k=1)       # first query loads the persisted HNSW segment
+        try:
+            get_openai_client()
+        except Exception as e:                     # answering is optional; retrieval still works
+            log.warning(f"service_warmup_openai_failed | {e}")
+        dt = time.perf_counter() - t0
+        log.info(f"service_warm | seconds={dt:.2f}")
+        return dt
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counts[name] += 1
+
+    def retrieve(self, query: str, top_k: int, filters: Optional[SearchFilters] = None) -> List[RetrievedChunk]:
+        self._count("retrieve")
+        return retrieve(query, top_k=top_k, filters=filters)
+
+    def answer(
+        self, question: str, top_k: int, model: Optional[str], filters: Optional[SearchFilters] = None,
+    ) -> Tuple[Answer, List[RetrievedChunk]]:
+        """Retrieve once and answer from those hits (the caller gets both)."""
+        self._count("answer")
+        hits = retrieve(question, top_k=top_k, filters=filters)
+        ans = answer_with_citations(question, top_k=top_k, model=model or self.default_model, hits=hits)
+        return ans, hits
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.time()
+        with self._lock:
+            cached = self._corpus
+        if cached is None or now - cached[0] > _STATS_TTL_S:
+            cached = (now, corpus_stats())
+            with self._lock:
+                self._corpus = cached
+        with self._lock:
+            counts = dict(self._counts)
+        return {**cached[1], **counts, "uptime_s": round(now - self.started, 1)}
+
+    def reload(self) -> float:
+        reset_handles()
+        with self._lock:
+            self._corpus = None
+        return self.warm_up()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"             # keep-alive: clients reuse one connection
+    service: RetrievalService                 # set on the subclass built by make_server()
+
+    def log_message(self, fmt, *args):        # route access logs to the app log, not stderr
+        log.info(f"service_http | {self.address_string()} {fmt % args}")
+
+    def _send(self, status: int, payload: Dict[str, Any]) -> None:
+        body = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _body(self) -> Dict[str, Any]:
+        n = int(self.headers.get("Content-Length") or 0)
+        if not n:
+            return {}
+        data = json.loads(self.rfile.read(n).decode("utf-8"))
+        if not isinstance(data, dict):
+            raise ValueError("request body must be a JSON object")
+        return data
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send(200, {"ok": True, "uptime_s": round(time.time() - self.service.started, 1)})
+        elif self.path == "/stats":
+            self._dispatch(self.service.stats)
+        else:
+            self._send(404, {"error": f"unknown path {self.path}"})
+
+    def do_POST(self):
+        try:
+            body = self._body()
+        except ValueError as e:               # json.JSONDecodeError is a ValueError
+            self._send(400, {"error": f"bad request body: {e}"})
+            return
+        if self.path == "/retrieve":
+            self._dispatch(self._retrieve, body)
+        elif self.path == "/answer":
+            self._dispatch(self._answer, body)
+        elif self.path == "/reload":
+            self._dispatch(lambda: {"warmup_s": round(self.service.reload(), 2)})
+        else:
+            self._send(404, {"error": f"unknown path {self.path}"})
+
+    def _retrieve(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        query = str(body.get("query") or "").strip()
+        if not query:
+            raise ValueError("'query' is required")
+        filters = SearchFilters.from_dict(body.get("filters"))
+        hits = self.service.retrieve(query, int(body.get("top_k", 5)), filters)
+        return {"hits": [asdict(h) for h in hits]}
+
+    def _answer(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        question = str(body.get("question") or "").strip()
+        if not question:
+            raise ValueError("'question' is required")
+        filters = SearchFilters.from_dict(body.get("filters"))
+        ans, hits = self.service.answer(question, int(body.get("top_k", 5)), body.get("model"), filters)
+        return {**asdict(ans), "hits": [asdict(h) for h in hits]}
+
+    def _dispatch(self, fn, *args) -> None:
+        try:
+            payload = fn(*args)
+        except ValueError as e:
+            self._send(400, {"error": str(e)})
+            return
+        except Exception as e:
+            self.service._count("errors")
+            log.exception(f"service_error | path={self.path}")
+            self._send(500, {"error": f"{type(e).__name__}: {e}"})
+            return
+        self._send(200, payload)
+
+
+def make_server(host: str, port: int, service: Optional[RetrievalService] = None) -> ThreadingHTTPServer:
+    """Threaded HTTP server bound to (host, port) over `service` (not warmed up here)."""
+    svc = service or RetrievalService()
+    handler = type("RetrievalHandler", (_Handler,), {"service": svc})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
@@ -25,13 +25,17 @@ from indexing.chroma_db import collection_count, corpus_stats
 from indexing.chroma_inspect import list_all_docs
 
 from retrieval.dense import retrieve
+from retrieval.filters import SearchFilters
 
 from generation.answerer import answer_with_citations
 
+from service.client import get_service_client
+
 from ui.tabs.upload_tab import show_metadata_form
 
 from datetime import datetime, timezone
-from metadata.io import load_metadata, save_metadata
+from typing import Optional
+from metadata.io import list_all_metadata, load_metadata, save_metadata
 from metadata.schema import DocumentMetadata
 
 from dotenv import load_dotenv 
@@ -101,7 +105,7 @@ def _sidebar():
     s = st.session_state[SS["settings"]]
 
     # Always refresh corpus stats on load
-    st.session_state[SS["corpus_stats"]] = corpus_stats()
+    st.session_state[SS["corpus_stats"]] = _corpus_stats()
 
     st.sidebar.selectbox("Model", ["gpt-4.1"], index=0, key="model")
     st.sidebar.slider("Top-K chunks", min_value=3, max_value=12,
@@ -119,6 +123,26 @@ def _sidebar():
     st.sidebar.divider()
     st.sidebar.markdown("[Open logs folder](file:///" + str((APP_ROOT / 'data' / 'logs').as_posix()) + ")")
 
+def _corpus_stats() -> dict:
+    """{docs, chunks} from the retrieval service when one is configured, else in-process."""
+    svc = get_service_client()
+    if svc is None:
+        return corpus_stats()
+    try:
+        s = svc.stats()
+        return {"docs": s["docs"], "chunks": s["chunks"]}
+    except Exception:
+        return {"docs": 0, "chunks": 0}
+
+def _reload_service():
+    """The service keeps its index handles open; have it re-open them after (re)indexing."""
+    svc = get_service_client()
+    if svc is not None:
+        try:
+            svc.reload()
+        except Exception as e:
+            st.warning(f"Retrieval service did not reload: {e}")
+
 def _header():
     st.markdown(f"### {APP_NAME} — {APP_VERSION}")
     st.caption("Minimal UI skeleton (V1-050).")
@@ -128,8 +152,9 @@ def _tab_upload():
     st.caption("Drop one or more PDFs; first save & fill metadata, then ingest ready docs.")
 
     st.caption(
-        "Reindex will **wipe existing Chroma data** and rebuild index from all PDFs in `data/pdfs`. "
-        "Old chunks for removed or changed PDFs are deleted, and only current PDFs are indexed fresh."
+        "Reindex is **incremental**: new PDFs in `data/pdfs` are indexed, removed PDFs are deleted from Chroma, "
+        "documents whose metadata changed are updated, and unchanged documents are skipped. "
+        "Tick *Full rebuild* to wipe existing Chroma data and rebuild the index from scratch."
     )
 
     # --- Existing metadata editor (shows any draft docs found on disk) ---
@@ -138,6 +163,7 @@ def _tab_upload():
     show_metadata_form()
 
     # --- Reindex (keep your original behavior) ---
+    full_rebuild = st.checkbox("Full rebuild (wipe index first)", value=False)
     if st.button("Reindex all PDFs", use_container_width=True):
         status_box = st.empty()
         prog = st.progress(0, text="Starting reindex.")
@@ -146,7 +172,8 @@ def _tab_upload():
         def on_progress(pct: float, msg: str): prog.progress(int(pct), text=msg)
 
         with st.spinner("Reindexing PDFs."):
-            stats = reindex_all_pdfs(on_status=on_status, on_progress=on_progress)
+            stats = reindex_all_pdfs(on_status=on_status, on_progress=on_progress, force=full_rebuild)
+        _reload_service()
 
         st.session_state[SS["corpus_stats"]] = stats
         st.success(f"Reindex complete: {stats['docs']} docs, {stats['chunks']} chunks")
@@ -257,7 +284,8 @@ def _tab_upload():
 
         # Refresh stats in sidebar after ingest
         if last_ids:
-            st.session_state[SS["corpus_stats"]] = corpus_stats()
+            _reload_service()
+            st.session_state[SS["corpus_stats"]] = _corpus_stats()
             prev = st.session_state.get(SS["last_ingested"], [])
             st.session_state[SS["last_ingested"]] = last_ids + prev
 
@@ -277,12 +305,44 @@ def _tab_upload():
         # Clear pending set after a run (only the ones we just processed)
         st.session_state[PENDING_UPLOAD_IDS] = []
 
+def _ask_filters() -> Optional[SearchFilters]:
+    """Filter widgets (inside the Ask form); options come from the saved document metadata."""
+    metas = list_all_metadata()
+    years = sorted({m.year for m in metas if m.year})
+    doc_types = sorted({m.doc_type for m in metas if m.doc_type})
+    tags = sorted({t for m in metas for t in (m.tags or [])}, key=str.lower)
+    titles = {m.doc_id: (m.title or m.title_guess or m.doc_id) for m in metas}
+
+    with st.expander("Filters", expanded=False):
+        c1, c2 = st.columns(2)
+        year_range = None
+        if len(years) > 1:
+            year_range = c1.slider("Year", min_value=years[0], max_value=years[-1], value=(years[0], years[-1]))
+        sel_types = c2.multiselect("Document type", doc_types)
+        sel_tags = st.multiselect("Tags", tags)
+        all_tags = st.checkbox("Require all selected tags", value=False)
+        sel_docs = st.multiselect("Documents", sorted(titles, key=lambda d: titles[d].lower()),
+                                  format_func=lambda d: titles[d])
+
+    filters = SearchFilters(
+        # a full-range slider means "no year filter" (also keeps chunks without a year)
+        year_min=year_range[0] if year_range and year_range[0] > years[0] else None,
+        year_max=year_range[1] if year_range and year_range[1] < years[-1] else None,
+        doc_types=sel_types,
+        tags=sel_tags,
+        all_tags=all_tags,
+        doc_ids=sel_docs,
+    )
+    return None if filters.is_empty() else filters
+
+
 def _tab_ask():
     st.subheader("Ask")
     st.caption("Ask runs a semantic search on your indexed PDFs, retrieves the most relevant chunks from ChromaDB, "
                "and sends them to GPT-4.1 via OpenAI API to generate an answer with citations from the source documents.")
     
-    if collection_count() == 0:
+    svc = get_service_client()
+    if (_corpus_stats()["chunks"] if svc else collection_count()) == 0:
         st.info("Index is empty. Upload PDFs first on the **Upload** tab.")
         return
 
@@ -300,6 +360,7 @@ def _tab_ask():
             placeholder="e.g., How does population aging affect savings and current accounts?",
             height=140,
         )
+        filters = _ask_filters()
         submitted = st.form_submit_button("Search", use_container_width=True)
 
     # Run retrieval + LLM only when submitted
@@ -307,9 +368,13 @@ def _tab_ask():
         st.session_state["ask_last_q"] = question
         with st.spinner("Retrieving and generating..."):
             top_k = st.session_state[SS["settings"]]["top_k"]
-            # Retrieve for debug view and to keep consistent with answer context
-            hits = retrieve(question, top_k=top_k)
-            ans = answer_with_citations(question, top_k=top_k, model=st.session_state[SS["settings"]]["model"])
+            model = st.session_state[SS["settings"]]["model"]
+            # One retrieval serves both the answer context and the debug view
+            if svc is not None:
+                ans, hits = svc.answer(question, top_k=top_k, model=model, filters=filters)
+            else:
+                hits = retrieve(question, top_k=top_k, filters=filters)
+                ans = answer_with_citations(question, top_k=top_k, model=model, hits=hits)
         # persist results so future reruns (e.g., toggling UI) don’t lose them
         st.session_state["ask_last_hits"] = hits
         st.session_state["ask_last_ans"] = ans
@@ -11,13 +11,38 @@ if env_path.exists():
 # Default config path
 config_path = Path(__file__).resolve().parents[2] / "config.yaml"
 
+# path -> (mtime_ns, parsed yaml): config.yaml is re-parsed only after it changes
+_PARSED = {}
+# settings snapshot of a long-lived process (see pin_settings)
+_PINNED = None
+
 def load_config(path=config_path):
-    with open(path, "r") as f:
-        config = yaml.safe_load(f)
-    return config
+    mtime = os.stat(path).st_mtime_ns
+    cached = _PARSED.get(str(path))
+    if cached is None or cached[0] != mtime:
+        with open(path, "r") as f:
+            cached = (mtime, yaml.safe_load(f))
+        _PARSED[str(path)] = cached
+    return cached[1]
+
+def pin_settings():
+    """
+    Freeze get_settings() to the current config for this process (the retrieval service pins
+    at warm-up and re-pins on /reload), so hot paths don't re-read config.yaml or the env.
+    """
+    global _PINNED
+    _PINNED = None
+    _PINNED = get_settings()
+    return dict(_PINNED)
+
+def unpin_settings():
+    global _PINNED
+    _PINNED = None
 
 # Example: read API key and model name from env/config
 def get_settings():
+    if _PINNED is not None:
+        return dict(_PINNED)
     cfg = load_config()
     return {
         "openai_api_key": os.getenv("OPENAI_API_KEY", ""),
@@ -27,6 +52,48 @@ def get_settings():
         "chunk_overlap": cfg.get("chunk_overlap", 150),
         "top_k_dense": cfg.get("top_k_dense", 50),
         "top_k_bm25": cfg.get("top_k_bm25", 50),
+        "parse_workers": cfg.get("parse_workers", 1),
+        "reindex_workers": cfg.get("reindex_workers", 0),
+        "page_cache_enabled": cfg.get("page_cache_enabled", True),
+        "page_cache_max_mb": cfg.get("page_cache_max_mb", 2048),
+        "watch_poll_seconds": cfg.get("watch_poll_seconds", 5),
+        "watch_debounce_seconds": cfg.get("watch_debounce_seconds", 10),
+        "watch_workers": cfg.get("watch_workers", 2),
+        "near_dup_action": cfg.get("near_dup_action", "flag"),
+        "near_dup_threshold": cfg.get("near_dup_threshold", 0.85),
+        "chunk_store_compress": cfg.get("chunk_store_compress", True),
+        "context_neighbors": cfg.get("context_neighbors", 1),
+        "context_neighbor_chars": cfg.get("context_neighbor_chars", 600),
+        "embedding_backend": cfg.get("embedding_backend", "openai"),
+        "embedding_runtime": cfg.get("embedding_runtime", "torch"),
+        "embedding_quantize": cfg.get("embedding_quantize", "none"),
+        "embedding_threads": cfg.get("embedding_threads", 0),
+        "embedding_max_length": cfg.get("embedding_max_length", 512),
+        "embedding_batch_tokens_local": cfg.get("embedding_batch_tokens_local", 16_384),
+        "embedding_dimensions": cfg.get("embedding_dimensions", 0),
+        "embedding_store_dims": cfg.get("embedding_store_dims", 0),
+        "rescore_candidates": cfg.get("rescore_candidates", 0),
+        "hnsw_space": cfg.get("hnsw_space", "l2"),
+        "hnsw_m": cfg.get("hnsw_m", 0),
+        "hnsw_construction_ef": cfg.get("hnsw_construction_ef", 0),
+        "hnsw_search_ef": cfg.get("hnsw_search_ef", 0),
+        "vector_backend": cfg.get("vector_backend", "chroma"),
+        "ivf_nlist": cfg.get("ivf_nlist", 0),
+        "ivf_pq_m": cfg.get("ivf_pq_m", 64),
+        "ivf_nprobe": cfg.get("ivf_nprobe", 16),
+        "ivf_rescore": cfg.get("ivf_rescore", 10),
+        "embedding_cache_enabled": cfg.get("embedding_cache_enabled", True),
+        "embedding_cache_max_mb": cfg.get("embedding_cache_max_mb", 1024),
+        "embedding_cache_dtype": cfg.get("embedding_cache_dtype", "float16"),
+        "embed_concurrency": cfg.get("embed_concurrency", 4),
+        "embed_tpm": cfg.get("embed_tpm", 1_000_000),
+        "embed_rpm": cfg.get("embed_rpm", 3_000),
+        "embed_batch_tokens": cfg.get("embed_batch_tokens", 8_192),
+        "embed_target_latency_s": cfg.get("embed_target_latency_s", 3.0),
+        "embed_max_retries": cfg.get("embed_max_retries", 6),
+        "service_url": os.getenv("RAG_SERVICE_URL", cfg.get("service_url", "")),
+        "service_host": cfg.get("service_host", "127.0.0.1"),
+        "service_port": cfg.get("service_port", 8765),
     }
 
 if __name__ == "__main__":